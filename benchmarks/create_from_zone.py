@@ -0,0 +1,54 @@
+"""
+compares the single pass record set extraction of create_from_zone with
+the previous implementation, which queried every known record type for
+every name.
+"""
+import tempfile
+import time
+import click
+from easyzone import easyzone
+from zonefile_migrate.dns_record_set import (
+    DNSRecordSet,
+    DNSRecordTypes,
+    create_from_zone,
+)
+from benchmarks.zonefile_generator import generate_zonefile
+
+
+def create_from_zone_by_all_types(zone: easyzone.Zone) -> [DNSRecordSet]:
+    result = []
+    for key, name in zone.names.items():
+        for rectype in DNSRecordTypes.keys():
+            records = name.records(rectype)
+            if not records:
+                continue
+            result.append(DNSRecordSet.create_from_easyzone(name, records))
+    return result
+
+
+def timed(function, zone: easyzone.Zone) -> (float, [DNSRecordSet]):
+    start = time.perf_counter()
+    result = function(zone)
+    return time.perf_counter() - start, result
+
+
+@click.command()
+@click.option("--names", default=50000, help="number of names in the zone")
+def main(names):
+    with tempfile.NamedTemporaryFile("w", suffix=".zone") as file:
+        generate_zonefile(file, "benchmark.example", names)
+        file.flush()
+        zone = easyzone.zone_from_file("benchmark.example", file.name)
+
+    before, expected = timed(create_from_zone_by_all_types, zone)
+    after, actual = timed(create_from_zone, zone)
+    assert expected == actual
+
+    click.echo(f"record sets:      {len(actual)}")
+    click.echo(f"all record types: {before:.3f}s")
+    click.echo(f"single pass:      {after:.3f}s")
+    click.echo(f"speedup:          {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+compares the memory taken by the record sets of a zone, as slotted record sets with
+interned strings and tuples of values, and as the previous plain record sets with
+an instance dictionary and a list of values.
+"""
+
+import tempfile
+import tracemalloc
+import click
+from easyzone import easyzone
+from zonefile_migrate.dns_record_set import (
+    DNSRecordSet,
+    create_from_zone,
+    record_types,
+)
+from benchmarks.zonefile_generator import generate_zonefile, parse_mix
+
+
+class PlainDNSRecordSet:
+    def __init__(self, name: str, rectype: str, ttl: int, rrdatas: list[str]):
+        self.name = name
+        self.rectype = rectype
+        self.ttl = ttl
+        self.rrdatas = rrdatas
+
+
+def create_plain_from_zone(zone: easyzone.Zone) -> [PlainDNSRecordSet]:
+    result = []
+    default_ttl = easyzone.soa_from_node(zone._zone[zone.domain]).minimum
+    for key in zone._zone.keys():
+        name = easyzone.Name(str(key), zone._zone[key], default_ttl)
+        for rectype in record_types(name):
+            records = name.records(rectype)
+            rrdatas = records.items
+            if len(rrdatas) > 0 and isinstance(rrdatas[0], (tuple, list)):
+                rrdatas = list(map(lambda r: " ".join(map(str, r)), rrdatas))
+            result.append(PlainDNSRecordSet(name.name, records.type, name.ttl, rrdatas))
+    return result
+
+
+def traced(function, zone: easyzone.Zone) -> (int, list):
+    """
+    returns the memory held by the result of `function` on the zone, and the result.
+    """
+    tracemalloc.start()
+    result = function(zone)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+@click.command()
+@click.option("--names", default=50000, help="number of names in the zone")
+@click.option(
+    "--mix",
+    default="AAAA=0.5,TXT=0.5,MX=0.5",
+    help="probability of a name to have a record of a type besides its A record",
+)
+def main(names, mix):
+    with tempfile.NamedTemporaryFile("w", suffix=".zone") as file:
+        generate_zonefile(file, "benchmark.example", names, mix=parse_mix(mix))
+        file.flush()
+        zone = easyzone.zone_from_file("benchmark.example", file.name)
+
+    before, expected = traced(create_plain_from_zone, zone)
+    after, actual = traced(create_from_zone, zone)
+    assert [
+        DNSRecordSet(r.name, r.rectype, r.ttl, r.rrdatas) for r in expected
+    ] == actual
+
+    click.echo(f"record sets:   {len(actual)}")
+    click.echo(f"plain:         {before / 1024 / 1024:.1f} MiB")
+    click.echo(f"slotted:       {after / 1024 / 1024:.1f} MiB")
+    click.echo(f"reduction:     {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    main()
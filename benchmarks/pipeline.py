@@ -0,0 +1,203 @@
+"""
+measures the elapsed time and peak memory of each stage of the conversion of a
+synthetic zonefile: parsing, record set extraction, building the CloudFormation
+template, serialising it, streaming it with each of the emitters and rendering the
+Terraform template. The results are written as JSON, and compared with those of a
+previous run with --baseline.
+"""
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from typing import Callable, Iterator
+import click
+from ruamel.yaml import YAML
+from zonefile_migrate.dns_record_set import DNSRecordSet, iter_from_zone
+from zonefile_migrate.emitters import get_emitter
+from zonefile_migrate.manifest import tool_version
+from zonefile_migrate.to_cloudformation import (
+    convert_to_cloudformation,
+    write_cloudformation,
+)
+from zonefile_migrate.to_terraform import write_terraform
+from zonefile_migrate.utils import zone_readers
+from benchmarks.zonefile_generator import DEFAULT_MIX, generate_zonefile, parse_mix
+
+DOMAIN_NAME = "benchmark.example"
+
+
+class ExtractedZone:
+    """
+    a zone of record sets which were already extracted, so that the stages after the
+    extraction are measured on their own.
+    """
+
+    def __init__(self, domain: str, record_sets: [DNSRecordSet]):
+        self.domain = domain
+        self.record_sets = record_sets
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        return iter(self.record_sets)
+
+
+def serialise(template) -> str:
+    buffer = StringIO()
+    YAML().dump(template, buffer)
+    return buffer.getvalue()
+
+
+def measure(stage: Callable[[], object], repeat: int) -> (float, int):
+    """
+    returns the best elapsed time of `repeat` runs of `stage` and its peak memory.
+    The memory is traced in a separate run, as tracing slows down the stage.
+    """
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        elapsed.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(elapsed), peak
+
+
+def run(filename: str, parser: str, repeat: int) -> Iterator[dict]:
+    """
+    generates the measurements of each stage of the conversion of the zonefile.
+    """
+    zone = zone_readers[parser](DOMAIN_NAME, filename)
+    record_sets = list(iter_from_zone(zone))
+    extracted = ExtractedZone(zone.domain, record_sets)
+    template = convert_to_cloudformation(extracted, None)
+
+    stages = [
+        ("parse", lambda: zone_readers[parser](DOMAIN_NAME, filename)),
+        ("extract", lambda: list(iter_from_zone(zone))),
+        ("cloudformation-build", lambda: convert_to_cloudformation(extracted, None)),
+        ("cloudformation-serialise", lambda: serialise(template)),
+        (
+            "cloudformation-stream",
+            lambda: write_cloudformation(extracted, None, StringIO()),
+        ),
+        (
+            "cloudformation-stream-ruamel",
+            lambda: write_cloudformation(
+                extracted, None, StringIO(), get_emitter("yaml", "ruamel")
+            ),
+        ),
+        (
+            "cloudformation-stream-json",
+            lambda: write_cloudformation(
+                extracted, None, StringIO(), get_emitter("json")
+            ),
+        ),
+        (
+            "terraform-render",
+            lambda: write_terraform(extracted, "google", None, StringIO()),
+        ),
+    ]
+    for stage, function in stages:
+        elapsed, peak = measure(function, repeat)
+        yield {
+            "parser": parser,
+            "stage": stage,
+            "seconds": elapsed,
+            "record_sets_per_second": len(record_sets) / elapsed if elapsed else None,
+            "peak_memory": peak,
+        }
+
+
+def compare(results: [dict], baseline: dict):
+    """
+    reports the relative change of the elapsed time and peak memory of each stage
+    compared to the `baseline` results.
+    """
+    previous = {(r["parser"], r["stage"]): r for r in baseline["results"]}
+    for result in results:
+        before = previous.get((result["parser"], result["stage"]))
+        if not before:
+            continue
+        click.echo(
+            f"{result['parser']:10} {result['stage']:30} "
+            f"time {result['seconds'] / before['seconds'] - 1:+7.1%}  "
+            f"memory {result['peak_memory'] / before['peak_memory'] - 1:+7.1%}"
+        )
+
+
+@click.command()
+@click.option("--names", default=10000, help="number of names in the zone")
+@click.option(
+    "--mix",
+    default=",".join(f"{t}={p}" for t, p in DEFAULT_MIX.items()),
+    help="probability of a name to have a record of a type besides its A record",
+)
+@click.option("--depth", default=1, help="number of labels of the names")
+@click.option("--idn-share", default=0.0, help="share of internationalized names")
+@click.option("--seed", default=0, help="of the generated zone")
+@click.option(
+    "--parser",
+    "parsers",
+    multiple=True,
+    type=click.Choice(list(zone_readers)),
+    default=list(zone_readers),
+    help="to measure, defaults to all",
+)
+@click.option("--repeat", default=3, help="number of timed runs of each stage")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    help="to write the JSON results to",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON results of a previous run to compare with",
+)
+def main(names, mix, depth, idn_share, seed, parsers, repeat, output, baseline):
+    parameters = {
+        "names": names,
+        "mix": parse_mix(mix),
+        "depth": depth,
+        "idn_share": idn_share,
+        "seed": seed,
+        "repeat": repeat,
+    }
+    results = []
+    with tempfile.NamedTemporaryFile("w", suffix=".zone") as file:
+        generate_zonefile(
+            file, DOMAIN_NAME, names, seed, parameters["mix"], depth, idn_share
+        )
+        file.flush()
+        for parser in parsers:
+            for result in run(file.name, parser, repeat):
+                click.echo(
+                    f"{result['parser']:10} {result['stage']:30} "
+                    f"{result['seconds']:8.3f}s "
+                    f"{result['peak_memory'] / 1024 / 1024:8.1f} MiB"
+                )
+                results.append(result)
+
+    report = {
+        "version": tool_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+    if baseline:
+        with open(baseline) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+measures the startup time of the command line interface with `python -X importtime`:
+the wall time of the process, the cumulative import time of zonefile_migrate and the
+modules which take the longest to import. It compares the lazily loading group with
+importing the modules of all commands up front, as before.
+"""
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+import click
+
+COMMAND_MODULES = [
+    "zonefile_migrate.to_cloudformation",
+    "zonefile_migrate.to_terraform",
+    "zonefile_migrate.diff",
+    "zonefile_migrate.apply_route53",
+]
+
+_import_time = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_import_times(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    returns the self and cumulative import time in microseconds of each top-level
+    import in the `-X importtime` output on `stderr`.
+
+    >>> parse_import_times('import time: self [us] | cumulative | imported package\\n'
+    ...     'import time:       120 |        120 |   click.core\\n'
+    ...     'import time:        80 |        200 | click')
+    {'click': (80, 200)}
+    """
+    result = {}
+    for line in stderr.splitlines():
+        match = _import_time.match(line)
+        if match and len(match.group(3)) == 1:
+            result[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return result
+
+
+def run(code: str) -> (float, str):
+    """
+    returns the wall time of running `code` in a new interpreter, and its import
+    times.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, process.stderr
+
+
+def slowest_imports(stderr: str, count: int) -> List[Tuple[str, int]]:
+    """
+    returns the `count` modules with the highest self import time in `stderr`.
+    """
+    times = []
+    for line in stderr.splitlines():
+        match = _import_time.match(line)
+        if match:
+            times.append((match.group(4), int(match.group(1))))
+    return sorted(times, key=lambda t: t[1], reverse=True)[:count]
+
+
+@click.command()
+@click.option("--repeat", default=10, help="number of runs of each variant")
+@click.option("--top", default=10, help="number of slowest imports to report")
+@click.argument("args", nargs=-1)
+def main(repeat, top, args):
+    """
+    measures the startup of `zonefile-migrate ARGS`, by default `--help`.
+    """
+    args = list(args) or ["--help"]
+    run_main = (
+        "from zonefile_migrate.__main__ import main\n"
+        f"main({args!r}, standalone_mode=False)"
+    )
+    variants = {
+        "lazy": run_main,
+        "eager": "".join(f"import {m}\n" for m in COMMAND_MODULES) + run_main,
+    }
+    for name, code in variants.items():
+        results = [run(code) for _ in range(repeat)]
+        wall_time = min(elapsed for elapsed, _ in results)
+        stderr = results[-1][1]
+        imports = parse_import_times(stderr)
+        package = sum(
+            cumulative
+            for module, (_, cumulative) in imports.items()
+            if module.startswith("zonefile_migrate")
+        )
+        click.echo(
+            f"{name:6} wall {wall_time * 1000:7.1f} ms, "
+            f"zonefile_migrate imports {package / 1000:7.1f} ms"
+        )
+        for module, self_time in slowest_imports(stderr, top):
+            click.echo(f"    {module:50} {self_time / 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
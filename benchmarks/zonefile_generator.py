@@ -0,0 +1,86 @@
+"""
+generates synthetic zonefiles for benchmarking
+"""
+
+import random
+from typing import Dict, Optional, TextIO
+
+# the default probability of a name to have a record of the type, besides its A record
+DEFAULT_MIX = {"AAAA": 0.3, "TXT": 0.1, "MX": 0.05}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    parses a record type mix like 'AAAA=0.3,TXT=0.1'.
+
+    >>> parse_mix('AAAA=0.3,TXT=0.1')
+    {'AAAA': 0.3, 'TXT': 0.1}
+    """
+    result = {}
+    for item in filter(None, mix.split(",")):
+        rectype, _, probability = item.partition("=")
+        result[rectype.strip().upper()] = float(probability)
+    return result
+
+
+def record(rectype: str, i: int, domain_name: str) -> str:
+    """
+    returns the type and data of a generated record of `rectype` for the i-th name.
+    """
+    if rectype == "AAAA":
+        return (
+            f"AAAA 2001:db8::{i >> 16:x}:{i & 0xffff:x}"
+            if i >> 16
+            else f"AAAA 2001:db8::{i:x}"
+        )
+    if rectype == "TXT":
+        return f'TXT "generated record {i}"'
+    if rectype == "MX":
+        return f"MX 10 mail.{domain_name}."
+    if rectype == "CNAME":
+        return f"CNAME alias-{i}.{domain_name}."
+    if rectype == "SRV":
+        return f"SRV 10 5 443 host-{i}.{domain_name}."
+    if rectype == "CAA":
+        return 'CAA 0 issue "letsencrypt.org"'
+    if rectype == "SPF":
+        return f'SPF "v=spf1 ip4:10.0.0.{i & 255} -all"'
+    raise ValueError(f"unsupported record type {rectype}")
+
+
+def generate_zonefile(
+    file: TextIO,
+    domain_name: str,
+    names: int,
+    seed: int = 0,
+    mix: Optional[Dict[str, float]] = None,
+    depth: int = 1,
+    idn_share: float = 0.0,
+):
+    """
+    writes a zonefile for `domain_name` with `names` host names to `file`. Every
+    name has an A record, and a random selection also has records of the types in
+    `mix`, by their probability. CNAME records replace all other records of a name.
+    The names have `depth` labels, and an `idn_share` of them an internationalized
+    label.
+    """
+    rnd = random.Random(seed)
+    mix = DEFAULT_MIX if mix is None else mix
+    file.write(f"$ORIGIN {domain_name}.\n$TTL 3600\n")
+    file.write("@ SOA ns1 hostmaster 1 7200 3600 1209600 300\n")
+    file.write("@ NS ns1\n@ NS ns2\nns1 A 192.0.2.1\nns2 A 192.0.2.2\n")
+    for i in range(names):
+        name = f"host-{i}"
+        if idn_share and rnd.random() < idn_share:
+            name = f"bücher-{i}"
+        for level in range(1, depth):
+            name += f".level{level}-{i % (level + 6)}"
+
+        rectypes = [rectype for rectype, p in mix.items() if rnd.random() < p]
+        if "CNAME" in rectypes:
+            file.write(f"{name} {record('CNAME', i, domain_name)}\n")
+            continue
+
+        file.write(f"{name} A 10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}\n")
+        for rectype in rectypes:
+            file.write(f"{name} {record(rectype, i, domain_name)}\n")
@@ -0,0 +1,52 @@
+"""
+compares the throughput and peak memory of reading a zonefile and generating its
+record sets with easyzone and with the native zonefile parser.
+"""
+import tempfile
+import time
+import tracemalloc
+import click
+from zonefile_migrate.dns_record_set import iter_from_zone
+from zonefile_migrate.utils import zone_readers
+from benchmarks.zonefile_generator import generate_zonefile
+
+
+def read(parser: str, filename: str) -> int:
+    zone = zone_readers[parser]("benchmark.example", filename)
+    return sum(1 for _ in iter_from_zone(zone))
+
+
+def measure(parser: str, filename: str) -> (float, int, int):
+    """
+    returns the elapsed time, number of record sets and peak memory of reading the
+    zonefile with `parser`. The memory is traced in a separate run, as tracing
+    slows down the parsers.
+    """
+    start = time.perf_counter()
+    count = read(parser, filename)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    read(parser, filename)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, count, peak
+
+
+@click.command()
+@click.option("--names", default=50000, help="number of names in the zone")
+def main(names):
+    with tempfile.NamedTemporaryFile("w", suffix=".zone") as file:
+        generate_zonefile(file, "benchmark.example", names)
+        file.flush()
+        for parser in zone_readers:
+            elapsed, count, peak = measure(parser, file.name)
+            click.echo(
+                f"{parser:10} {count} record sets in {elapsed:.3f}s, "
+                f"{count / elapsed:,.0f} record sets/s, "
+                f"peak memory {peak / 1024 / 1024:.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
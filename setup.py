@@ -27,6 +27,7 @@ setup(
     zip_safe=False,
     platforms='any',
     install_requires=dependencies,
+    extras_require={'libyaml': ['PyYAML'], 'route53': ['boto3']},
     setup_requires=[],
     tests_require=dependencies,
     test_suite='tests',
@@ -1,9 +1,76 @@
+import importlib
 import click
-from zonefile_migrate.to_cloudformation import command as to_cfn
-from zonefile_migrate.to_terraform import command as to_tf
 
+# the module and short help of each command. The module of a command is imported
+# only when the command is invoked, so that the dependencies of the other commands
+# are not imported, and the help of the group is shown without importing any.
+commands = {
+    "apply-route53": (
+        "zonefile_migrate.apply_route53",
+        "Applies zonefiles directly to Route53 hosted zones.",
+    ),
+    "cache": (
+        "zonefile_migrate.cache",
+        "Manages the cache of parsed zonefiles.",
+    ),
+    "diff": (
+        "zonefile_migrate.diff",
+        "Compares the record sets of zonefiles and templates.",
+    ),
+    "to-cloudformation": (
+        "zonefile_migrate.to_cloudformation",
+        "Converts zonefiles into CloudFormation templates.",
+    ),
+    "to-terraform": (
+        "zonefile_migrate.to_terraform",
+        "Converts zonefiles into Terraform templates.",
+    ),
+    "watch": (
+        "zonefile_migrate.watch",
+        "Converts zonefiles again whenever they change.",
+    ),
+}
 
-@click.group
+
+class LazyGroup(click.Group):
+    """
+    a group which loads the `command` of the module of a lazy command on first use.
+    """
+
+    def __init__(self, *args, lazy_commands: dict = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> [str]:
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx: click.Context, name: str) -> click.Command:
+        if name in self.lazy_commands and name not in self.commands:
+            module, _ = self.lazy_commands[name]
+            self.add_command(importlib.import_module(module).command, name)
+        return super().get_command(ctx, name)
+
+    def command_short_help(self, name: str, limit: int) -> str:
+        if name in self.lazy_commands and name not in self.commands:
+            return self.lazy_commands[name][1]
+        return self.commands[name].get_short_help_str(limit)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter):
+        names = self.list_commands(ctx)
+        if not names:
+            return
+
+        limit = formatter.width - 6 - max(map(len, names))
+        rows = [
+            (name, self.command_short_help(name, limit))
+            for name in names
+            if name not in self.commands or not self.commands[name].hidden
+        ]
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=commands)
 def main():
     """
     Migrate DNS managed zones
@@ -11,8 +78,5 @@ def main():
     pass
 
 
-main.add_command(to_cfn)
-main.add_command(to_tf)
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+"""
+converts zonefiles in memory, for applications which embed zonefile-migrate instead
+of running its commands on files.
+
+>>> zonefile = '''$ORIGIN example.com.
+... $TTL 300
+... @ SOA ns1 hostmaster 1 7200 3600 1209600 300
+... @ NS ns1
+... www A 10.0.0.1
+... '''
+>>> to_record_sets(zonefile)
+[DNSRecordSet('www.example.com.', 'A', 300, ('10.0.0.1',))]
+>>> list(to_cloudformation(zonefile)["Resources"])
+['HostedZone', 'WwwARecord']
+
+The zones are parsed once: the record sets of a parsed zone are kept in a least
+recently used cache, keyed by the digest of the zonefile and the options it was
+parsed with.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+from zonefile_migrate.diff import iter_migrated_record_sets
+from zonefile_migrate.dns_record_set import DNSRecordSet, iter_from_zone
+from zonefile_migrate.normalize import NormalizedZone
+from zonefile_migrate.to_cloudformation import convert_to_cloudformation
+from zonefile_migrate.to_terraform import convert_to_terraform
+from zonefile_migrate.utils import read_zonefile, zonefile_origin
+
+# the maximum number of record sets of the parsed zones in the cache
+ZONE_CACHE_MAXIMUM_RECORD_SETS = 1000000
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "zones", "record_sets"])
+
+
+class ParsedZone:
+    """
+    the record sets of a parsed zonefile. It has the same `domain` attribute as an
+    easyzone.Zone and generates its record sets when iterated, so it can be passed
+    to the converters instead. Parsed zones are immutable, and shared by all users
+    of the cache.
+    """
+
+    __slots__ = ("domain", "record_sets")
+
+    def __init__(self, domain: str, record_sets: Tuple[DNSRecordSet, ...]):
+        self.domain = domain
+        self.record_sets = record_sets
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        return iter(self.record_sets)
+
+    def __len__(self) -> int:
+        return len(self.record_sets)
+
+
+class ZoneCache:
+    """
+    a thread-safe least recently used cache of parsed zones, bounded by their total
+    number of record sets, so that a few very large zones do not take all memory.
+    """
+
+    def __init__(self, maximum_record_sets: int = ZONE_CACHE_MAXIMUM_RECORD_SETS):
+        self.maximum_record_sets = maximum_record_sets
+        self.zones: OrderedDict[tuple, ParsedZone] = OrderedDict()
+        self.record_sets = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[ParsedZone]:
+        with self.lock:
+            zone = self.zones.get(key)
+            if zone is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.zones.move_to_end(key)
+            return zone
+
+    def put(self, key: tuple, zone: ParsedZone):
+        if len(zone) > self.maximum_record_sets:
+            return
+        with self.lock:
+            previous = self.zones.pop(key, None)
+            if previous is not None:
+                self.record_sets -= len(previous)
+            self.zones[key] = zone
+            self.record_sets += len(zone)
+            while self.record_sets > self.maximum_record_sets:
+                _, evicted = self.zones.popitem(last=False)
+                self.record_sets -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.zones.clear()
+            self.record_sets = self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, len(self.zones), self.record_sets)
+
+
+# the cache of the zones parsed by this module
+zone_cache = ZoneCache()
+
+
+def parse_zone(
+    zonefile: Union[str, bytes],
+    origin: Optional[str] = None,
+    parser: str = "easyzone",
+    normalize: bool = False,
+    maximum_ttl: Optional[int] = None,
+) -> ParsedZone:
+    """
+    returns the parsed `zonefile` text or bytes, from the cache if the same zonefile
+    was parsed with the same options before. The `origin` is the domain name of a
+    zonefile without a $ORIGIN directive. With `normalize`, the record sets are
+    normalised with the `maximum_ttl`. Bytes are decoded as the zonefiles read by
+    the commands, detecting their encoding by the byte order mark.
+    """
+    content = zonefile.encode("utf-8") if isinstance(zonefile, str) else zonefile
+    if origin is None and not zonefile_origin(content):
+        raise ValueError("the zonefile has no $ORIGIN, and no origin was specified")
+
+    key = (
+        hashlib.sha256(content).hexdigest(),
+        origin,
+        parser,
+        normalize,
+        maximum_ttl if normalize else None,
+    )
+    zone = zone_cache.get(key)
+    if zone is not None:
+        return zone
+
+    zone = read_zonefile(Path("<zonefile>"), parser, content, origin)
+    if normalize:
+        zone = NormalizedZone(zone, maximum_ttl)
+    zone = ParsedZone(zone.domain, tuple(iter_from_zone(zone)))
+    zone_cache.put(key, zone)
+    return zone
+
+
+def to_record_sets(
+    zonefile: Union[str, bytes],
+    origin: Optional[str] = None,
+    parser: str = "easyzone",
+    maximum_ttl: Optional[int] = None,
+    normalize: bool = False,
+) -> List[DNSRecordSet]:
+    """
+    returns the record sets of the `zonefile` as they are migrated: without the SOA
+    and NS records of the origin, and with the TTL limited to `maximum_ttl`.
+    """
+    zone = parse_zone(zonefile, origin, parser, normalize, maximum_ttl)
+    return list(iter_migrated_record_sets(zone, maximum_ttl))
+
+
+def to_cloudformation(
+    zonefile: Union[str, bytes],
+    origin: Optional[str] = None,
+    parser: str = "easyzone",
+    maximum_ttl: Optional[int] = None,
+    normalize: bool = False,
+) -> dict:
+    """
+    returns the CloudFormation template of the `zonefile`, with its hosted zone and
+    record sets.
+    """
+    zone = parse_zone(zonefile, origin, parser, normalize, maximum_ttl)
+    return convert_to_cloudformation(zone, maximum_ttl)
+
+
+def to_terraform(
+    zonefile: Union[str, bytes],
+    origin: Optional[str] = None,
+    parser: str = "easyzone",
+    maximum_ttl: Optional[int] = None,
+    normalize: bool = False,
+    provider: str = "google",
+) -> str:
+    """
+    returns the Terraform template of the `zonefile` for the `provider`.
+    """
+    zone = parse_zone(zonefile, origin, parser, normalize, maximum_ttl)
+    return convert_to_terraform(zone, provider, maximum_ttl)
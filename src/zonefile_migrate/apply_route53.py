@@ -0,0 +1,354 @@
+"""
+applies the record sets of zonefiles directly to Route53 hosted zones, with
+ChangeResourceRecordSets requests, instead of through CloudFormation.
+"""
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+import click
+from zonefile_migrate.diff import iter_migrated_record_sets
+from zonefile_migrate.dns_record_set import DNSRecordSet
+from zonefile_migrate.logger import log
+from zonefile_migrate.normalize import NormalizedZone
+from zonefile_migrate.to_cloudformation import (
+    ROUTE53_MAXIMUM_RECORDS,
+    ROUTE53_MAXIMUM_VALUE_SIZE,
+    pack,
+)
+from zonefile_migrate.utils import (
+    conversion_error,
+    get_all_zonefiles_in_path,
+    read_zonefile,
+    zone_readers,
+)
+
+# the maximum number of attempts of a request, on throttling and transient errors
+ROUTE53_MAXIMUM_ATTEMPTS = 10
+
+
+def idna_name(name: str) -> str:
+    """
+    returns the domain `name` as Route53 expects it, with internationalized labels
+    encoded as IDNA.
+
+    >>> idna_name('bücher.example.com.'), idna_name('*.example.com.')
+    ('xn--bcher-kva.example.com.', '*.example.com.')
+    """
+    if name.isascii():
+        return name
+    return ".".join(
+        label if label.isascii() else label.encode("idna").decode("ascii")
+        for label in name.split(".")
+    )
+
+
+def upsert(record_set: DNSRecordSet) -> dict:
+    """
+    returns the UPSERT change of the `record_set`.
+
+    >>> upsert(DNSRecordSet('www.example.com.', 'A', 300, ['10.0.0.1']))
+    {'Action': 'UPSERT', 'ResourceRecordSet': {'Name': 'www.example.com.', 'Type': 'A', 'TTL': 300, 'ResourceRecords': [{'Value': '10.0.0.1'}]}}
+    """
+    return {
+        "Action": "UPSERT",
+        "ResourceRecordSet": {
+            "Name": idna_name(record_set.name),
+            "Type": record_set.rectype,
+            "TTL": record_set.ttl,
+            "ResourceRecords": [{"Value": value} for value in record_set.rrdatas],
+        },
+    }
+
+
+def iter_change_batches(
+    record_sets: Iterable[DNSRecordSet],
+    maximum_records: int = ROUTE53_MAXIMUM_RECORDS,
+    maximum_value_size: int = ROUTE53_MAXIMUM_VALUE_SIZE,
+) -> Iterator[List[dict]]:
+    """
+    generates the UPSERT changes of the `record_sets` in batches within the limits of
+    a ChangeResourceRecordSets request. The records and characters of the values of
+    an UPSERT count twice towards the limits.
+
+    >>> record_sets = [DNSRecordSet(f'{i}.example.com.', 'A', 300, ['10.0.0.1', '10.0.0.2']) for i in range(5)]
+    >>> [len(batch) for batch in iter_change_batches(record_sets, maximum_records=8)]
+    [2, 2, 1]
+    """
+    return pack(
+        map(upsert, record_sets),
+        lambda c: (
+            2 * len(c["ResourceRecordSet"]["ResourceRecords"]),
+            2 * sum(len(r["Value"]) for r in c["ResourceRecordSet"]["ResourceRecords"]),
+        ),
+        maximum_records,
+        maximum_value_size,
+    )
+
+
+def route53_client(
+    endpoint_url: Optional[str] = None,
+    max_pool_connections: int = 10,
+    maximum_attempts: int = ROUTE53_MAXIMUM_ATTEMPTS,
+):
+    """
+    returns a Route53 client, which is shared by the threads applying the zones. The
+    client retries throttled requests in adaptive mode, which limits the rate of the
+    requests of all threads with a token bucket.
+    """
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        retries={"mode": "adaptive", "max_attempts": maximum_attempts},
+    )
+    return boto3.client("route53", endpoint_url=endpoint_url, config=config)
+
+
+def iter_hosted_zones_by_name(client, name: str) -> Iterator[dict]:
+    """
+    generates the public and private hosted zones named `name`, paging through the
+    hosted zones listed by name from `name` on.
+    """
+    request = {"DNSName": name}
+    while True:
+        response = client.list_hosted_zones_by_name(**request)
+        for hosted_zone in response["HostedZones"]:
+            if hosted_zone["Name"] != name:
+                return
+            yield hosted_zone
+        if not response.get("IsTruncated"):
+            return
+        request = {
+            "DNSName": response["NextDNSName"],
+            "HostedZoneId": response["NextHostedZoneId"],
+        }
+
+
+def get_or_create_hosted_zone(client, domain_name: str) -> str:
+    """
+    returns the id of the public hosted zone `domain_name`, which is created if it does
+    not exist yet. Private hosted zones with the same name are ignored. Raises a
+    ValueError if there is more than one public hosted zone with the name, as it is
+    not known which one the records belong in.
+    """
+    name = idna_name(domain_name)
+    public = [
+        hosted_zone["Id"]
+        for hosted_zone in iter_hosted_zones_by_name(client, name)
+        if not hosted_zone["Config"]["PrivateZone"]
+    ]
+    if len(public) > 1:
+        raise ValueError(
+            f"there are {len(public)} public hosted zones named {name}: "
+            + ", ".join(public)
+        )
+    if public:
+        return public[0]
+
+    log.info("creating hosted zone %s", domain_name)
+    response = client.create_hosted_zone(Name=name, CallerReference=str(uuid.uuid4()))
+    return response["HostedZone"]["Id"]
+
+
+def apply_zonefile(
+    client,
+    input: Path,
+    parser: str = "easyzone",
+    maximum_ttl: Optional[int] = None,
+    dry_run: bool = False,
+    normalize: bool = False,
+) -> int:
+    """
+    applies the record sets of the zonefile `input` to its hosted zone, one change
+    batch at a time, as Route53 processes the changes of a hosted zone in order.
+    Returns the number of changes.
+    """
+    zone = read_zonefile(input, parser)
+    if normalize:
+        zone = NormalizedZone(zone, maximum_ttl)
+    start = time.perf_counter()
+    hosted_zone_id = None if dry_run else get_or_create_hosted_zone(client, zone.domain)
+    changes = 0
+    for batch in iter_change_batches(iter_migrated_record_sets(zone, maximum_ttl)):
+        if not dry_run:
+            client.change_resource_record_sets(
+                HostedZoneId=hosted_zone_id, ChangeBatch={"Changes": batch}
+            )
+        changes += len(batch)
+
+    log.info(
+        "%s %d record sets of %s in %.1fs",
+        "would apply" if dry_run else "applied",
+        changes,
+        zone.domain,
+        time.perf_counter() - start,
+    )
+    return changes
+
+
+def apply_zonefiles(
+    client,
+    inputs: [Path],
+    jobs: int = 4,
+    parser: str = "easyzone",
+    maximum_ttl: Optional[int] = None,
+    dry_run: bool = False,
+    normalize: bool = False,
+) -> [Path]:
+    """
+    applies the zonefiles `inputs` concurrently by `jobs` threads, which share the
+    connection pool of the `client`. Returns the zonefiles which failed to apply: an
+    error of a zonefile, or of the requests applying it, is reported and does not
+    stop the other zonefiles.
+    A dry run does not need a `client`.
+    """
+
+    def apply(input: Path) -> Optional[Exception]:
+        try:
+            apply_zonefile(client, input, parser, maximum_ttl, dry_run, normalize)
+        except Exception as error:
+            return error
+        return None
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for input, error in zip(inputs, executor.map(apply, inputs)):
+            if error:
+                log.error("failed to apply %s, %s", input, conversion_error(error))
+                failed.append(input)
+    return failed
+
+
+@click.command(
+    name="apply-route53",
+    short_help="Applies zonefiles directly to Route53 hosted zones.",
+)
+@click.option(
+    "--maximum-ttl",
+    required=False,
+    type=int,
+    help="maximum TTL of domain name records",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    required=False,
+    type=click.IntRange(min=1),
+    default=4,
+    help="number of zones to apply concurrently, defaults to 4",
+)
+@click.option(
+    "--parser",
+    required=False,
+    type=click.Choice(list(zone_readers)),
+    default="easyzone",
+    help="to read the zonefiles with",
+)
+@click.option(
+    "--endpoint-url",
+    required=False,
+    help="of the Route53 API, to apply the zones to a local stand-in",
+)
+@click.option(
+    "--maximum-attempts",
+    required=False,
+    type=click.IntRange(min=1),
+    default=ROUTE53_MAXIMUM_ATTEMPTS,
+    help="of a request which is throttled or fails transiently",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="report the changes without applying them",
+)
+@click.option(
+    "--normalize",
+    is_flag=True,
+    default=False,
+    help="merge duplicate record sets and make the owner names canonical",
+)
+@click.option(
+    "--recursive",
+    "-r",
+    is_flag=True,
+    default=False,
+    help="search the SRC directories recursively for zonefiles",
+)
+@click.option(
+    "--include",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files in SRC directories to apply",
+)
+@click.option(
+    "--exclude",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files and directories in SRC directories to skip",
+)
+@click.argument("src", nargs=-1, type=click.Path())
+def command(
+    maximum_ttl,
+    jobs,
+    parser,
+    endpoint_url,
+    maximum_attempts,
+    dry_run,
+    normalize,
+    recursive,
+    include,
+    exclude,
+    src,
+):
+    """
+    Applies the record sets of one or more `SRC` zonefiles directly to AWS Route53
+    hosted zones, which are created if they do not exist.
+
+    The record sets are upserted with ChangeResourceRecordSets requests, in batches
+    within the limits of the number of records and characters of a request. The SOA
+    and NS records for the origin domain are not applied. Record sets in the hosted
+    zone which are not in the zonefile are left as is.
+
+    The zones are applied concurrently by --jobs threads, which share a connection
+    pool. Throttled requests are retried with adaptive backoff, up to
+    --maximum-attempts times.
+
+    Use --endpoint-url to apply the zones to a local stand-in of the Route53 API, like
+    moto, and --dry-run to report the changes without applying them. A dry run does
+    not connect to Route53, so it needs neither boto3 nor credentials.
+
+    With --normalize, record sets with the same canonical owner name and type are
+    merged into a single change, as Route53 rejects a batch with both.
+    """
+    if not src:
+        raise click.UsageError("no source files were specified")
+
+    try:
+        inputs = get_all_zonefiles_in_path(src, recursive, include, exclude)
+        if not inputs:
+            raise click.UsageError("no zonefiles were found")
+    except ValueError as error:
+        raise click.UsageError(error)
+
+    client = None
+    if not dry_run:
+        try:
+            client = route53_client(endpoint_url, jobs, maximum_attempts)
+        except ImportError:
+            raise click.UsageError(
+                "apply-route53 requires boto3, install zonefile-migrate[route53]"
+            )
+
+    if apply_zonefiles(
+        client, inputs, jobs, parser, maximum_ttl, dry_run, normalize
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    command()
@@ -0,0 +1,284 @@
+"""
+caches the record sets extracted from zonefiles on disk, so that converting the same
+zonefiles again, to another target or with other options, does not parse them again.
+The cache is shared by all commands, and enabled by setting the environment variable
+ZONEFILE_MIGRATE_CACHE to its directory.
+"""
+import hashlib
+import marshal
+import os
+import sys
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+import click
+import dns.version
+from zonefile_migrate.dns_record_set import DNSRecordSet, iter_from_zone
+from zonefile_migrate.logger import log
+from zonefile_migrate.manifest import includes_files, tool_version
+
+# the name of the environment variable with the directory of the cache
+CACHE_VARIABLE = "ZONEFILE_MIGRATE_CACHE"
+
+# the name of the environment variable with the maximum size of the cache in MiB
+CACHE_SIZE_VARIABLE = "ZONEFILE_MIGRATE_CACHE_SIZE"
+
+# the default maximum size of the cache in MiB
+DEFAULT_CACHE_SIZE = 512
+
+# the extension of the files with the record sets of a zonefile
+CACHE_SUFFIX = ".rrsets"
+
+# the number of record sets marshalled at a time, so that large zones are streamed
+CHUNK_SIZE = 4096
+
+# the estimated size of each cache directory used by this process, which is scanned
+# only the first time and when the estimate exceeds the maximum size of the cache
+_cache_sizes: Dict[Path, int] = {}
+
+
+def cache_directory() -> Optional[Path]:
+    """
+    returns the directory of the cache, or None if the cache is not enabled.
+    """
+    directory = os.environ.get(CACHE_VARIABLE)
+    return Path(directory) if directory else None
+
+
+def cache_size() -> int:
+    """
+    returns the maximum size of the cache in bytes.
+    """
+    return int(os.environ.get(CACHE_SIZE_VARIABLE) or DEFAULT_CACHE_SIZE) * 1024 * 1024
+
+
+def cache_path(buffer, domain_name: str, parser: str) -> Optional[Path]:
+    """
+    returns the path in the cache of the record sets of the zonefile in `buffer`,
+    read with the origin `domain_name` by the `parser`. The key is the digest of the
+    zonefile, the parser and the versions of the parsers and of Python, as the marshal
+    format depends on it. Returns None if the cache is not enabled, or if the zonefile
+    includes other files.
+    """
+    directory = cache_directory()
+    if not directory or includes_files(buffer):
+        return None
+
+    digest = hashlib.sha256(buffer)
+    digest.update(
+        repr(
+            (
+                domain_name,
+                parser,
+                tool_version(),
+                dns.version.version,
+                sys.version_info[:2],
+                marshal.version,
+            )
+        ).encode("utf-8")
+    )
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory.joinpath(digest.hexdigest() + CACHE_SUFFIX)
+
+
+class CachedZone:
+    """
+    the record sets of a zonefile loaded from the cache. It has the same `domain`
+    attribute as an easyzone.Zone and generates its record sets when iterated, one
+    chunk at a time. The file is kept open, so that the zone can still be read when
+    it is evicted by another process.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file: BinaryIO = path.open("rb")
+        try:
+            self.domain = marshal.load(self.file)
+        except BaseException:
+            self.file.close()
+            raise
+        self.offset = self.file.tell()
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        self.file.seek(self.offset)
+        while True:
+            try:
+                chunk = marshal.load(self.file)
+            except EOFError:
+                return
+            for record_set in chunk:
+                yield DNSRecordSet(*record_set)
+
+    def __del__(self):
+        if hasattr(self, "file"):
+            self.file.close()
+
+
+def load_cached_zone(path: Path) -> Optional[CachedZone]:
+    """
+    returns the zone cached at `path`, or None if it is not cached. The modification
+    time of a cached zone is updated, so that the least recently used zones are
+    evicted first.
+    """
+    try:
+        zone = CachedZone(path)
+    except FileNotFoundError:
+        return None
+    except (EOFError, ValueError, TypeError):
+        log.warning("ignoring corrupt cache entry %s", path)
+        return None
+
+    os.utime(path)
+    return zone
+
+
+class CachingZone:
+    """
+    a zone which stores its record sets in the cache at `path` the first time they
+    are generated completely. All other attributes are those of the `zone`.
+    """
+
+    def __init__(self, zone, path: Path):
+        self.zone = zone
+        self.path = path
+        self.stored = False
+
+    def __getattr__(self, name):
+        return getattr(self.zone, name)
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        if self.stored:
+            yield from iter_from_zone(self.zone)
+            return
+
+        temporary = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with temporary.open("xb") as file:
+                marshal.dump(self.zone.domain, file)
+                chunk = []
+                for record_set in iter_from_zone(self.zone):
+                    chunk.append(
+                        (
+                            record_set.name,
+                            record_set.rectype,
+                            record_set.ttl,
+                            record_set.rrdatas,
+                        )
+                    )
+                    if len(chunk) == CHUNK_SIZE:
+                        marshal.dump(chunk, file)
+                        chunk = []
+                    yield record_set
+                marshal.dump(chunk, file)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+
+        os.replace(temporary, self.path)
+        self.stored = True
+        stored(self.path.parent, self.path.stat().st_size)
+
+
+def _cache_entries(directory: Path) -> Iterator[Tuple[float, int, Path]]:
+    for path in directory.glob(f"*{CACHE_SUFFIX}"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        yield stat.st_mtime, stat.st_size, path
+
+
+def _evict(directory: Path, maximum_size: int) -> Tuple[int, int]:
+    entries = sorted(_cache_entries(directory))
+    size = sum(entry[1] for entry in entries)
+    removed = 0
+    for _, entry_size, path in entries:
+        if size <= maximum_size:
+            break
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            continue
+        size -= entry_size
+        removed += 1
+    _cache_sizes[directory] = size
+    return removed, size
+
+
+def evict(directory: Path, maximum_size: int) -> int:
+    """
+    removes the least recently used zones from the cache in `directory` until its
+    size is at most `maximum_size` bytes. Returns the number of zones removed.
+    """
+    return _evict(directory, maximum_size)[0]
+
+
+def stored(directory: Path, size: int):
+    """
+    accounts for a zone of `size` bytes stored in the cache in `directory`, and
+    evicts the least recently used zones if the cache may exceed its maximum size.
+    The size of the cache is estimated, so that the directory is not scanned for
+    every zone stored. As the zones stored by other processes are not in the
+    estimate, the cache may exceed its maximum size by those until the next scan.
+    """
+    estimate = _cache_sizes.get(directory)
+    if estimate is None:
+        estimate = sum(entry[1] for entry in _cache_entries(directory))
+    else:
+        estimate += size
+    _cache_sizes[directory] = estimate
+
+    maximum_size = cache_size()
+    if estimate > maximum_size:
+        _evict(directory, maximum_size)
+
+
+def clear(directory: Path) -> Tuple[int, int]:
+    """
+    removes all zones from the cache in `directory`, including those which were
+    being written. Returns the number of zones and bytes removed.
+    """
+    _cache_sizes.pop(directory, None)
+    entries = list(_cache_entries(directory))
+    for _, _, path in entries:
+        path.unlink(missing_ok=True)
+    for path in directory.glob(f".*{CACHE_SUFFIX}.*.tmp"):
+        path.unlink(missing_ok=True)
+    return len(entries), sum(entry[1] for entry in entries)
+
+
+@click.group(name="cache", short_help="Manages the cache of parsed zonefiles.")
+def command():
+    """
+    Manages the cache of the record sets of parsed zonefiles, which is enabled by
+    setting the environment variable ZONEFILE_MIGRATE_CACHE to its directory.
+    """
+    pass
+
+
+@command.command(name="clear")
+@click.option(
+    "--directory",
+    required=True,
+    envvar=CACHE_VARIABLE,
+    type=click.Path(file_okay=False),
+    help="of the cache, defaults to $ZONEFILE_MIGRATE_CACHE",
+)
+def clear_command(directory):
+    """
+    Removes all zones from the cache.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return
+    zones, size = clear(directory)
+    log.info(
+        "removed %d zones of %.1f MiB from the cache %s",
+        zones,
+        size / 1024 / 1024,
+        directory,
+    )
+
+
+if __name__ == "__main__":
+    command()
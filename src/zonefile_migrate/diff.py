@@ -0,0 +1,234 @@
+import json
+import sys
+import click
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from ruamel.yaml import YAML
+from ruamel.yaml.constructor import SafeConstructor
+from zonefile_migrate.dns_record_set import DNSRecordSet, iter_from_zone
+from zonefile_migrate.normalize import NormalizedZone
+from zonefile_migrate.utils import read_zonefile, zone_readers
+
+# the suffixes of files which are read as CloudFormation templates
+TEMPLATE_SUFFIXES = (".yaml", ".yml", ".json")
+
+RecordSetIndex = Dict[Tuple[str, str], DNSRecordSet]
+
+
+class _TemplateConstructor(SafeConstructor):
+    """
+    constructs the value of the node of CloudFormation short form intrinsic functions,
+    like !Ref, without the tag.
+    """
+
+    def construct_undefined(self, node):
+        if hasattr(node, "value") and isinstance(node.value, list):
+            if node.value and isinstance(node.value[0], tuple):
+                return self.construct_mapping(node)
+            return self.construct_sequence(node)
+        return self.construct_scalar(node)
+
+
+_TemplateConstructor.add_constructor(None, _TemplateConstructor.construct_undefined)
+
+
+def load_template(path: Path) -> dict:
+    with path.open("r") as file:
+        if path.suffix == ".json":
+            return json.load(file)
+        yaml = YAML(typ="safe", pure=True)
+        yaml.Constructor = _TemplateConstructor
+        return yaml.load(file)
+
+
+def iter_template_record_sets(path: Path) -> Iterator[DNSRecordSet]:
+    """
+    generates the record sets of the AWS::Route53::RecordSet and RecordSetGroup
+    resources in the CloudFormation template at `path`. If the template was split,
+    the record sets of the child templates are generated as well.
+    """
+    template = load_template(path)
+    for resource in (template.get("Resources") or {}).values():
+        properties = resource.get("Properties", {})
+        if resource.get("Type") == "AWS::Route53::RecordSet":
+            record_sets = [properties]
+        elif resource.get("Type") == "AWS::Route53::RecordSetGroup":
+            record_sets = properties.get("RecordSets", [])
+        else:
+            continue
+
+        for r in record_sets:
+            yield DNSRecordSet(
+                r["Name"],
+                r["Type"],
+                int(r["TTL"]) if "TTL" in r else None,
+                [str(v) for v in r.get("ResourceRecords", [])],
+            )
+
+    if "HostedZoneId" in (template.get("Outputs") or {}):
+        part = 1
+        while (child := path.with_name(f"{path.stem}-{part}{path.suffix}")).exists():
+            yield from iter_template_record_sets(child)
+            part += 1
+
+
+def iter_migrated_record_sets(
+    zone, maximum_ttl: Optional[int]
+) -> Iterator[DNSRecordSet]:
+    """
+    generates the record sets of the `zone` as they are migrated: without the SOA and
+    NS records of the origin, and with the TTL limited to `maximum_ttl`.
+    """
+    origins = [zone.domain, zone.domain.encode("idna").decode("ascii")]
+    for record_set in iter_from_zone(zone):
+        if record_set.name in origins and record_set.rectype in ["NS", "SOA"]:
+            continue
+        if maximum_ttl and record_set.ttl > maximum_ttl:
+            record_set = DNSRecordSet(
+                record_set.name, record_set.rectype, maximum_ttl, record_set.rrdatas
+            )
+        yield record_set
+
+
+def iter_zonefile_record_sets(
+    path: Path, parser: str, maximum_ttl: Optional[int], normalize: bool = False
+) -> Iterator[DNSRecordSet]:
+    """
+    generates the record sets of the zonefile at `path` as they are migrated,
+    optionally normalised.
+    """
+    zone = read_zonefile(path, parser)
+    if normalize:
+        zone = NormalizedZone(zone, maximum_ttl)
+    return iter_migrated_record_sets(zone, maximum_ttl)
+
+
+def index_record_sets(
+    path: Path,
+    parser: str = "easyzone",
+    maximum_ttl: Optional[int] = None,
+    normalize: bool = False,
+) -> RecordSetIndex:
+    """
+    returns the record sets of the zonefile or CloudFormation template at `path`,
+    indexed by name and type.
+    """
+    if path.suffix in TEMPLATE_SUFFIXES:
+        record_sets = iter_template_record_sets(path)
+    else:
+        record_sets = iter_zonefile_record_sets(path, parser, maximum_ttl, normalize)
+    return {(r.name, r.rectype): r for r in record_sets}
+
+
+def record_set_to_dict(record_set: DNSRecordSet) -> dict:
+    return {
+        "name": record_set.name,
+        "type": record_set.rectype,
+        "ttl": record_set.ttl,
+        "rrdatas": list(record_set.rrdatas),
+    }
+
+
+def diff_record_sets(old: RecordSetIndex, new: RecordSetIndex) -> dict:
+    """
+    returns the record sets which were added, removed and changed from `old` to
+    `new`. A record set has changed if its TTL or its set of values differ.
+
+    >>> old = {('a.', 'A'): DNSRecordSet('a.', 'A', 300, ['10.0.0.1', '10.0.0.2'])}
+    >>> new = {('a.', 'A'): DNSRecordSet('a.', 'A', 300, ['10.0.0.2', '10.0.0.1'])}
+    >>> diff_record_sets(old, new)
+    {'added': [], 'removed': [], 'changed': []}
+    >>> new[('b.', 'A')] = DNSRecordSet('b.', 'A', 300, ['10.0.0.3'])
+    >>> new[('a.', 'A')] = DNSRecordSet('a.', 'A', 60, ['10.0.0.1', '10.0.0.2'])
+    >>> result = diff_record_sets(old, new)
+    >>> [r['name'] for r in result['added']], result['changed'][0]['new']['ttl']
+    (['b.'], 60)
+    """
+    added, changed = [], []
+    for key, record_set in new.items():
+        previous = old.get(key)
+        if previous is None:
+            added.append(record_set_to_dict(record_set))
+        elif previous.ttl != record_set.ttl or sorted(previous.rrdatas) != sorted(
+            record_set.rrdatas
+        ):
+            changed.append(
+                {
+                    "name": record_set.name,
+                    "type": record_set.rectype,
+                    "old": record_set_to_dict(previous),
+                    "new": record_set_to_dict(record_set),
+                }
+            )
+    removed = [record_set_to_dict(r) for key, r in old.items() if key not in new]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+@click.command(
+    name="diff",
+    short_help="Compares the record sets of zonefiles and templates.",
+)
+@click.option(
+    "--maximum-ttl",
+    required=False,
+    type=int,
+    help="maximum TTL of domain name records in zonefiles",
+)
+@click.option(
+    "--parser",
+    required=False,
+    type=click.Choice(list(zone_readers)),
+    default="easyzone",
+    help="to read the zonefiles with",
+)
+@click.option(
+    "--normalize",
+    is_flag=True,
+    default=False,
+    help="normalise the record sets of zonefiles",
+)
+@click.option(
+    "--output",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="to write the differences to, instead of stdout",
+)
+@click.option(
+    "--exit-code",
+    is_flag=True,
+    default=False,
+    help="exit with 1 if there are differences",
+)
+@click.argument("old", nargs=1, type=click.Path(exists=True, dir_okay=False))
+@click.argument("new", nargs=1, type=click.Path(exists=True, dir_okay=False))
+def command(maximum_ttl, parser, normalize, output, exit_code, old, new):
+    """
+    Compares the record sets of the zonefile or CloudFormation template `OLD` with those
+    of the zonefile or CloudFormation template `NEW`.
+
+    Files with the extension .yaml, .yml or .json are read as CloudFormation templates,
+    including their child templates if they were split. The SOA and NS records for the
+    origin domain of a zonefile are ignored, as they are not migrated. Use --maximum-ttl
+    to compare a zonefile with a template generated with the same option, and
+    --normalize to compare it with a template generated with --normalize.
+
+    The record sets which were added, removed or changed are written as JSON.
+    """
+    differences = diff_record_sets(
+        index_record_sets(Path(old), parser, maximum_ttl, normalize),
+        index_record_sets(Path(new), parser, maximum_ttl, normalize),
+    )
+    if output:
+        with open(output, "w") as file:
+            json.dump(differences, file, indent=2)
+            file.write("\n")
+    else:
+        json.dump(differences, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if exit_code and any(differences.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    command()
@@ -1,18 +1,70 @@
 import logging
+import sys
+from typing import Iterable, Iterator
+import dns.rdataclass
+import dns.rdatatype
 from easyzone import easyzone
 from dns.rdatatype import _by_text as DNSRecordTypes
 
+# the order and name of the record types in which record sets are generated, by type value
+_record_types: dict[int, (int, str)] = {
+    value: (order, rectype)
+    for order, (rectype, value) in enumerate(DNSRecordTypes.items())
+}
+
 
 class DNSRecordSet:
     """
-    a simple DNS record set representation
+    a simple DNS record set representation. Record sets are immutable and hashable,
+    with interned owner names and types and a tuple of values, so that the many record
+    sets of large zones share their strings and take little memory.
+
+    >>> record_set = DNSRecordSet('www.example.com.', 'A', 300, ['10.0.0.1'])
+    >>> record_set.rrdatas
+    ('10.0.0.1',)
+    >>> record_set == DNSRecordSet('www.example.com.', 'A', 300, ('10.0.0.1',))
+    True
+    >>> record_set.ttl = 60
+    Traceback (most recent call last):
+    ...
+    AttributeError: DNSRecordSet is immutable
     """
 
-    def __init__(self, name: str, rectype: str, ttl: int, rrdatas: list[str]):
-        self.name = name
-        self.rectype = rectype
-        self.ttl = ttl
-        self.rrdatas = rrdatas
+    __slots__ = ("name", "rectype", "ttl", "rrdatas")
+
+    def __init__(self, name: str, rectype: str, ttl: int, rrdatas: Iterable[str]):
+        object.__setattr__(self, "name", sys.intern(name))
+        object.__setattr__(self, "rectype", sys.intern(rectype))
+        object.__setattr__(self, "ttl", ttl)
+        object.__setattr__(self, "rrdatas", tuple(rrdatas))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("DNSRecordSet is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("DNSRecordSet is immutable")
+
+    def __reduce__(self):
+        return DNSRecordSet, (self.name, self.rectype, self.ttl, self.rrdatas)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DNSRecordSet):
+            return NotImplemented
+        return (
+            self.name == other.name
+            and self.rectype == other.rectype
+            and self.ttl == other.ttl
+            and self.rrdatas == other.rrdatas
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.rectype, self.ttl, self.rrdatas))
+
+    def __repr__(self) -> str:
+        return (
+            f"DNSRecordSet({self.name!r}, {self.rectype!r}, {self.ttl!r}, "
+            f"{self.rrdatas!r})"
+        )
 
     @staticmethod
     def create_from_easyzone(
@@ -23,19 +75,46 @@ class DNSRecordSet:
         """
         rrdatas = records.items
         if len(rrdatas) > 0 and isinstance(rrdatas[0], (tuple, list)):
-            rrdatas = list(map(lambda r: " ".join(map(lambda v: str(v), r)), rrdatas))
+            rrdatas = map(lambda r: " ".join(map(lambda v: str(v), r)), rrdatas)
 
         return DNSRecordSet(name.name, records.type, name.ttl, rrdatas)
 
 
-def create_from_zone(zone: easyzone.Zone) -> [DNSRecordSet]:
-    result: [DNSRecordSet] = []
-    for key, name in zone.names.items():
-        for rectype in DNSRecordTypes.keys():
+def record_types(name: easyzone.Name) -> [str]:
+    """
+    returns the types of the IN class record sets of `name`, in the order
+    of the dnspython record type table.
+    """
+    rectypes = sorted(
+        _record_types[rdataset.rdtype]
+        for rdataset in name._node.rdatasets
+        if rdataset.rdclass == dns.rdataclass.IN
+        and rdataset.covers == dns.rdatatype.NONE
+        and rdataset.rdtype in _record_types
+    )
+    return [rectype for _, rectype in rectypes]
+
+
+def iter_from_zone(zone: easyzone.Zone) -> Iterator[DNSRecordSet]:
+    """
+    generates the record sets of the zone one name at a time, so that the record
+    sets of very large zones do not have to be held in memory. A zone read by the
+    native zonefile parser generates its own record sets.
+    """
+    if not isinstance(zone, easyzone.Zone):
+        yield from zone
+        return
+
+    default_ttl = easyzone.soa_from_node(zone._zone[zone.domain]).minimum
+    for key in zone._zone.keys():
+        name = easyzone.Name(str(key), zone._zone[key], default_ttl)
+        for rectype in record_types(name):
             records = name.records(rectype)
             if not records:
                 continue
 
-            result.append(DNSRecordSet.create_from_easyzone(name, records))
+            yield DNSRecordSet.create_from_easyzone(name, records)
 
-    return result
+
+def create_from_zone(zone: easyzone.Zone) -> [DNSRecordSet]:
+    return list(iter_from_zone(zone))
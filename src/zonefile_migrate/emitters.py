@@ -0,0 +1,259 @@
+"""
+emitters of CloudFormation templates, which write a template in parts: the sections
+before the Resources, each resource, and the sections after the Resources. This
+allows the templates to be written while the resources are generated.
+"""
+
+import json
+import re
+from functools import lru_cache
+from io import StringIO
+from textwrap import indent
+from ruamel.yaml import YAML
+from ruamel.yaml.comments import TaggedScalar
+from ruamel.yaml.nodes import ScalarNode
+from ruamel.yaml.resolver import VersionedResolver
+
+# the line width of the YAML output
+YAML_WIDTH = 80
+
+# the length of a key, with its tag !!str, from which ruamel.yaml emits the key as an
+# explicit key "? key"
+MAX_SIMPLE_KEY_LENGTH = 128 - len("!!str")
+
+# the YAML of plain and single quoted scalars, see FastYAMLEmitter
+_word = re.compile(r"[A-Za-z0-9_.()/+=$-]+(:+[A-Za-z0-9_.()/+=$-]+)*")
+_quotable = re.compile(r"[\x21-\x26\x28-\x7e]+( [\x21-\x26\x28-\x7e]+)*")
+_indicators = '#,[]{}&*!|>"%@`'
+_resolver = VersionedResolver()
+
+
+class YAMLEmitter:
+    """
+    emits the template as YAML with ruamel.yaml. The resources are dumped as a
+    top-level mapping and indented, so the line width is reduced by the indent to
+    wrap long values at the same column as a dump of the whole template.
+    """
+
+    extension = ".yaml"
+    separator = ""
+
+    def __init__(self):
+        self.yaml = YAML()
+        self.resource_yaml = YAML()
+        self.resource_yaml.width = YAML_WIDTH - 2
+
+    def dump(self, yaml: YAML, data: dict) -> str:
+        buffer = StringIO()
+        yaml.dump(data, stream=buffer)
+        return buffer.getvalue()
+
+    def head(self, sections: dict) -> str:
+        """
+        returns the `sections` before the Resources and the start of the Resources.
+        """
+        return self.dump(self.yaml, sections) + "Resources:\n"
+
+    def resource(self, logical_name: str, resource: dict) -> str:
+        """
+        returns the resource, to go into the Resources section.
+        """
+        return indent(self.dump(self.resource_yaml, {logical_name: resource}), "  ")
+
+    def tail(self, sections: dict) -> str:
+        """
+        returns the end of the Resources and the `sections` after the Resources.
+        """
+        return self.dump(self.yaml, sections) if sections else ""
+
+
+class _Unsupported(Exception):
+    pass
+
+
+@lru_cache(maxsize=4096)
+def _scalar(value: str) -> str:
+    if not value:
+        raise _Unsupported(value)
+    if (
+        value[0] in _indicators
+        or value.startswith("- ")
+        or value == "-"
+        or _resolver.resolve(ScalarNode, value, (True, False))
+        != "tag:yaml.org,2002:str"
+    ):
+        if _quotable.fullmatch(value):
+            return f"'{value}'"
+    elif all(_word.fullmatch(w) for w in value.split(" ")):
+        return value
+    raise _Unsupported(value)
+
+
+class FastYAMLEmitter(YAMLEmitter):
+    """
+    emits the resources as YAML without ruamel.yaml, if all of their values are
+    scalars which are known to be emitted the same as ruamel.yaml does: plain or
+    single quoted scalars on a line within the line width. Other resources are
+    dumped by ruamel.yaml, so the output is identical.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.width = YAML_WIDTH - 2
+
+    def scalar(self, value: str) -> str:
+        """
+        returns the YAML of the string `value`, or raises _Unsupported.
+
+        >>> emitter = FastYAMLEmitter()
+        >>> emitter.scalar('10 mail.example.com.'), emitter.scalar('*.example.com.')
+        ('10 mail.example.com.', "'*.example.com.'")
+        >>> emitter.scalar('"v=spf1 -all"'), emitter.scalar('300')
+        ('\\'"v=spf1 -all"\\'', "'300'")
+        """
+        return _scalar(value)
+
+    def value(self, value, column: int) -> str:
+        if isinstance(value, str):
+            result = self.scalar(value)
+            if " " in result and column + len(result) > self.width:
+                raise _Unsupported(value)
+            return result
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value)
+        if isinstance(value, TaggedScalar) and value.style is None:
+            result = f"{value.tag.value} {self.scalar(value.value)}"
+            if column + len(result) > self.width:
+                raise _Unsupported(value)
+            return result
+        raise _Unsupported(value)
+
+    def mapping(
+        self, mapping: dict, level: int, lines: list, seen: set, first: str = ""
+    ):
+        """
+        appends the lines of the block `mapping` at `level` to `lines`. The first
+        line is prefixed with `first`, for a mapping in a sequence. Collections which
+        are `seen` before are emitted as aliases by ruamel.yaml, so not supported.
+        """
+        if not mapping or id(mapping) in seen:
+            raise _Unsupported(mapping)
+        seen.add(id(mapping))
+        prefix = " " * level
+        for key, value in mapping.items():
+            if (
+                not isinstance(key, str)
+                or len(key) >= MAX_SIMPLE_KEY_LENGTH
+                or self.scalar(key) != key
+            ):
+                raise _Unsupported(key)
+            start = first or prefix
+            first = ""
+            if isinstance(value, dict):
+                lines.append(f"{start}{key}:")
+                self.mapping(value, level + 2, lines, seen)
+            elif isinstance(value, list):
+                if not value or id(value) in seen:
+                    raise _Unsupported(value)
+                seen.add(id(value))
+                lines.append(f"{start}{key}:")
+                for item in value:
+                    if isinstance(item, dict):
+                        self.mapping(item, level + 2, lines, seen, prefix + "- ")
+                    else:
+                        item = self.value(item, level + 2)
+                        lines.append(f"{prefix}- {item}")
+            else:
+                value = self.value(value, level + len(key) + 2)
+                lines.append(f"{start}{key}: {value}")
+
+    def resource(self, logical_name: str, resource: dict) -> str:
+        try:
+            lines = []
+            self.mapping({logical_name: resource}, 0, lines, set())
+            return "".join(f"  {line}\n" for line in lines)
+        except _Unsupported:
+            return super().resource(logical_name, resource)
+
+    def document(self, data: dict) -> str:
+        """
+        returns the YAML document of the mapping `data`, like a Sceptre stack config.
+
+        >>> FastYAMLEmitter().document({'template_path': 'dns/example.com.yaml',
+        ...     'parameters': {'HostedZoneId': TaggedScalar(
+        ...         value='dns/zone.yaml::HostedZoneId', tag='!stack_output')}})
+        'template_path: dns/example.com.yaml\\nparameters:\\n  HostedZoneId: !stack_output dns/zone.yaml::HostedZoneId\\n'
+        """
+        try:
+            lines = []
+            self.mapping(data, 0, lines, set())
+            return "".join(f"{line}\n" for line in lines)
+        except _Unsupported:
+            return self.dump(self.yaml, data)
+
+
+class LibYAMLEmitter(YAMLEmitter):
+    """
+    emits the template as YAML with the C-accelerated safe dumper of PyYAML, which
+    is an optional dependency.
+    """
+
+    def __init__(self):
+        super().__init__()
+        import yaml
+
+        self.pyyaml = yaml
+        self.dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+    def dump(self, yaml: YAML, data: dict) -> str:
+        return self.pyyaml.dump(
+            data,
+            Dumper=self.dumper,
+            width=yaml.width or YAML_WIDTH,
+            sort_keys=False,
+            default_flow_style=False,
+            allow_unicode=True,
+        )
+
+
+class JSONEmitter:
+    """
+    emits the template as JSON, identical to json.dumps of the whole template with
+    an indent of 2.
+    """
+
+    extension = ".json"
+    separator = ",\n"
+
+    def sections(self, sections: dict) -> str:
+        return json.dumps(sections, indent=2)[2:-2]
+
+    def head(self, sections: dict) -> str:
+        return "{\n" + self.sections(sections) + ',\n  "Resources": {\n'
+
+    def resource(self, logical_name: str, resource: dict) -> str:
+        content = indent(json.dumps(resource, indent=2), "    ").lstrip()
+        return f"    {json.dumps(logical_name)}: {content}"
+
+    def tail(self, sections: dict) -> str:
+        if not sections:
+            return "\n  }\n}\n"
+        return "\n  },\n" + self.sections(sections) + "\n}\n"
+
+
+# the emitters of the YAML templates, by name
+yaml_emitters = {
+    "fast": FastYAMLEmitter,
+    "ruamel": YAMLEmitter,
+    "libyaml": LibYAMLEmitter,
+}
+
+
+@lru_cache(maxsize=None)
+def get_emitter(format: str = "yaml", yaml_emitter: str = "fast"):
+    """
+    returns the emitter of templates in `format`, which is created once per process.
+    """
+    if format == "json":
+        return JSONEmitter()
+    return yaml_emitters[yaml_emitter]()
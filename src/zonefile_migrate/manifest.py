@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import re
+from importlib.metadata import version, PackageNotFoundError
+from pathlib import Path
+from typing import Optional
+from zonefile_migrate.logger import log
+
+# the name of the manifest in the destination directory
+MANIFEST_NAME = ".zonefile-migrate.json"
+
+# the version of the layout of the manifest
+MANIFEST_VERSION = 1
+
+# the $INCLUDE directive, as the content of the included files is not in the digest
+_include = re.compile(rb"^[ \t]*\$INCLUDE\b", re.MULTILINE | re.IGNORECASE)
+
+
+def tool_version() -> str:
+    """
+    returns the version of zonefile-migrate, which is part of the conversion options
+    as a new version may generate different output.
+    """
+    try:
+        return version("zonefile-migrate")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def options_digest(options: dict) -> str:
+    """
+    returns the digest of the conversion `options` and the version of the tool.
+
+    >>> options_digest({'a': 1, 'b': None}) == options_digest({'b': None, 'a': 1})
+    True
+    >>> options_digest({'a': 1}) == options_digest({'a': 2})
+    False
+    """
+    content = json.dumps(
+        {"version": tool_version(), "options": options}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def includes_files(content: bytes) -> bool:
+    """
+    returns true if the zonefile `content` includes other files with $INCLUDE.
+
+    >>> includes_files(b'$TTL 300\\n  $include other.zone\\n')
+    True
+    >>> includes_files(b'; $INCLUDE other.zone\\n')
+    False
+    """
+    return _include.search(content) is not None
+
+
+def zonefile_digest(path: Path) -> Optional[str]:
+    """
+    returns the sha256 digest of the content of the zonefile at `path`, or None if it
+    includes other files, as a change of those would not change the digest.
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        for line in file:
+            if _include.match(line):
+                return None
+            digest.update(line)
+    return digest.hexdigest()
+
+
+def manifest_path(dst: Path) -> Path:
+    """
+    returns the path of the manifest for the destination `dst`, which is either the
+    destination directory or the single output file.
+
+    >>> manifest_path(Path('.')).as_posix()
+    '.zonefile-migrate.json'
+    """
+    directory = dst if dst.is_dir() else dst.parent
+    return directory.joinpath(MANIFEST_NAME)
+
+
+class Manifest:
+    """
+    records the digest of each zonefile and of the conversion options of the output
+    generated from it, so that unchanged zonefiles are not converted again. The
+    entries are keyed by the path of the output, relative to the manifest.
+    """
+
+    def __init__(self, path: Path, options: dict, force: bool = False):
+        self.path = path
+        self.options = options_digest(options)
+        self.force = force
+        self.entries = {}
+        self.digests = {}
+        if path.exists():
+            try:
+                content = json.loads(path.read_text())
+                if content.get("version") == MANIFEST_VERSION:
+                    self.entries = content.get("outputs", {})
+            except (ValueError, AttributeError) as error:
+                log.warning("ignoring invalid manifest %s, %s", path, error)
+
+    def key(self, output: Path) -> str:
+        return Path(
+            os.path.relpath(output.absolute(), self.path.parent.absolute())
+        ).as_posix()
+
+    def digest(self, input: Path) -> Optional[str]:
+        if input not in self.digests:
+            self.digests[input] = zonefile_digest(input)
+        return self.digests[input]
+
+    def forget(self, input: Path):
+        """
+        forgets the digest of `input`, as its content changed since it was computed.
+        """
+        self.digests.pop(input, None)
+
+    def is_current(self, input: Path, output: Path) -> bool:
+        """
+        returns true if `output` exists and was generated from the current content of
+        `input` with the same options, unless a rebuild is forced. A zonefile which
+        includes other files is never current.
+        """
+        if self.force or not output.exists():
+            return False
+        entry = self.entries.get(self.key(output))
+        digest = self.digest(input)
+        return (
+            entry is not None
+            and digest is not None
+            and entry.get("options") == self.options
+            and entry.get("digest") == digest
+        )
+
+    def update(self, input: Path, output: Path, content: Optional[bytes] = None):
+        """
+        records that `output` was generated from the current content of `input`, or
+        from its `content` as it was read for the conversion.
+        """
+        if content is None:
+            digest = self.digest(input)
+        elif includes_files(content):
+            digest = None
+        else:
+            digest = hashlib.sha256(content).hexdigest()
+        self.entries[self.key(output)] = {
+            "source": input.absolute().as_posix(),
+            "digest": digest,
+            "options": self.options,
+        }
+
+    def stale(self) -> [Path]:
+        """
+        returns the outputs of which the zonefile no longer exists. Entries of outputs
+        which were removed are dropped from the manifest.
+        """
+        result = []
+        for key, entry in list(self.entries.items()):
+            output = self.path.parent.joinpath(key)
+            if not output.exists():
+                del self.entries[key]
+            elif not Path(entry["source"]).exists():
+                result.append(output)
+        return result
+
+    def save(self):
+        content = {"version": MANIFEST_VERSION, "outputs": self.entries}
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps(content, indent=2, sort_keys=True) + "\n")
+        temporary.replace(self.path)
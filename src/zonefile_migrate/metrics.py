@@ -0,0 +1,246 @@
+"""
+measures the time spent in each stage of the conversion of the zonefiles, and the
+number of records, record sets and bytes of each zone.
+"""
+import cProfile
+import json
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+from zonefile_migrate.dns_record_set import DNSRecordSet, iter_from_zone
+
+try:
+    import resource
+except ImportError:  # pragma: no cover, not available on Windows
+    resource = None
+
+# the files of the process on Linux with its peak RSS, and to reset it with
+_proc_status = Path("/proc/self/status")
+_proc_clear_refs = Path("/proc/self/clear_refs")
+
+# the peak resident set size of the process in bytes before it was last reset
+_peak_rss_before_reset = 0
+
+
+def peak_rss() -> Optional[int]:
+    """
+    returns the peak resident set size of the process in bytes, if available,
+    including the peaks before it was reset by reset_peak_rss.
+    """
+    if not resource:
+        return None
+    maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    maximum = maximum if sys.platform == "darwin" else maximum * 1024
+    return max(maximum, _peak_rss_before_reset)
+
+
+def reset_peak_rss() -> bool:
+    """
+    resets the peak resident set size of the process to its current size, so that
+    the peak of the conversion of a single zone can be measured. This is supported
+    on Linux only. Returns true if the peak was reset.
+
+    As the kernel resets the peak reported by getrusage as well, the peak before
+    the reset is kept, to be reported by peak_rss.
+    """
+    global _peak_rss_before_reset
+    peak = peak_rss()
+    try:
+        _proc_clear_refs.write_text("5")
+    except OSError:
+        return False
+    _peak_rss_before_reset = max(_peak_rss_before_reset, peak or 0)
+    return True
+
+
+def peak_rss_since_reset() -> Optional[int]:
+    """
+    returns the peak resident set size of the process in bytes since it was reset by
+    reset_peak_rss, if available.
+    """
+    try:
+        status = _proc_status.read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+class MeasuredZone:
+    """
+    a zone which measures the time spent generating its record sets, and counts the
+    record sets and records. All other attributes are those of the `zone`.
+    """
+
+    def __init__(self, zone, metrics: "ZoneMetrics"):
+        self.zone = zone
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.zone, name)
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        values = self.metrics.values
+        record_sets = iter_from_zone(self.zone)
+        while True:
+            start = time.perf_counter()
+            record_set = next(record_sets, None)
+            values["extract_seconds"] += time.perf_counter() - start
+            if record_set is None:
+                return
+            values["record_sets"] += 1
+            values["records"] += len(record_set.rrdatas)
+            yield record_set
+
+
+class ZoneMetrics:
+    """
+    the metrics of the conversion of the zonefile `input` into `output`. As the
+    templates are written while the record sets are generated, the time spent in the
+    extraction of the record sets is subtracted from that of the write stage.
+
+    The peak RSS of the process is reset when the metrics are created, and read at
+    the end of each stage, so that it is the peak during the conversion of this zone
+    rather than that of the largest zone converted before by the process. Where it
+    cannot be reset, the peak RSS of the zone is None.
+    """
+
+    def __init__(self, input: Path, output: Path):
+        self.output = output
+        self.values = {
+            "zonefile": input.as_posix(),
+            "output": output.as_posix(),
+            "domain_name": None,
+            "seconds": 0.0,
+            "parse_seconds": 0.0,
+            "extract_seconds": 0.0,
+            "write_seconds": 0.0,
+            "record_sets": 0,
+            "records": 0,
+            "input_bytes": input.stat().st_size,
+            "output_bytes": None,
+            "peak_rss": None,
+        }
+        self.measures_peak_rss = reset_peak_rss()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.values[f"{name}_seconds"] += time.perf_counter() - start
+            if self.measures_peak_rss:
+                self.values["peak_rss"] = peak_rss_since_reset()
+
+    def measure(self, zone) -> MeasuredZone:
+        self.values["domain_name"] = zone.domain
+        return MeasuredZone(zone, self)
+
+    def result(self) -> dict:
+        """
+        returns the metrics, after the zone was converted.
+        """
+        values = self.values
+        values["write_seconds"] -= values["extract_seconds"]
+        values["seconds"] = (
+            values["parse_seconds"] + values["extract_seconds"] + values["write_seconds"]
+        )
+        if self.output.exists():
+            values["output_bytes"] = self.output.stat().st_size
+        return values
+
+
+class Metrics:
+    """
+    the metrics of a conversion run: the time spent discovering the zonefiles, and
+    the metrics of each of the converted zones.
+    """
+
+    def __init__(self):
+        self.values = {
+            "discovery_seconds": 0.0,
+            "zonefiles": 0,
+            "skipped": [],
+            "failed": [],
+        }
+        self.zones = []
+
+    @contextmanager
+    def discovery(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.values["discovery_seconds"] += time.perf_counter() - start
+
+    def skip(self, input: Path):
+        self.values["skipped"].append(input.as_posix())
+
+    def fail(self, failure: dict):
+        self.values["failed"].append(failure)
+
+    def add(self, zone: dict):
+        self.zones.append(zone)
+
+    def save(self, path: Path):
+        """
+        writes the metrics as JSON to `path`.
+        """
+        content = dict(self.values, zones=self.zones, peak_rss=peak_rss())
+        with path.open("w") as file:
+            json.dump(content, file, indent=2)
+            file.write("\n")
+
+
+class _ProfileStats:
+    """
+    the profile statistics collected in a worker process, in the shape pstats.Stats
+    expects of a profile.
+    """
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class Profile:
+    """
+    collects the cProfile statistics of the conversion of the zonefiles, which may
+    be profiled in worker processes.
+    """
+
+    def __init__(self):
+        self.stats: Optional[pstats.Stats] = None
+
+    def add(self, stats: dict):
+        profile = _ProfileStats(stats)
+        if self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+
+    @contextmanager
+    def profiling(self):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.create_stats()
+            self.add(profiler.stats)
+
+    def save(self, path: Path):
+        """
+        writes the profile statistics to `path`, to be read by pstats or snakeviz.
+        """
+        if self.stats is not None:
+            self.stats.dump_stats(path)
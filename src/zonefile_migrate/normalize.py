@@ -0,0 +1,143 @@
+"""
+normalises the record sets of a zone: owner names are made canonical, record sets
+with the same canonical name and type are merged, duplicate values are removed and
+the TTL is limited to the maximum TTL.
+"""
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
+from easyzone import easyzone
+from zonefile_migrate.dns_record_set import DNSRecordSet, iter_from_zone
+from zonefile_migrate.logger import log
+
+
+def canonical_name(name: str, origin: str) -> str:
+    """
+    returns the canonical form of the owner `name` in the zone `origin`: absolute,
+    in lowercase and with internationalized labels encoded as IDNA.
+
+    >>> canonical_name('WWW', 'Example.COM.'), canonical_name('@', 'example.com.')
+    ('www.example.com.', 'example.com.')
+    >>> canonical_name('Bücher.example.com.', 'example.com.')
+    'xn--bcher-kva.example.com.'
+    """
+    if name == "@":
+        name = origin
+    elif not name.endswith("."):
+        name = f"{name}.{origin}"
+    name = name.lower()
+    if not name.isascii():
+        name = ".".join(
+            label if label.isascii() else label.encode("idna").decode("ascii")
+            for label in name.split(".")
+        )
+    return name
+
+
+def normalize_record_sets(
+    record_sets: Iterable[DNSRecordSet],
+    origin: str,
+    maximum_ttl: Optional[int] = None,
+    changes: Optional[Counter] = None,
+) -> List[DNSRecordSet]:
+    """
+    returns the normalised `record_sets` of the zone `origin`, in the order in which
+    their names and types first occur. The record sets are indexed by canonical name
+    and type in a single pass. Record sets with the same canonical name and type are
+    merged into one with the lowest TTL, which is limited to `maximum_ttl`. The
+    number of each kind of change is counted in `changes`.
+
+    >>> changes = Counter()
+    >>> normalize_record_sets([
+    ...     DNSRecordSet('WWW.example.com.', 'A', 600, ['10.0.0.1', '10.0.0.1']),
+    ...     DNSRecordSet('www.example.com.', 'A', 300, ['10.0.0.2']),
+    ... ], 'example.com.', 60, changes)
+    [DNSRecordSet('www.example.com.', 'A', 60, ('10.0.0.1', '10.0.0.2'))]
+    >>> sorted(changes.items())
+    [('clamped TTLs', 1), ('conflicting TTLs', 1), ('duplicate values', 1), ('merged record sets', 1), ('renamed owners', 1)]
+    """
+    changes = Counter() if changes is None else changes
+    names = {}
+    index = {}
+    for record_set in record_sets:
+        name = names.get(record_set.name)
+        if name is None:
+            name = names[record_set.name] = canonical_name(record_set.name, origin)
+        if name != record_set.name:
+            changes["renamed owners"] += 1
+
+        size = len(record_set.rrdatas)
+        key = (name, record_set.rectype)
+        entry = index.get(key)
+        if entry is None:
+            entry = index[key] = [record_set.ttl, dict.fromkeys(record_set.rrdatas)]
+        else:
+            changes["merged record sets"] += 1
+            if entry[0] != record_set.ttl:
+                changes["conflicting TTLs"] += 1
+                entry[0] = min(entry[0], record_set.ttl)
+            size += len(entry[1])
+            entry[1].update(dict.fromkeys(record_set.rrdatas))
+        if size != len(entry[1]):
+            changes["duplicate values"] += size - len(entry[1])
+
+    result = []
+    for (name, rectype), (ttl, values) in index.items():
+        if maximum_ttl and ttl > maximum_ttl:
+            changes["clamped TTLs"] += 1
+            ttl = maximum_ttl
+        result.append(DNSRecordSet(name, rectype, ttl, values))
+    return result
+
+
+class NormalizedZone:
+    """
+    a zone which generates the normalised record sets of the `zone`, and reports
+    what was changed. Its `domain` is in lowercase, so that the record sets of the
+    origin are recognised by the converters. It is not IDNA encoded, as the names
+    of the stacks and resources of a zone are derived from it. All other attributes
+    are those of the `zone`.
+    """
+
+    def __init__(self, zone: easyzone.Zone, maximum_ttl: Optional[int] = None):
+        self.zone = zone
+        self.domain = zone.domain.lower()
+        self.maximum_ttl = maximum_ttl
+        self.changes = Counter()
+
+    def __getattr__(self, name):
+        return getattr(self.zone, name)
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        self.changes.clear()
+        origin = canonical_name(self.domain, ".")
+        record_sets = normalize_record_sets(
+            iter_from_zone(self.zone), origin, self.maximum_ttl, self.changes
+        )
+        if self.changes:
+            log.info(
+                "normalised zone %s: %s",
+                self.zone.domain,
+                ", ".join(f"{count} {change}" for change, count in self.changes.items()),
+            )
+        return iter(record_sets)
+
+
+def _transform_normalized(
+    transform: Callable[[easyzone.Zone, Path], None],
+    maximum_ttl: Optional[int],
+    zone: easyzone.Zone,
+    output: Path,
+):
+    return transform(NormalizedZone(zone, maximum_ttl), output)
+
+
+def normalized(
+    transform: Callable[[easyzone.Zone, Path], None], maximum_ttl: Optional[int]
+) -> Callable[[easyzone.Zone, Path], None]:
+    """
+    returns the `transform` of the normalised zone, which returns the result of the
+    `transform` and can be pickled if the `transform` can be.
+    """
+    return partial(_transform_normalized, transform, maximum_ttl)
@@ -1,19 +1,61 @@
 import click
+import os
 import re
+import sys
+from collections import Counter
+from contextlib import nullcontext
+from io import StringIO
+from functools import partial
 from slugify import slugify
 from encodings import idna
 import encodings.idna
 
 from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    TypeVar,
+    Union,
+)
 from ruamel.yaml import YAML, CommentedMap
+from ruamel.yaml.comments import TaggedScalar
 from zonefile_migrate.logger import log
 from easyzone import easyzone
-from zonefile_migrate.dns_record_set import create_from_zone
+from zonefile_migrate.dns_record_set import iter_from_zone
 from zonefile_migrate.utils import (
     get_all_zonefiles_in_path,
     convert_zonefiles,
-    target_file,
+    open_output,
+    zone_readers,
+    target_files,
+)
+from zonefile_migrate.manifest import Manifest, manifest_path
+from zonefile_migrate.emitters import (
+    FastYAMLEmitter,
+    JSONEmitter,
+    YAMLEmitter,
+    get_emitter,
+    yaml_emitters,
 )
+from zonefile_migrate.normalize import normalized
+from zonefile_migrate.metrics import Metrics, Profile
+
+T = TypeVar("T")
+TemplateEmitter = Union[YAMLEmitter, JSONEmitter]
+
+# the maximum number of resources and bytes of a template uploaded without S3
+CLOUDFORMATION_MAXIMUM_RESOURCES = 500
+CLOUDFORMATION_MAXIMUM_TEMPLATE_SIZE = 51200
+
+# the maximum number of records and characters of values in a Route53 change batch
+ROUTE53_MAXIMUM_RECORDS = 1000
+ROUTE53_MAXIMUM_VALUE_SIZE = 32000
 
 
 def logical_resource_id(name: str):
@@ -53,29 +95,76 @@ def generate_unique_logical_resource_id(prefix: str, resources: dict) -> str:
     return f"{prefix}{count}"
 
 
-def convert_to_cloudformation(zone: easyzone.Zone, maximum_ttl: int) -> dict:
+class LogicalResourceIds:
     """
-    Converts the zonefile into a CloudFormation template.
+    allocates unique logical resource ids in constant time, returning the same ids as
+    generate_unique_logical_resource_id. That returns the prefix itself only if no
+    existing id starts with it, so the index keeps all prefixes of the ids which end
+    with the `terminator` of the requested prefixes.
+
+    >>> ids = LogicalResourceIds(["HostedZone"])
+    >>> ids.allocate('FooARecordBarARecord'), ids.allocate('FooARecord')
+    ('FooARecordBarARecord', 'FooARecord1')
+    >>> ids.allocate('FooARecord'), ids.allocate('BarARecord')
+    ('FooARecord2', 'BarARecord')
+    """
+
+    def __init__(self, ids: Iterable[str] = (), terminator: str = "Record"):
+        self.terminator = terminator
+        self.ids = set()
+        self.prefixes = set()
+        self.next_suffix = {}
+        for id in ids:
+            self.add(id)
+
+    def add(self, id: str):
+        self.ids.add(id)
+        end = id.find(self.terminator)
+        while end >= 0:
+            end += len(self.terminator)
+            self.prefixes.add(id[:end])
+            end = id.find(self.terminator, end)
+
+    def allocate(self, prefix: str) -> str:
+        """
+        returns a unique logical resource id for `prefix` and adds it to the index.
+        """
+        if prefix.endswith(self.terminator):
+            same_prefix = prefix in self.prefixes
+        else:
+            same_prefix = any(id.startswith(prefix) for id in self.ids)
+
+        if not same_prefix:
+            result = prefix
+        else:
+            count = self.next_suffix.get(prefix, 1)
+            while f"{prefix}{count}" in self.ids:
+                count = count + 1
+            self.next_suffix[prefix] = count + 1
+            result = f"{prefix}{count}"
+
+        self.add(result)
+        return result
+
+
+def iter_record_set_resources(
+    zone: easyzone.Zone, maximum_ttl: int, hosted_zone_id: dict
+) -> Iterator[Tuple[str, dict]]:
+    """
+    generates the logical resource id and resource definition of each of the record
+    sets of the zone, referring to the hosted zone by `hosted_zone_id`.
     """
-    ttl = zone.root.ttl
     domain_name = zone.domain
     idna_domain_name = domain_name.encode("idna").decode("ascii")
+    logical_ids = LogicalResourceIds(["HostedZone"])
 
-    result = CommentedMap()
-    result["AWSTemplateFormatVersion"] = "2010-09-09"
-    resources = CommentedMap()
-    resources["HostedZone"] = CommentedMap(
-        {"Type": "AWS::Route53::HostedZone", "Properties": {"Name": idna_domain_name}}
-    )
-    result["Resources"] = resources
-
-    for record_set in create_from_zone(zone):
+    for record_set in iter_from_zone(zone):
         if record_set.name in [zone.domain, idna_domain_name]:
             if record_set.rectype in ["NS", "SOA"]:
                 log.debug("ignoring %s records for origin %s", record_set.rectype, zone.domain)
                 continue
 
-        logical_name = generate_unique_logical_resource_id(
+        logical_name = logical_ids.allocate(
             re.sub(
                 r"[^0-9a-zA-Z]",
                 "",
@@ -90,28 +179,235 @@ def convert_to_cloudformation(zone: easyzone.Zone, maximum_ttl: int) -> dict:
                 ),
             )
             + record_set.rectype
-            + "Record",
-            resources,
+            + "Record"
         )
 
-        resources[logical_name] = CommentedMap(
-            {
-                "Type": "AWS::Route53::RecordSet",
-                "Properties": {
-                    "Name": record_set.name,
-                    "Type": record_set.rectype,
-                    "ResourceRecords": record_set.rrdatas,
-                    "TTL": maximum_ttl
-                    if maximum_ttl and record_set.ttl > maximum_ttl
-                    else record_set.ttl,
-                    "HostedZoneId": {"Ref": "HostedZone"},
-                },
-            }
-        )
+        yield logical_name, {
+            "Type": "AWS::Route53::RecordSet",
+            "Properties": {
+                "Name": record_set.name,
+                "Type": record_set.rectype,
+                "ResourceRecords": list(record_set.rrdatas),
+                "TTL": maximum_ttl
+                if maximum_ttl and record_set.ttl > maximum_ttl
+                else record_set.ttl,
+                "HostedZoneId": hosted_zone_id,
+            },
+        }
+
+
+def hosted_zone_resource(zone: easyzone.Zone) -> dict:
+    return {
+        "Type": "AWS::Route53::HostedZone",
+        "Properties": {"Name": zone.domain.encode("idna").decode("ascii")},
+    }
+
+
+def iter_cloudformation_resources(
+    zone: easyzone.Zone, maximum_ttl: int
+) -> Iterator[Tuple[str, dict]]:
+    """
+    generates the logical resource id and resource definition of the HostedZone and
+    each of the record sets of the zone, without holding all record sets in memory.
+    """
+    yield "HostedZone", hosted_zone_resource(zone)
+    yield from iter_record_set_resources(zone, maximum_ttl, {"Ref": "HostedZone"})
+
+
+def convert_to_cloudformation(zone: easyzone.Zone, maximum_ttl: int) -> dict:
+    """
+    Converts the zonefile into a CloudFormation template.
+    """
+    result = CommentedMap()
+    result["AWSTemplateFormatVersion"] = "2010-09-09"
+    resources = CommentedMap()
+    for logical_name, resource in iter_cloudformation_resources(zone, maximum_ttl):
+        resources[logical_name] = CommentedMap(resource)
+    result["Resources"] = resources
 
     return result
 
 
+def dump_resource(logical_name: str, resource: dict) -> str:
+    """
+    returns the YAML of the resource, indented to go into the Resources section.
+    """
+    return get_emitter("yaml", "ruamel").resource(logical_name, resource)
+
+
+def write_template(
+    file: TextIO,
+    head: dict,
+    resources: Iterable[str],
+    tail: dict,
+    emitter: TemplateEmitter,
+):
+    """
+    writes a template with the `head` sections, the emitted `resources` and the
+    `tail` sections to `file`, one resource at a time.
+    """
+    file.write(emitter.head(head))
+    for i, resource in enumerate(resources):
+        if i:
+            file.write(emitter.separator)
+        file.write(resource)
+    file.write(emitter.tail(tail))
+
+
+def write_cloudformation(
+    zone: easyzone.Zone,
+    maximum_ttl: int,
+    file: TextIO,
+    emitter: Optional[TemplateEmitter] = None,
+):
+    """
+    writes the CloudFormation template of the zone to `file`, one resource at a time. The
+    output is identical to dumping the result of convert_to_cloudformation.
+    """
+    emitter = emitter or get_emitter()
+    resources = (
+        emitter.resource(logical_name, resource)
+        for logical_name, resource in iter_cloudformation_resources(zone, maximum_ttl)
+    )
+    write_template(
+        file, {"AWSTemplateFormatVersion": "2010-09-09"}, resources, {}, emitter
+    )
+
+
+def pack(
+    items: Iterable[T],
+    weigh: Callable[[T], Tuple[int, int]],
+    maximum_count: int,
+    maximum_size: int,
+) -> Iterator[List[T]]:
+    """
+    packs the items in order into lists with a total count and size, as returned by
+    `weigh`, within the maximum count and size. An item which exceeds the maximums on
+    its own is put in a list by itself.
+
+    >>> list(pack(["a", "bb", "ccc", "d", "eeeeee"], lambda s: (1, len(s)), 2, 4))
+    [['a', 'bb'], ['ccc', 'd'], ['eeeeee']]
+    """
+    result, count, size = [], 0, 0
+    for item in items:
+        item_count, item_size = weigh(item)
+        if result and (
+            count + item_count > maximum_count or size + item_size > maximum_size
+        ):
+            yield result
+            result, count, size = [], 0, 0
+        result.append(item)
+        count, size = count + item_count, size + item_size
+    if result:
+        yield result
+
+
+def iter_record_set_group_resources(
+    zone: easyzone.Zone, maximum_ttl: int, hosted_zone_id: dict
+) -> Iterator[Tuple[str, dict]]:
+    """
+    generates AWS::Route53::RecordSetGroup resources with the record sets of the zone.
+    Each group is created in a single Route53 change batch, so it is kept within the
+    limits of the number of records and characters of a change batch.
+    """
+    record_sets = (
+        resource["Properties"]
+        for _, resource in iter_record_set_resources(zone, maximum_ttl, hosted_zone_id)
+    )
+    groups = pack(
+        record_sets,
+        lambda r: (
+            len(r["ResourceRecords"]),
+            sum(map(len, r["ResourceRecords"])),
+        ),
+        ROUTE53_MAXIMUM_RECORDS,
+        ROUTE53_MAXIMUM_VALUE_SIZE,
+    )
+    for i, group in enumerate(groups, start=1):
+        yield f"RecordSetGroup{i}", {
+            "Type": "AWS::Route53::RecordSetGroup",
+            "Properties": {
+                "HostedZoneId": hosted_zone_id,
+                "RecordSets": [
+                    {k: v for k, v in r.items() if k != "HostedZoneId"} for r in group
+                ],
+            },
+        }
+
+
+def child_template(output: Path, part: int) -> Path:
+    """
+    returns the path of the `part`-th child template of the template `output`.
+
+    >>> child_template(Path('templates/asample.org.yaml'), 2).as_posix()
+    'templates/asample.org-2.yaml'
+    """
+    return output.with_name(f"{output.stem}-{part}{output.suffix}")
+
+
+def write_split_cloudformation(
+    zone: easyzone.Zone,
+    maximum_ttl: int,
+    output: Path,
+    maximum_resources: int,
+    maximum_template_size: int,
+    record_set_group: bool,
+    emitter: Optional[TemplateEmitter] = None,
+) -> [Path]:
+    """
+    writes the HostedZone of the zone into the parent template `output`, and packs its
+    record sets into child templates within the maximum number of resources and bytes.
+    The parent template outputs the HostedZoneId, which is passed to the child templates
+    as a parameter. Returns the paths of the child templates.
+    """
+    emitter = emitter or get_emitter()
+    with open_output(output) as file:
+        write_template(
+            file,
+            {"AWSTemplateFormatVersion": "2010-09-09"},
+            [emitter.resource("HostedZone", hosted_zone_resource(zone))],
+            {"Outputs": {"HostedZoneId": {"Value": {"Ref": "HostedZone"}}}},
+            emitter,
+        )
+
+    head = {
+        "AWSTemplateFormatVersion": "2010-09-09",
+        "Parameters": {"HostedZoneId": {"Type": "AWS::Route53::HostedZone::Id"}},
+    }
+    size = len(emitter.head(head).encode("utf-8")) + len(emitter.tail({}))
+
+    iter_resources = (
+        iter_record_set_group_resources
+        if record_set_group
+        else iter_record_set_resources
+    )
+    resources = (
+        emitter.resource(logical_name, resource)
+        for logical_name, resource in iter_resources(
+            zone, maximum_ttl, {"Ref": "HostedZoneId"}
+        )
+    )
+    templates = pack(
+        resources,
+        lambda r: (1, len(r.encode("utf-8")) + len(emitter.separator)),
+        maximum_resources,
+        maximum_template_size - size,
+    )
+
+    children = []
+    for part, template in enumerate(templates, start=1):
+        child = child_template(output, part)
+        with open_output(child) as file:
+            write_template(file, head, template, {}, emitter)
+        children.append(child)
+
+    stale = child_template(output, len(children) + 1)
+    if stale.exists():
+        log.warning("%s is no longer generated from zone %s", stale, zone.domain)
+
+    return children
+
+
 def common_parent(one: Path, other: Path) -> Path:
     """
     returns the commons parent of two paths
@@ -152,65 +448,408 @@ def template_in_sceptre_project(
     return sceptre_dir.parts[0] == "config" and templates_dir.parts[0] == "templates"
 
 
-def generate_sceptre_configuration(
-    zone: easyzone.Zone, template: Path, config_directory: Path
-):
-    """
-    generates a sceptre stack config for the CloudFormation template for the zone.
-    """
-    stack_name = "zone-" + re.sub(
+def sceptre_stack_name(zone: easyzone.Zone) -> str:
+    return "zone-" + re.sub(
         r"-{2,}", "-", re.sub(r"[^\w]+", "-", slugify(zone.domain))
     ).strip("-")
-    stack_config = config_directory.joinpath(Path(stack_name).with_suffix(".yaml"))
 
-    # create empty stack group configuration file
-    config_directory.mkdir(parents=True, exist_ok=True)
-    group_config = config_directory.joinpath("config.yaml")
-    if not group_config.exists():
-        with group_config.open("w") as file:
-            pass
 
-    # create stack configuration file
-    config = None
-    if stack_config.exists():
-        with stack_config.open("r") as file:
-            config = YAML().load(file)
+def sceptre_stack_path(config_directory: Path, stack_name: str) -> str:
+    """
+    returns the path of the stack `stack_name` in the stack group `config_directory`,
+    relative to the sceptre config directory.
+
+    >>> sceptre_stack_path(Path('example/config/dns'), 'zone-asample-org')
+    'dns/zone-asample-org.yaml'
+    >>> sceptre_stack_path(Path('dns'), 'zone-asample-org')
+    'dns/zone-asample-org.yaml'
+    """
+    parts = config_directory.absolute().parts
+    group = (
+        parts[len(parts) - parts[::-1].index("config") :]
+        if "config" in parts
+        else parts[-1:]
+    )
+    return Path(*group, stack_name).with_suffix(".yaml").as_posix()
 
-    if not config:
-        config = {}
 
+def update_sceptre_stack_config(
+    config: dict, template: Path, config_directory: Path, zone_stack: Optional[str]
+) -> bool:
+    """
+    updates the sceptre stack `config` in `config_directory` for the CloudFormation
+    `template`. If `zone_stack` is specified, the template is a child template of the
+    zone, and the stack depends on the stack `zone_stack` for its HostedZoneId.
+    Returns whether the config changed.
+    """
     parent = common_parent(config_directory, template)
     template_path = (
         template.absolute().relative_to(parent.joinpath("templates")).as_posix()
     )
-    if config.get("template_path") != template_path:
-        config["template_path"] = template_path
+    changed = config.get("template_path") != template_path
+    config["template_path"] = template_path
+
+    if zone_stack:
+        hosted_zone_id = config.setdefault("parameters", {}).get("HostedZoneId")
+        if config.get("dependencies") != [zone_stack]:
+            config["dependencies"] = [zone_stack]
+            changed = True
+        if not (
+            isinstance(hosted_zone_id, TaggedScalar)
+            and hosted_zone_id.tag.value == "!stack_output"
+            and hosted_zone_id.value == f"{zone_stack}::HostedZoneId"
+        ):
+            config["parameters"]["HostedZoneId"] = TaggedScalar(
+                value=f"{zone_stack}::HostedZoneId", tag="!stack_output"
+            )
+            changed = True
+    return changed
+
+
+def sceptre_sub_group(
+    config_directory: Path, stacks: Counter, size: int, maximum_stacks: Optional[int]
+) -> Path:
+    """
+    returns the directory in `config_directory` for the `size` stacks of a new zone:
+    the first sub-group with room for all of them, counting the `stacks` already in
+    each directory, or the `config_directory` itself if `maximum_stacks` is None.
+
+    >>> stacks = Counter({Path('dns/group-001'): 499})
+    >>> sceptre_sub_group(Path('dns'), stacks, 2, 500).as_posix()
+    'dns/group-002'
+    >>> sceptre_sub_group(Path('dns'), stacks, 1, 500).as_posix()
+    'dns/group-001'
+    """
+    if not maximum_stacks:
+        return config_directory
+
+    number = 1
+    group = config_directory.joinpath("group-001")
+    while stacks[group] and stacks[group] + size > maximum_stacks:
+        number += 1
+        group = config_directory.joinpath(f"group-{number:03d}")
+    return group
+
+
+def generate_sceptre_configurations(
+    zones: Iterable[Tuple[str, List[Path]]],
+    config_directory: Path,
+    maximum_stacks: Optional[int] = None,
+) -> int:
+    """
+    generates the sceptre stack configs of the CloudFormation templates of the
+    `zones` in one pass, each given by the name of its stack and its templates,
+    of which all but the first are child templates. The existing stack configs in
+    `config_directory` are indexed once, and only the configs which changed are
+    written. Returns the number of configs written.
+
+    With `maximum_stacks`, the stacks of new zones are placed in sub-groups of at
+    most that number of stacks, group-001, group-002, .. Existing stacks are never
+    moved, as that would change the name of their CloudFormation stack.
+    """
+    config_directory.mkdir(parents=True, exist_ok=True)
+    existing = {}
+    groups = set()
+    for path in config_directory.rglob("*.yaml"):
+        if path.name == "config.yaml":
+            groups.add(path.parent)
+        else:
+            existing[path.stem] = path
+    if config_directory not in groups:
+        config_directory.joinpath("config.yaml").touch()
+    stacks = Counter(path.parent for path in existing.values())
+    group_path = Path(sceptre_stack_path(config_directory, "group")).parent
+
+    yaml = YAML()
+    emitter = FastYAMLEmitter()
+    written = total = 0
+    for stack_name, templates in zones:
+        if stack_name in existing:
+            directory = existing[stack_name].parent
+        else:
+            directory = sceptre_sub_group(
+                config_directory, stacks, len(templates), maximum_stacks
+            )
+        zone_stack = group_path.joinpath(
+            directory.relative_to(config_directory), stack_name + ".yaml"
+        ).as_posix()
+
+        for part, template in enumerate(templates):
+            name = f"{stack_name}-{part}" if part else stack_name
+            dependency = zone_stack if part else None
+            config = {}
+            update_sceptre_stack_config(config, template, config_directory, dependency)
+            content = emitter.document(config)
+
+            total += 1
+            path = existing.get(name)
+            if path:
+                # only configs which differ from the generated config are parsed
+                existing_content = path.read_text()
+                if existing_content == content:
+                    continue
+                config = yaml.load(existing_content) or {}
+                if not update_sceptre_stack_config(
+                    config, template, config_directory, dependency
+                ):
+                    continue
+                generated = StringIO()
+                yaml.dump(config, generated)
+                content = generated.getvalue()
+            else:
+                if directory not in groups:
+                    directory.mkdir(parents=True, exist_ok=True)
+                    directory.joinpath("config.yaml").touch()
+                    groups.add(directory)
+                path = directory.joinpath(name + ".yaml")
+                stacks[directory] += 1
+
+            path.write_text(content)
+            written += 1
+
+    log.info(
+        "wrote %d of %d sceptre stack configs in %s", written, total, config_directory
+    )
+    return written
+
+
+def transform_to_cloudformation(
+    zone: easyzone.Zone,
+    output: Path,
+    maximum_ttl: int,
+    split: bool = False,
+    maximum_resources: int = CLOUDFORMATION_MAXIMUM_RESOURCES,
+    maximum_template_size: int = CLOUDFORMATION_MAXIMUM_TEMPLATE_SIZE,
+    record_set_group: bool = False,
+    format: str = "yaml",
+    yaml_emitter: str = "fast",
+):
+    """
+    writes the CloudFormation template for `zone` to `output`. If `split` is True, the
+    record sets are written to child templates. The template is written in `format`,
+    by the `yaml_emitter` if it is YAML. Returns the name of the Sceptre stack of the
+    zone and the templates written, for generate_sceptre_configurations.
+    """
+    emitter = get_emitter(format, yaml_emitter)
+    if not split:
+        with open_output(output) as file:
+            write_cloudformation(zone, maximum_ttl, file, emitter)
+        children = []
+    else:
+        children = write_split_cloudformation(
+            zone,
+            maximum_ttl,
+            output,
+            maximum_resources,
+            maximum_template_size,
+            record_set_group,
+            emitter,
+        )
 
-        with stack_config.open("w") as file:
-            YAML().dump(config, file)
+    return sceptre_stack_name(zone), [output] + children
+
+
+def cloudformation_conversion(
+    maximum_ttl: Optional[int] = None,
+    split: bool = False,
+    maximum_resources: int = CLOUDFORMATION_MAXIMUM_RESOURCES,
+    maximum_template_size: int = CLOUDFORMATION_MAXIMUM_TEMPLATE_SIZE,
+    record_set_group: bool = False,
+    format: str = "yaml",
+    yaml_emitter: str = "fast",
+    normalize: bool = False,
+    sceptre_group: Optional[Path] = None,
+    sceptre_group_size: Optional[int] = None,
+) -> Tuple[str, dict, Callable[[easyzone.Zone, Path], Any]]:
+    """
+    returns the extension of the templates, the options recorded in the manifest and
+    the transform of a conversion to CloudFormation with these options. The defaults
+    are those of the command, so that the conversions of the command and of the
+    watch command with its defaults share the manifest.
+    """
+    options = dict(
+        maximum_ttl=maximum_ttl,
+        split=split,
+        maximum_resources=maximum_resources,
+        maximum_template_size=maximum_template_size,
+        record_set_group=record_set_group,
+        format=format,
+        yaml_emitter=yaml_emitter,
+    )
+    manifest_options = dict(
+        options,
+        command="to-cloudformation",
+        normalize=normalize,
+        sceptre_group=sceptre_group,
+        sceptre_group_size=sceptre_group_size,
+    )
+    transform = partial(transform_to_cloudformation, **options)
+    if normalize:
+        transform = normalized(transform, maximum_ttl)
+    return f".{format}", manifest_options, transform
 
 
-@click.command(name="to-cloudformation")
+@click.command(
+    name="to-cloudformation",
+    short_help="Converts zonefiles into CloudFormation templates.",
+)
 @click.option(
     "--sceptre-group",
     required=False,
     type=click.Path(file_okay=False),
     help="to write sceptre stack group configuration",
 )
+@click.option(
+    "--sceptre-group-size",
+    required=False,
+    type=click.IntRange(min=1),
+    help="maximum number of stacks in a sub-group of the sceptre stack group",
+)
 @click.option(
     "--maximum-ttl",
     required=False,
     type=int,
     help="maximum TTL of domain name records",
 )
+@click.option(
+    "--jobs",
+    "-j",
+    required=False,
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    help="number of zonefiles to convert in parallel, defaults to the number of CPUs",
+)
+@click.option(
+    "--parser",
+    required=False,
+    type=click.Choice(list(zone_readers)),
+    default="easyzone",
+    help="to read the zonefiles with",
+)
+@click.option(
+    "--split",
+    is_flag=True,
+    default=False,
+    help="write the record sets to child templates of the hosted zone template",
+)
+@click.option(
+    "--maximum-resources",
+    required=False,
+    type=click.IntRange(min=1, max=CLOUDFORMATION_MAXIMUM_RESOURCES),
+    default=CLOUDFORMATION_MAXIMUM_RESOURCES,
+    help="maximum number of resources in a child template",
+)
+@click.option(
+    "--maximum-template-size",
+    required=False,
+    type=click.IntRange(min=1024),
+    default=CLOUDFORMATION_MAXIMUM_TEMPLATE_SIZE,
+    help="maximum size of a child template in bytes",
+)
+@click.option(
+    "--record-set-group",
+    is_flag=True,
+    default=False,
+    help="group the record sets in child templates into RecordSetGroup resources",
+)
+@click.option(
+    "--format",
+    required=False,
+    type=click.Choice(["yaml", "json"]),
+    default="yaml",
+    help="of the templates",
+)
+@click.option(
+    "--yaml-emitter",
+    required=False,
+    type=click.Choice(list(yaml_emitters)),
+    default="fast",
+    help="to write YAML templates with",
+)
+@click.option(
+    "--normalize",
+    is_flag=True,
+    default=False,
+    help="merge duplicate record sets and make the owner names canonical",
+)
+@click.option(
+    "--recursive",
+    "-r",
+    is_flag=True,
+    default=False,
+    help="search the SRC directories recursively for zonefiles",
+)
+@click.option(
+    "--include",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files in SRC directories to convert",
+)
+@click.option(
+    "--exclude",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files and directories in SRC directories to skip",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="convert all zonefiles, including those which did not change",
+)
+@click.option(
+    "--keep-going",
+    is_flag=True,
+    default=False,
+    help="convert the other zonefiles if a zonefile fails, and report the failures",
+)
+@click.option(
+    "--stats-json",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="to write the timing and size metrics of each zone to",
+)
+@click.option(
+    "--profile",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="to write the cProfile statistics of the conversion to",
+)
 @click.argument("src", nargs=-1, type=click.Path())
 @click.argument("dst", nargs=1, type=click.Path())
-def command(sceptre_group, maximum_ttl, src, dst):
+def command(
+    sceptre_group,
+    sceptre_group_size,
+    maximum_ttl,
+    jobs,
+    parser,
+    split,
+    maximum_resources,
+    maximum_template_size,
+    record_set_group,
+    format,
+    yaml_emitter,
+    normalize,
+    recursive,
+    include,
+    exclude,
+    force,
+    keep_going,
+    stats_json,
+    profile,
+    src,
+    dst,
+):
     """
     Converts one or more `SRC` zonefiles into AWS CloudFormation templates in `DST`.
     Optionally generates the Sceptre stack config for each of the templates in the
     `--sceptre-group` directoru.
 
+    The Sceptre stack configs are generated in one pass after the conversion, which
+    indexes the existing stack configs once and only writes those which changed. With
+    --sceptre-group-size, the stacks of new zones are placed in sub-groups of at most
+    that number of stacks.
+
     Each generated CloudFormation template contains a single Route53 HostedZone and all
     associated ResourceRecordSet. The SOA and NS records for the origin domain are not
     copied into the template.
@@ -220,14 +859,65 @@ def command(sceptre_group, maximum_ttl, src, dst):
     the name of the file will be used as the domain name.
 
     You may override the maximum TTL of records through the option --maximum-ttl
+
+    The zonefiles are converted in parallel by --jobs worker processes.
+
+    The zonefiles are read with easyzone, or with the faster native parser which
+    also supports $INCLUDE when --parser native is specified.
+
+    Large zones exceed the CloudFormation limits on the number of resources and the
+    size of a template. With --split, the template only contains the HostedZone and
+    outputs its HostedZoneId. The record sets are packed into child templates of at
+    most --maximum-resources resources and --maximum-template-size bytes, which take
+    the HostedZoneId as parameter. With --record-set-group, the record sets in the
+    child templates are grouped into RecordSetGroup resources.
+
+    The templates are written as YAML, or as JSON with --format json. The fast YAML
+    emitter writes the output of ruamel.yaml without it for most of the resources.
+    With --yaml-emitter libyaml, the YAML is written with the C-accelerated safe dumper
+    of PyYAML, if installed.
+
+    Directories in SRC are searched for zonefiles by sniffing the start of each file,
+    and with --recursive their subdirectories as well. Use --include and --exclude to
+    select files by glob patterns on their name or path relative to SRC.
+
+    Zonefiles which did not change since the previous conversion with the same options
+    are skipped, as recorded in the manifest .zonefile-migrate.json in `DST`. Use --force
+    to convert all zonefiles.
+
+    With --stats-json, the time spent discovering the zonefiles and parsing, extracting
+    the record sets and writing each zone, and its number of records, record sets and
+    bytes are written as JSON. With --profile, the conversion is profiled with cProfile.
+
+    With --normalize, the owner names are made absolute, lowercase and IDNA encoded,
+    and record sets with the same name and type are merged into one with the lowest
+    TTL and without duplicate values. The changes are reported per zone.
+
+    With --keep-going, a zonefile which fails to convert does not stop the conversion
+    of the others. The failures are reported at the end, and the command exits with 1.
+    As the failed zonefiles are not recorded in the manifest, the next run only
+    converts those.
     """
+    if record_set_group and not split:
+        raise click.UsageError("--record-set-group requires --split")
+
+    if sceptre_group_size and not sceptre_group:
+        raise click.UsageError("--sceptre-group-size requires --sceptre-group")
+
+    try:
+        get_emitter(format, yaml_emitter)
+    except ImportError:
+        raise click.UsageError(f"--yaml-emitter {yaml_emitter} requires PyYAML")
+
     if sceptre_group:
         sceptre_group = Path(sceptre_group)
 
     if not src:
         raise click.UsageError("no source files were specified")
 
-    inputs = get_all_zonefiles_in_path(src)
+    metrics = Metrics() if stats_json else None
+    with metrics.discovery() if metrics else nullcontext():
+        inputs = get_all_zonefiles_in_path(src, recursive, include, exclude)
 
     if len(inputs) == 0:
         click.UsageError("no zonefiles were found")
@@ -239,15 +929,54 @@ def command(sceptre_group, maximum_ttl, src, dst):
         if not dst.exists():
             dst.mkdir(parents=True, exist_ok=True)
 
-    outputs = list(map(lambda d: target_file(d, dst, ".yaml"), inputs))
+    extension, options, transform = cloudformation_conversion(
+        maximum_ttl,
+        split,
+        maximum_resources,
+        maximum_template_size,
+        record_set_group,
+        format,
+        yaml_emitter,
+        normalize,
+        sceptre_group,
+        sceptre_group_size,
+    )
+    try:
+        outputs = target_files(inputs, dst, extension)
+    except ValueError as error:
+        raise click.UsageError(error)
+
+    manifest = Manifest(manifest_path(dst), options, force)
+    profiler = Profile() if profile else None
+    stacks = {} if sceptre_group else None
+    try:
+        failures = convert_zonefiles(
+            inputs,
+            outputs,
+            transform,
+            jobs,
+            parser,
+            manifest,
+            metrics,
+            profiler,
+            keep_going,
+            stacks,
+        )
+    finally:
+        if metrics:
+            metrics.save(Path(stats_json))
+        if profiler:
+            profiler.save(Path(profile))
 
-    def transform_to_cloudformation(zone: easyzone.Zone, output: Path):
-        with output.open("w") as file:
-            YAML().dump(convert_to_cloudformation(zone, maximum_ttl), stream=file)
-            if sceptre_group:
-                generate_sceptre_configuration(zone, output, sceptre_group)
+    if sceptre_group:
+        generate_sceptre_configurations(
+            [stacks[output] for output in outputs if output in stacks],
+            sceptre_group,
+            sceptre_group_size,
+        )
 
-    convert_zonefiles(inputs, outputs, transform_to_cloudformation)
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
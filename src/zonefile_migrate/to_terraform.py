@@ -5,54 +5,104 @@ import re
 import sys
 import os
 import pkgutil
-from zonefile_migrate.utils import convert_zonefiles, target_file
+from contextlib import nullcontext
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import repeat
+from zonefile_migrate.utils import convert_zonefiles, open_output, target_files
 
 
 from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, TextIO, Tuple
 from ruamel.yaml import YAML, CommentedMap
-from zonefile_migrate.logger import logging
+from zonefile_migrate.logger import log, logging
 from easyzone import easyzone
 from dns.exception import SyntaxError
-from zonefile_migrate.dns_record_set import create_from_zone
-from jinja2 import Template
-from zonefile_migrate.utils import get_all_zonefiles_in_path
-
-tf_managed_zone_template = """
-module managed_zone_{{ resource_name }} {
-  source               = "./{{ provider }}-managed-zone"
-  domain_name          = "{{ domain_name.encode("idna").decode("ascii") }}"
-  resource_record_sets = [{% for record in resource_record_sets %}
-    {
-       name = "{{ record.name }}"
-       type = "{{ record.rectype }}"
-       ttl  = {{ maximum_ttl if maximum_ttl and record.ttl > maximum_ttl else record.ttl }}
-       rrdatas = [{% for rrdata in record.rrdatas %}
-         "{{ rrdata.strip('"') }}",{% endfor %}
-       ]
-    },{% endfor %}
-  ]
-}
-"""
+from zonefile_migrate.dns_record_set import DNSRecordSet, iter_from_zone
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
+from zonefile_migrate.utils import get_all_zonefiles_in_path, zone_readers
+from zonefile_migrate.manifest import Manifest, manifest_path
+from zonefile_migrate.normalize import normalized
+from zonefile_migrate.metrics import Metrics, Profile
 
+# the name of the environment variable with the directory to cache compiled templates in
+BYTECODE_CACHE_VARIABLE = "ZONEFILE_MIGRATE_BYTECODE_CACHE"
 
-def convert_to_terraform(zone: easyzone.Zone, provider: str, maximum_ttl: int) -> str:
+# the template of the module call of a managed zone in terraform-modules
+MANAGED_ZONE_TEMPLATE = "managed-zone.tf.j2"
+
+# the template of the root module creating the managed zones of a .tfvars.json shard
+MANAGED_ZONES_TEMPLATE = "managed-zones.tf.j2"
+
+# the directory in DST in which the record sets of sharded zones are staged
+STAGING_DIRECTORY = ".zones"
+
+
+@lru_cache(maxsize=None)
+def environment() -> Environment:
     """
-    Converts the zonefile into a terraform tempalte for Google
+    returns the Jinja environment loading the templates from the terraform-modules in
+    the package, created once per process. If the environment variable
+    ZONEFILE_MIGRATE_BYTECODE_CACHE is set, the compiled templates are cached in
+    that directory.
+    """
+    bytecode_cache = None
+    cache_directory = os.environ.get(BYTECODE_CACHE_VARIABLE)
+    if cache_directory:
+        os.makedirs(cache_directory, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_directory)
+
+    return Environment(
+        loader=PackageLoader("zonefile_migrate", "terraform-modules"),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+    )
+
+
+def providers() -> [str]:
+    """
+    returns the names of the providers of which a managed zone module exists in
+    terraform-modules.
+
+    >>> providers()
+    ['google']
+    """
+    return sorted(
+        name.removesuffix("-managed-zone.tf")
+        for name in environment().list_templates()
+        if name.endswith("-managed-zone.tf")
+    )
+
+
+def provider_module(provider: str) -> str:
+    """
+    returns the source of the managed zone module of the `provider`.
+    """
+    source, _, _ = environment().loader.get_source(
+        environment(), f"{provider}-managed-zone.tf"
+    )
+    return source
+
+
+def _render_terraform(zone: easyzone.Zone, provider: str, maximum_ttl: int):
+    """
+    returns a stream of the rendered Terraform template for the zone, which consumes
+    the record sets of the zone one by one.
     """
     domain_name = zone.domain
     idna_domain_name = domain_name.encode("idna").decode("ascii")
-    resource_name = re.sub(r"\.", "_", zone.domain.removesuffix("."))
-    resource_record_sets = list(
-        filter(
-            lambda r: not (
-                r.rectype in ["SOA", "NS"] and r.name in [domain_name, idna_domain_name]
-            ),
-            create_from_zone(zone),
+    resource_name = _resource_name(zone.domain)
+    resource_record_sets = (
+        r
+        for r in iter_from_zone(zone)
+        if not (
+            r.rectype in ["SOA", "NS"] and r.name in [domain_name, idna_domain_name]
         )
     )
-    template = Template(tf_managed_zone_template)
+    template = environment().get_template(MANAGED_ZONE_TEMPLATE)
 
-    return template.render(
+    return template.stream(
         {
             "domain_name": domain_name,
             "resource_name": resource_name,
@@ -63,7 +113,246 @@ def convert_to_terraform(zone: easyzone.Zone, provider: str, maximum_ttl: int) -
     )
 
 
-@click.command(name="to-terraform")
+def convert_to_terraform(zone: easyzone.Zone, provider: str, maximum_ttl: int) -> str:
+    """
+    Converts the zonefile into a terraform tempalte for Google
+    """
+    return "".join(_render_terraform(zone, provider, maximum_ttl))
+
+
+def write_terraform(zone: easyzone.Zone, provider: str, maximum_ttl: int, file: TextIO):
+    """
+    writes the Terraform template of the zone to `file` while it is being rendered.
+    """
+    _render_terraform(zone, provider, maximum_ttl).dump(file)
+
+
+def transform_to_terraform(
+    zone: easyzone.Zone, output: Path, provider: str, maximum_ttl: int
+):
+    """
+    writes the Terraform template for `zone` to `output`.
+    """
+    with open_output(output) as file:
+        write_terraform(zone, provider, maximum_ttl, file)
+
+
+def _resource_name(domain_name: str) -> str:
+    return re.sub(r"\.", "_", domain_name.removesuffix("."))
+
+
+def transform_to_terraform_data(zone: easyzone.Zone, output: Path):
+    """
+    stages the record sets of `zone` in `output` as JSON lines, to be written into a
+    shard. The first line holds the domain name, and the last line the number of
+    records, so that the record sets are streamed and the shards can be balanced
+    without reading the record sets.
+    """
+    with open_output(output) as file:
+        file.write(json.dumps({"domain_name": zone.domain}) + "\n")
+        records = 0
+        for r in iter_from_zone(zone):
+            file.write(json.dumps([r.name, r.rectype, r.ttl, r.rrdatas]) + "\n")
+            records += len(r.rrdatas)
+        file.write(json.dumps({"records": records}) + "\n")
+
+
+class StagedZone:
+    """
+    a zone of which the record sets were staged by transform_to_terraform_data. It
+    generates its record sets when iterated, so it can be passed to the converters.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as file:
+            header = json.loads(file.readline())
+            file.seek(max(file.tell(), path.stat().st_size - 1024))
+            trailer = json.loads(file.read().splitlines()[-1])
+        self.domain = header["domain_name"]
+        self.records = trailer["records"]
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        with self.path.open("r") as file:
+            file.readline()
+            for line in file:
+                record_set = json.loads(line)
+                if isinstance(record_set, dict):
+                    return
+                yield DNSRecordSet(*record_set)
+
+
+def assign_shards(weights: List[int], shards: int) -> List[List[int]]:
+    """
+    assigns the items of `weights` to at most `shards` shards of about the same total
+    weight, with the longest processing time first heuristic: the heaviest item is
+    added to the lightest shard first. Returns the indexes of the items of each shard.
+
+    >>> assign_shards([5, 1, 4, 3, 3], 2)
+    [[0, 4], [1, 2, 3]]
+    >>> assign_shards([5, 1], 3)
+    [[0], [1]]
+    """
+    heap = [(0, shard) for shard in range(min(shards, len(weights)))]
+    result = [[] for _ in heap]
+    for i in sorted(range(len(weights)), key=lambda i: (-weights[i], i)):
+        total, shard = heapq.heappop(heap)
+        result[shard].append(i)
+        heapq.heappush(heap, (total + weights[i], shard))
+    return [sorted(shard) for shard in result]
+
+
+def shard_file(dst: Path, shard: int, format: str) -> Path:
+    """
+    returns the path of the `shard`-th shard in `format` in the directory `dst`.
+
+    >>> shard_file(Path('terraform'), 1, 'tfvars').as_posix()
+    'terraform/shard-001.tfvars.json'
+    """
+    suffix = ".tfvars.json" if format == "tfvars" else ".tf"
+    return dst.joinpath(f"shard-{shard:03d}{suffix}")
+
+
+def zone_variables(zone: StagedZone, maximum_ttl: int) -> dict:
+    """
+    returns the managed zone module variables of the `zone`, with the same values as
+    the module call of the HCL template.
+    """
+    domain_name = zone.domain
+    idna_domain_name = domain_name.encode("idna").decode("ascii")
+    return {
+        "domain_name": idna_domain_name,
+        "resource_record_sets": [
+            {
+                "name": r.name,
+                "type": r.rectype,
+                "ttl": maximum_ttl if maximum_ttl and r.ttl > maximum_ttl else r.ttl,
+                "rrdatas": [rrdata.strip('"') for rrdata in r.rrdatas],
+            }
+            for r in zone
+            if not (
+                r.rectype in ["SOA", "NS"] and r.name in [domain_name, idna_domain_name]
+            )
+        ],
+    }
+
+
+def write_terraform_shard(
+    output: Path, staged: [Path], provider: str, maximum_ttl: int, format: str
+):
+    """
+    writes the staged zones into the shard `output`: as the module calls of each
+    zone, or as the variables of the managed zones module in a .tfvars.json file.
+    """
+    with open_output(output) as file:
+        if format != "tfvars":
+            for path in staged:
+                write_terraform(StagedZone(path), provider, maximum_ttl, file)
+                file.write("\n")
+            return
+
+        file.write('{\n  "zones": {')
+        for i, path in enumerate(staged):
+            zone = StagedZone(path)
+            file.write(",\n" if i else "\n")
+            file.write(f"    {json.dumps(_resource_name(zone.domain))}: ")
+            file.write(json.dumps(zone_variables(zone, maximum_ttl)))
+        file.write("\n  }\n}\n")
+
+
+def write_terraform_shards(
+    staged: [Path],
+    dst: Path,
+    provider: str,
+    maximum_ttl: int,
+    shards: int,
+    format: str = "hcl",
+    jobs: int = 1,
+) -> [Path]:
+    """
+    writes the `staged` zones into at most `shards` shards in `dst`, balanced by
+    their number of records. The shards are written in parallel by `jobs` worker
+    processes. Returns the paths of the shards.
+    """
+    staged = [path for path in staged if path.exists()]
+    weights = [StagedZone(path).records for path in staged]
+    assignment = assign_shards(weights, shards)
+    outputs = [shard_file(dst, i, format) for i in range(1, len(assignment) + 1)]
+    if format == "tfvars":
+        template = environment().get_template(MANAGED_ZONES_TEMPLATE)
+        with open_output(dst.joinpath("main.tf")) as file:
+            template.stream(provider=provider).dump(file)
+
+    shard_zones = [[staged[i] for i in shard] for shard in assignment]
+    arguments = (
+        outputs,
+        shard_zones,
+        repeat(provider),
+        repeat(maximum_ttl),
+        repeat(format),
+    )
+    if jobs <= 1 or len(outputs) <= 1:
+        list(map(write_terraform_shard, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(outputs))) as executor:
+            list(executor.map(write_terraform_shard, *arguments))
+
+    for output, shard, zones in zip(outputs, assignment, shard_zones):
+        log.info(
+            "wrote %d zones with %d records to %s",
+            len(zones),
+            sum(weights[i] for i in shard),
+            output,
+        )
+
+    stale = shard_file(dst, len(outputs) + 1, format)
+    if stale.exists():
+        log.warning("%s is no longer generated", stale)
+    return outputs
+
+
+def terraform_conversion(
+    provider: str = "google",
+    maximum_ttl: Optional[int] = None,
+    normalize: bool = False,
+    shards: Optional[int] = None,
+) -> Tuple[str, dict, Callable[[easyzone.Zone, Path], Any]]:
+    """
+    returns the extension of the outputs, the options recorded in the manifest and
+    the transform of a conversion to Terraform with these options. With `shards`,
+    the zones are staged to be written into shards. The defaults are those of the
+    command, so that the conversions of the command and of the watch command with
+    its defaults share the manifest.
+    """
+    if shards:
+        extension = ".jsonl"
+        options = dict(
+            command="to-terraform",
+            staging=True,
+            normalize=normalize,
+            maximum_ttl=maximum_ttl if normalize else None,
+        )
+        transform = transform_to_terraform_data
+    else:
+        extension = ".tf"
+        options = dict(
+            command="to-terraform",
+            provider=provider,
+            maximum_ttl=maximum_ttl,
+            normalize=normalize,
+        )
+        transform = partial(
+            transform_to_terraform, provider=provider, maximum_ttl=maximum_ttl
+        )
+    if normalize:
+        transform = normalized(transform, maximum_ttl)
+    return extension, options, transform
+
+
+@click.command(
+    name="to-terraform",
+    short_help="Converts zonefiles into Terraform templates.",
+)
 @click.option(
     "--provider",
     required=False,
@@ -76,9 +365,103 @@ def convert_to_terraform(zone: easyzone.Zone, provider: str, maximum_ttl: int) -
     type=int,
     help="maximum TTL of domain name records",
 )
+@click.option(
+    "--jobs",
+    "-j",
+    required=False,
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    help="number of zonefiles to convert in parallel, defaults to the number of CPUs",
+)
+@click.option(
+    "--parser",
+    required=False,
+    type=click.Choice(list(zone_readers)),
+    default="easyzone",
+    help="to read the zonefiles with",
+)
+@click.option(
+    "--shards",
+    required=False,
+    type=click.IntRange(min=1),
+    help="number of shard files to write the zones into, balanced by record count",
+)
+@click.option(
+    "--shard-format",
+    required=False,
+    type=click.Choice(["hcl", "tfvars"]),
+    default="hcl",
+    help="of the shards: module calls, or variables of a single for_each module",
+)
+@click.option(
+    "--normalize",
+    is_flag=True,
+    default=False,
+    help="merge duplicate record sets and make the owner names canonical",
+)
+@click.option(
+    "--recursive",
+    "-r",
+    is_flag=True,
+    default=False,
+    help="search the SRC directories recursively for zonefiles",
+)
+@click.option(
+    "--include",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files in SRC directories to convert",
+)
+@click.option(
+    "--exclude",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files and directories in SRC directories to skip",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="convert all zonefiles, including those which did not change",
+)
+@click.option(
+    "--keep-going",
+    is_flag=True,
+    default=False,
+    help="convert the other zonefiles if a zonefile fails, and report the failures",
+)
+@click.option(
+    "--stats-json",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="to write the timing and size metrics of each zone to",
+)
+@click.option(
+    "--profile",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="to write the cProfile statistics of the conversion to",
+)
 @click.argument("src", nargs=-1, type=click.Path())
 @click.argument("dst", nargs=1, type=click.Path())
-def command(provider, maximum_ttl, src, dst):
+def command(
+    provider,
+    maximum_ttl,
+    jobs,
+    parser,
+    shards,
+    shard_format,
+    normalize,
+    recursive,
+    include,
+    exclude,
+    force,
+    keep_going,
+    stats_json,
+    profile,
+    src,
+    dst,
+):
     """
     Converts one or more `SRC` zonefiles into Terraform templates in `DST`.
 
@@ -91,18 +474,50 @@ def command(provider, maximum_ttl, src, dst):
     the name of the file will be used as the domain name.
 
     You may override the maximum TTL of records through the option --maximum-ttl
+
+    The zonefiles are converted in parallel by --jobs worker processes.
+
+    The zonefiles are read with easyzone, or with the faster native parser which
+    also supports $INCLUDE when --parser native is specified.
+
+    Directories in SRC are searched for zonefiles by sniffing the start of each file,
+    and with --recursive their subdirectories as well. Use --include and --exclude to
+    select files by glob patterns on their name or path relative to SRC.
+
+    Zonefiles which did not change since the previous conversion with the same options
+    are skipped, as recorded in the manifest .zonefile-migrate.json in `DST`. Use --force
+    to convert all zonefiles.
+
+    With --stats-json, the time spent discovering the zonefiles and parsing, extracting
+    the record sets and writing each zone, and its number of records, record sets and
+    bytes are written as JSON. With --profile, the conversion is profiled with cProfile.
+
+    With --shards, the zones are written into the given number of shard files, which
+    are balanced by the number of records of the zones, instead of a file per zone.
+    With --shard-format tfvars, a shard holds the variables of the zones only, as a
+    .tfvars.json file for the single main.tf module, to be applied in a workspace per
+    shard. The record sets of the zones are staged in `DST`/.zones, so that only
+    changed zonefiles are read again.
+
+    With --normalize, the owner names are made absolute, lowercase and IDNA encoded,
+    and record sets with the same name and type are merged into one with the lowest
+    TTL and without duplicate values. The changes are reported per zone.
+
+    With --keep-going, a zonefile which fails to convert does not stop the conversion
+    of the others. The failures are reported at the end, and the command exits with 1.
+    As the failed zonefiles are not recorded in the manifest, the next run only
+    converts those.
     """
-    tf_module_template = Path(__file__).parent.joinpath(
-        f"terraform-modules/{provider}-managed-zone.tf"
-    )
-    if not tf_module_template.exists():
+    if provider not in providers():
         raise click.UsageError(f"provider {provider} is not supported")
 
     if not src:
         raise click.UsageError("no source files were specified")
 
+    metrics = Metrics() if stats_json else None
     try:
-        inputs = get_all_zonefiles_in_path(src)
+        with metrics.discovery() if metrics else nullcontext():
+            inputs = get_all_zonefiles_in_path(src, recursive, include, exclude)
         if len(inputs) == 0:
             raise click.UsageError("no zonefiles were found")
     except ValueError as error:
@@ -115,19 +530,54 @@ def command(provider, maximum_ttl, src, dst):
         if not dst.exists():
             dst.mkdir(parents=True, exist_ok=True)
 
-    outputs = list(map(lambda d: target_file(d, dst, ".tf"), inputs))
+    if shards:
+        if dst.exists() and not dst.is_dir():
+            raise click.UsageError(f"{dst} is not a directory")
+        dst.joinpath(STAGING_DIRECTORY).mkdir(parents=True, exist_ok=True)
+
+    extension, options, transform = terraform_conversion(
+        provider, maximum_ttl, normalize, shards
+    )
+    try:
+        outputs = target_files(
+            inputs, dst.joinpath(STAGING_DIRECTORY) if shards else dst, extension
+        )
+    except ValueError as error:
+        raise click.UsageError(error)
 
     if dst.is_dir():
         main_path = dst.joinpath(f"{provider}-managed-zone/main.tf")
         if not main_path.exists():
             main_path.parent.mkdir(exist_ok=True)
-            main_path.write_bytes(tf_module_template.read_bytes())
+            main_path.write_text(provider_module(provider), encoding="utf-8")
 
-    def _transform_to_terraform(zone: easyzone.Zone, output: Path):
-        with output.open("w") as file:
-            file.write(convert_to_terraform(zone, provider, maximum_ttl))
+    manifest = Manifest(manifest_path(dst), options, force)
+    profiler = Profile() if profile else None
+    try:
+        failures = convert_zonefiles(
+            inputs,
+            outputs,
+            transform,
+            jobs,
+            parser,
+            manifest,
+            metrics,
+            profiler,
+            keep_going,
+        )
+    finally:
+        if metrics:
+            metrics.save(Path(stats_json))
+        if profiler:
+            profiler.save(Path(profile))
+
+    if shards:
+        write_terraform_shards(
+            outputs, dst, provider, maximum_ttl, shards, shard_format, jobs
+        )
 
-    convert_zonefiles(inputs, outputs, _transform_to_terraform)
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,71 +1,795 @@
+import codecs
+import cProfile
+import io
+import logging
+import mmap
+import os
 import re
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from fnmatch import fnmatch
+from itertools import islice
 from pathlib import Path
-from typing import Callable, List
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+import dns.zone
 from easyzone import easyzone
+from dns.exception import DNSException
 from zonefile_migrate.logger import log
+from zonefile_migrate import zonefile_parser
+from zonefile_migrate.cache import CachingZone, cache_path, load_cached_zone
+from zonefile_migrate.manifest import Manifest
+from zonefile_migrate.metrics import Metrics, Profile, ZoneMetrics
 
 
-def is_zonefile(path: Path) -> bool:
+def easyzone_from_file(
+    domain: str, filename: str, content: Optional[TextIO] = None
+) -> easyzone.Zone:
     """
-    returns true if the file pointed to by `path` contains a $ORIGIN or $TTL pragma, otherwise False
+    reads the zonefile `filename` with easyzone, from its `content` if it was already
+    read. The zone is loaded as easyzone.Zone.load_from_file does, but with the name of
+    the file in syntax errors.
     """
-    if path.exists() and path.is_file():
-        with path.open("r") as file:
-            for line in file:
-                if re.search(r"^\s*\$(ORIGIN|TTL)\s+", line, re.IGNORECASE):
-                    return True
-    return False
+    if content is None:
+        return easyzone.zone_from_file(domain, filename)
+    zone = easyzone.Zone(domain)
+    zone.filename = filename
+    zone._zone = dns.zone.from_file(
+        content, zone.domain, relativize=False, filename=filename
+    )
+    return zone
 
 
-def get_all_zonefiles_in_path(src: [Path]) -> [Path]:
+# the functions to read a zonefile with, by parser name
+zone_readers = {
+    "easyzone": easyzone_from_file,
+    "native": zonefile_parser.zone_from_file,
+}
+
+# the number of zonefiles read ahead of their conversion, per job
+PREFETCH_PER_JOB = 2
+
+# the maximum size of a zonefile read ahead, larger zonefiles are memory-mapped
+PREFETCH_MAXIMUM_SIZE = 64 * 1024 * 1024
+
+# the $ORIGIN directive at the start of a line, after an optional UTF-8 BOM
+_origin = re.compile(
+    rb"^(?:\xef\xbb\xbf)?[ \t]*\$ORIGIN[ \t]+(?P<domain_name>[^\s;]+)",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+
+# the number of bytes at the start of a file searched for a $ORIGIN or $TTL pragma
+SNIFF_SIZE = 64 * 1024
+
+
+def is_zonefile(path: Path, sniff_size: int = SNIFF_SIZE) -> bool:
+    """
+    returns true if the first `sniff_size` bytes of the file pointed to by `path`
+    contain a $ORIGIN or $TTL pragma, otherwise False
+    """
+    try:
+        with open(path, "rb") as file:
+            header = file.read(sniff_size)
+    except (IsADirectoryError, FileNotFoundError, PermissionError):
+        return False
+    if header[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        header = header.decode("utf-16", errors="ignore").encode("utf-8")
+    return (
+        re.search(
+            rb"^(?:\xef\xbb\xbf)?\s*\$(ORIGIN|TTL)\s+",
+            header,
+            re.MULTILINE | re.IGNORECASE,
+        )
+        is not None
+    )
+
+
+def matches(path: str, patterns: Iterable[str]) -> bool:
+    """
+    returns true if the relative `path` or its name matches any of the glob `patterns`.
+
+    >>> matches('sub/example.zone', ['*.zone'])
+    True
+    >>> matches('archive/example.com', ['archive/*'])
+    True
+    >>> matches('example.com', ['*.zone', 'archive/*'])
+    False
+    """
+    name = path.rsplit("/", 1)[-1]
+    return any(fnmatch(path, p) or fnmatch(name, p) for p in patterns)
+
+
+def iter_files(
+    directory: Path,
+    recursive: bool = False,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+) -> Iterator[Path]:
+    """
+    generates the files in `directory`, and in its subdirectories if `recursive`,
+    using os.scandir. If `include` patterns are specified, only the files which match
+    are generated. Files and directories which match an `exclude` pattern are skipped.
+    Symbolic links to directories are not followed.
+    """
+    directories = [(directory, "")]
+    while directories:
+        current, prefix = directories.pop()
+        subdirectories = []
+        with os.scandir(current) as entries:
+            for entry in entries:
+                relative = prefix + entry.name
+                if exclude and matches(relative, exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        subdirectories.append((Path(entry.path), relative + "/"))
+                elif entry.is_file() and (not include or matches(relative, include)):
+                    yield Path(entry.path)
+        directories.extend(reversed(subdirectories))
+
+
+def get_all_zonefiles_in_path(
+    src: [Path],
+    recursive: bool = False,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    jobs: Optional[int] = None,
+) -> [Path]:
     """
     creates a list of filenames of zonefiles from a list of paths. If the path
     is not a directory, the path will be added as is. If the path points to a
-    directory, the files of the directory will be scanned to determined if they
-    are a zonefile (see is_zonefile)
+    directory, the files of the directory, and of its subdirectories if `recursive`,
+    will be sniffed to determined if they are a zonefile (see is_zonefile). The files
+    are selected with the `include` and `exclude` glob patterns (see iter_files), and
+    sniffed by a pool of `jobs` threads.
     """
     inputs = []
-    for filename in map(lambda s: Path(s), src):
-        if not filename.exists():
-            raise ValueError(f"{filename} does not exist")
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for filename in map(lambda s: Path(s), src):
+            if not filename.exists():
+                raise ValueError(f"{filename} does not exist")
 
-        if filename.is_dir():
-            inputs.extend(
-                [f for f in filename.iterdir() if f.is_file() and is_zonefile(f)]
-            )
-        else:
-            inputs.append(filename)
+            if filename.is_dir():
+                files = list(iter_files(filename, recursive, include, exclude))
+                inputs.extend(
+                    f for f, z in zip(files, executor.map(is_zonefile, files)) if z
+                )
+            else:
+                inputs.append(filename)
     return inputs
 
 
+def target_files(inputs: [Path], dst: Path, extension: str) -> [Path]:
+    """
+    returns the target file in `dst` for each of the `inputs` (see target_file). Raises
+    a ValueError if two zonefiles would be written to the same target file.
+    """
+    outputs = list(map(lambda i: target_file(i, dst, extension), inputs))
+    if not dst.is_file():
+        sources = {}
+        for input, output in zip(inputs, outputs):
+            if output in sources:
+                raise ValueError(
+                    f"{input} and {sources[output]} are both converted into {output}"
+                )
+            sources[output] = input
+    return outputs
+
+
+class _BufferReader(io.RawIOBase):
+    """
+    reads a bytes buffer, like a memory-mapped file, from `offset` without copying
+    it as a whole.
+    """
+
+    def __init__(self, buffer, offset: int = 0):
+        self.view = memoryview(buffer)
+        self.position = offset
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, destination) -> int:
+        size = min(len(destination), len(self.view) - self.position)
+        destination[:size] = self.view[self.position : self.position + size]
+        self.position += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.view.release()
+        super().close()
+
+
+def zonefile_encoding(buffer) -> Tuple[str, int]:
+    """
+    returns the encoding of the zonefile in `buffer` by its byte order mark, and the
+    offset of its content. Zonefiles without a byte order mark are read as UTF-8.
+
+    >>> zonefile_encoding(codecs.BOM_UTF8 + b"$ORIGIN example.com.")
+    ('utf-8', 3)
+    >>> zonefile_encoding("$ORIGIN example.com.".encode("utf-16"))
+    ('utf-16', 0)
+    >>> zonefile_encoding(b"$ORIGIN example.com.")
+    ('utf-8', 0)
+    """
+    if buffer[:3] == codecs.BOM_UTF8:
+        return "utf-8", len(codecs.BOM_UTF8)
+    if buffer[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        return "utf-16", 0
+    return "utf-8", 0
+
+
+def find_origin(buffer, encoding: str = "utf-8") -> Optional[str]:
+    """
+    returns the domain name of the first $ORIGIN directive in the zonefile in
+    `buffer`, searching no further than that directive.
+
+    >>> find_origin(b"; $ORIGIN comment.\\n$TTL 300\\n$origin example.com. ; zone\\n")
+    'example.com.'
+    """
+    found = _origin.search(buffer)
+    if not found:
+        return None
+    return found.group("domain_name").decode(encoding)
+
+
+def _find_origin(buffer, encoding: str) -> Optional[str]:
+    try:
+        return find_origin(buffer, encoding)
+    except UnicodeDecodeError:
+        return find_origin(buffer, "latin-1")
+
+
+def zonefile_origin(buffer) -> Optional[str]:
+    """
+    returns the domain name of the $ORIGIN directive in the zonefile in `buffer`,
+    which is decoded as read_zonefile does.
+
+    >>> zonefile_origin("$TTL 300\\n$ORIGIN example.com.\\n".encode("utf-16"))
+    'example.com.'
+    """
+    encoding, _ = zonefile_encoding(buffer)
+    if encoding != "utf-8":
+        buffer = codecs.decode(buffer, encoding).encode("utf-8")
+        encoding = "utf-8"
+    return _find_origin(buffer, encoding)
+
+
+def _parse_zonefile(
+    input: Path, parser: str, domain_name: str, buffer, offset: int, encoding: str
+):
+    with io.TextIOWrapper(
+        io.BufferedReader(_BufferReader(buffer, offset)), encoding=encoding
+    ) as content:
+        return zone_readers[parser](domain_name, input.as_posix(), content)
+
+
+def _read_zonefile(input: Path, parser: str, buffer, origin: Optional[str]):
+    encoding, offset = zonefile_encoding(buffer)
+    if encoding != "utf-8":
+        log.warning("zonefile %s is %s encoded, converting it", input, encoding)
+        buffer = codecs.decode(buffer, encoding).encode("utf-8")
+        encoding, offset = "utf-8", 0
+
+    domain_name = _find_origin(buffer, encoding) or origin
+    if not domain_name:
+        domain_name = input.name.removesuffix(".zone")
+        log.warning(
+            "could not find $ORIGIN from zone file %s, using %s",
+            input,
+            domain_name,
+        )
+
+    path = cache_path(buffer, domain_name, parser)
+    zone = load_cached_zone(path) if path else None
+    if zone:
+        log.info("reading zonefile %s from the cache", input.as_posix())
+        return zone
+
+    log.info("reading zonefile %s", input.as_posix())
+    try:
+        zone = _parse_zonefile(input, parser, domain_name, buffer, offset, encoding)
+    except UnicodeDecodeError as error:
+        log.warning(
+            "zonefile %s is not UTF-8 encoded (%s), reading it as Latin-1",
+            input,
+            error.reason,
+        )
+        zone = _parse_zonefile(input, parser, domain_name, buffer, offset, "latin-1")
+    return CachingZone(zone, path) if path else zone
+
+
+def read_zonefile(
+    input: Path,
+    parser: str = "easyzone",
+    content: Optional[bytes] = None,
+    origin: Optional[str] = None,
+):
+    """
+    reads the zonefile `input` with the `parser`, from its `content` if it was already
+    read, or otherwise from a memory map of the file. The $ORIGIN is searched in the
+    buffer and the parser decodes it while it reads, so the zonefile is not copied.
+    If the zonefile does not contain a $ORIGIN, the `origin` is used as domain name,
+    or otherwise the name of the file.
+
+    Zonefiles are read as UTF-8, skipping a byte order mark. Zonefiles with a UTF-16
+    byte order mark are converted to UTF-8 first, and zonefiles which are not valid
+    UTF-8, like legacy exports, are read as Latin-1.
+
+    If the cache is enabled, the record sets of a zonefile which was read before are
+    loaded from the cache instead, and otherwise stored in it when they are generated.
+    """
+    if content is not None:
+        return _read_zonefile(input, parser, content, origin)
+
+    with input.open("rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return _read_zonefile(input, parser, b"", origin)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _read_zonefile(input, parser, buffer, origin)
+
+
+def _read_ahead(input: Path) -> Optional[bytes]:
+    if input.stat().st_size > PREFETCH_MAXIMUM_SIZE:
+        return None
+    return input.read_bytes()
+
+
+def read_ahead(
+    inputs: Iterable[Path], depth: int
+) -> Iterator[Tuple[Path, Optional[bytes]]]:
+    """
+    generates the content of each of the `inputs` in order, while the next `depth`
+    zonefiles are read by a pool of threads, so that reading the zonefiles overlaps
+    with their conversion. The content of zonefiles larger than PREFETCH_MAXIMUM_SIZE
+    is None, as these are memory-mapped when they are converted, and so is that of
+    zonefiles which could not be read.
+    """
+    inputs = iter(inputs)
+    with ThreadPoolExecutor(max_workers=max(depth, 1)) as executor:
+        pending = deque(
+            (input, executor.submit(_read_ahead, input))
+            for input in islice(inputs, max(depth, 1))
+        )
+        while pending:
+            input, content = pending.popleft()
+            for next_input in islice(inputs, 1):
+                pending.append(
+                    (next_input, executor.submit(_read_ahead, next_input))
+                )
+            try:
+                content = content.result()
+            except OSError:
+                # the error is reported when the zonefile is read for its conversion
+                content = None
+            yield input, content
+
+
+class OutputWriter:
+    """
+    closes and renames the outputs written with open_output on a separate thread, so
+    that flushing an output overlaps with the conversion of the next zonefile.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending: List[Future] = []
+
+    def commit(self, file: TextIO, temporary: Path, output: Path):
+        self.pending.append(
+            self.executor.submit(_commit_output, file, temporary, output)
+        )
+
+    def take(self) -> List[Future]:
+        """
+        returns the commits of the outputs written since the previous call.
+        """
+        result, self.pending = self.pending, []
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+_output_writer: ContextVar[Optional[OutputWriter]] = ContextVar(
+    "output_writer", default=None
+)
+
+
+def _commit_output(file: TextIO, temporary: Path, output: Path):
+    try:
+        file.close()
+        temporary.replace(output)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def open_output(output: Path) -> Iterator[TextIO]:
+    """
+    opens a temporary file next to `output` for writing, which replaces `output`
+    when it is complete, so that an output is never partially written. If the
+    conversion runs with an OutputWriter, the file is flushed and renamed by it.
+    """
+    temporary = output.with_name(f".{output.name}.{uuid.uuid4().hex[:8]}.tmp")
+    file = temporary.open("x")
+    try:
+        yield file
+    except BaseException:
+        file.close()
+        temporary.unlink(missing_ok=True)
+        raise
+
+    writer = _output_writer.get()
+    if writer:
+        writer.commit(file, temporary, output)
+    else:
+        _commit_output(file, temporary, output)
+
+
+def zonefile_failure(input: Path, error: str) -> dict:
+    """
+    returns the failure of the conversion of the zonefile `input` with the `error`,
+    with the file and line of the error if it has them.
+
+    >>> zonefile_failure(Path('zones/example.com'), "zones/inc:4: unknown rdatatype 'X'")
+    {'zonefile': 'zones/example.com', 'file': 'zones/inc', 'line': 4, 'message': "unknown rdatatype 'X'"}
+    >>> zonefile_failure(Path('zones/example.com'), "The DNS zone has no NS RRset at its origin.")
+    {'zonefile': 'zones/example.com', 'file': 'zones/example.com', 'line': None, 'message': 'The DNS zone has no NS RRset at its origin.'}
+    """
+    found = re.fullmatch(
+        r"(?P<file>.+?):(?P<line>\d+): (?P<message>.*)", error, re.DOTALL
+    )
+    return {
+        "zonefile": input.as_posix(),
+        "file": found.group("file") if found else input.as_posix(),
+        "line": int(found.group("line")) if found else None,
+        "message": found.group("message") if found else error,
+    }
+
+
+def conversion_error(error: Exception) -> str:
+    """
+    returns the message of the `error` of the conversion of a zonefile. The type of
+    errors other than syntax, I/O and decoding errors is included, as their message
+    may not explain the error by itself.
+
+    >>> conversion_error(KeyError('example.com.'))
+    "KeyError: 'example.com.'"
+    >>> conversion_error(FileNotFoundError(2, 'No such file or directory', 'zones/inc'))
+    "[Errno 2] No such file or directory: 'zones/inc'"
+    """
+    if isinstance(error, (DNSException, OSError, UnicodeError)):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def convert_zonefile(
+    input: Path,
+    output: Path,
+    transform: Callable[[easyzone.Zone, Path], None],
+    parser: str = "easyzone",
+    metrics: Optional[ZoneMetrics] = None,
+    content: Optional[bytes] = None,
+):
+    """
+    reads the zonefile `input` with the `parser`, from its `content` if it was already
+    read, and transforms it into `output`. If `metrics` are specified, the stages of
+    the conversion are measured. Returns the result of the `transform`.
+    """
+    if not metrics:
+        return transform(read_zonefile(input, parser, content), output)
+
+    with metrics.stage("parse"):
+        zone = read_zonefile(input, parser, content)
+    with metrics.stage("write"):
+        return transform(metrics.measure(zone), output)
+
+
+class _LogRecorder(logging.Handler):
+    """
+    records the log messages of a worker process, so that the parent process
+    can replay them in the order of the zonefiles.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+def _convert_zonefile_in_worker(
+    input: Path,
+    output: Path,
+    transform: Callable[[easyzone.Zone, Path], None],
+    parser: str,
+    measure: bool = False,
+    profile: bool = False,
+    content: Optional[bytes] = None,
+) -> (
+    List[logging.LogRecord], Optional[str], Optional[dict], Optional[dict], Any
+):
+    """
+    converts a single zonefile from its `content`, which was read by the parent
+    process, in a worker process, returning the recorded log messages, the syntax
+    error, if any, the metrics and profile statistics if the conversion is measured
+    or profiled, and the result of the transform.
+    """
+    recorder = _LogRecorder()
+    propagate = log.propagate
+    log.addHandler(recorder)
+    log.propagate = False
+    metrics = ZoneMetrics(input, output) if measure else None
+    profiler = cProfile.Profile() if profile else None
+    result = None
+    try:
+        if profiler:
+            profiler.enable()
+        result = convert_zonefile(input, output, transform, parser, metrics, content)
+        error = None
+    except Exception as e:
+        error = conversion_error(e)
+    finally:
+        if profiler:
+            profiler.disable()
+        log.removeHandler(recorder)
+        log.propagate = propagate
+
+    if profiler:
+        profiler.create_stats()
+    return (
+        recorder.records,
+        error,
+        metrics.result() if metrics and not error else None,
+        profiler.stats if profiler else None,
+        result,
+    )
+
+
 def convert_zonefiles(
-    inputs: [Path], outputs: [Path], transform: Callable[[easyzone.Zone, Path], None]
+    inputs: [Path],
+    outputs: [Path],
+    transform: Callable[[easyzone.Zone, Path], None],
+    jobs: int = 1,
+    parser: str = "easyzone",
+    manifest: Optional[Manifest] = None,
+    metrics: Optional[Metrics] = None,
+    profile: Optional[Profile] = None,
+    keep_going: bool = False,
+    results: Optional[Dict[Path, Any]] = None,
+) -> List[dict]:
+    """
+    converts each of the zonefiles in `inputs` into the corresponding `outputs`, using
+    `transform` on the zone read by `parser`. If `jobs` is greater than one, the
+    zonefiles are converted in a pool of worker processes, in which case `transform`
+    must be picklable. The log messages of the workers are reported in the order of
+    the inputs, so the output is identical to a serial run.
+
+    If a `manifest` is specified, zonefiles which did not change since the output was
+    generated are skipped, and outputs of zonefiles which no longer exist are reported.
+
+    If `metrics` are specified, the stages of the conversion of each zone are measured.
+    If a `profile` is specified, the conversion is profiled with cProfile.
+
+    A zonefile which fails to convert exits the process, unless `keep_going` is
+    specified. Then the other zonefiles are converted, and the failures are reported
+    at the end and returned (see zonefile_failure). As failed zonefiles are not
+    recorded in the manifest, the next run only converts those.
+
+    If `results` are specified, the result of the `transform` of each zonefile which
+    was converted is stored in it by output.
+    """
+    inputs = list(map(lambda s: Path(s), inputs))
+    if metrics:
+        metrics.values["zonefiles"] = len(inputs)
+    if manifest:
+        pending = []
+        for input, output in zip(inputs, outputs):
+            if manifest.is_current(input, output):
+                log.debug("skipping unchanged zonefile %s", input.as_posix())
+                if metrics:
+                    metrics.skip(input)
+            else:
+                pending.append((input, output))
+        if len(pending) < len(inputs):
+            log.info("skipped %d unchanged zonefiles", len(inputs) - len(pending))
+        inputs, outputs = [i for i, _ in pending], [o for _, o in pending]
+
+    failures = [] if keep_going else None
+    try:
+        _convert_zonefiles(
+            inputs,
+            outputs,
+            transform,
+            jobs,
+            parser,
+            manifest,
+            metrics,
+            profile,
+            failures,
+            results,
+        )
+    finally:
+        if manifest:
+            for output in manifest.stale():
+                log.warning("%s is stale, its zonefile no longer exists", output)
+            manifest.save()
+
+    if failures:
+        log.error("failed to convert %d of %d zonefiles:", len(failures), len(inputs))
+        for failure in failures:
+            log.error(
+                "  %s%s: %s",
+                failure["file"],
+                f":{failure['line']}" if failure["line"] else "",
+                failure["message"],
+            )
+    return failures or []
+
+
+def _record_conversion(
+    manifest: Optional[Manifest],
+    metrics: Optional[Metrics],
+    input: Path,
+    output: Path,
+    content: bytes,
+    zone_metrics: Optional[dict],
+    results: Optional[Dict[Path, Any]],
+    result: Any,
+):
+    if manifest:
+        manifest.update(input, output, content)
+    if metrics:
+        metrics.add(zone_metrics)
+    if results is not None:
+        results[output] = result
+
+
+def _fail_conversion(
+    failures: Optional[List[dict]],
+    metrics: Optional[Metrics],
+    input: Path,
+    error: str,
+):
+    """
+    reports the `error` of the conversion of `input`, and adds it to the `failures`.
+    If failures are not collected, the process exits.
+    """
+    log.error(error)
+    if failures is None:
+        exit(1)
+    failure = zonefile_failure(input, error)
+    failures.append(failure)
+    if metrics:
+        metrics.fail(failure)
+
+
+def _convert_zonefiles(
+    inputs: [Path],
+    outputs: [Path],
+    transform: Callable[[easyzone.Zone, Path], None],
+    jobs: int,
+    parser: str,
+    manifest: Optional[Manifest],
+    metrics: Optional[Metrics],
+    profile: Optional[Profile],
+    failures: Optional[List[dict]],
+    results: Optional[Dict[Path, Any]],
 ):
-    for i, input in enumerate(map(lambda s: Path(s), inputs)):
-        with input.open("r") as file:
-            content = file.read()
-            found = re.search(
-                r"\$ORIGIN\s+(?P<domain_name>.*)\s*",
+    """
+    converts the zonefiles in a pipeline: the zonefiles are read ahead by a pool of
+    threads, and parsed and transformed by a pool of worker processes or, for a
+    serial conversion, by this thread while an OutputWriter flushes the outputs of
+    the previous zonefile. The number of zonefiles in the pipeline is bounded.
+    """
+    if not jobs or jobs <= 1 or len(inputs) <= 1:
+        writer = OutputWriter()
+        token = _output_writer.set(writer)
+        committing = deque()
+
+        def commit_previous(keep: int):
+            while len(committing) > keep:
+                i, content, zone_metrics, commits, result = committing.popleft()
+                for commit in commits:
+                    commit.result()
+                _record_conversion(
+                    manifest,
+                    metrics,
+                    inputs[i],
+                    outputs[i],
+                    content,
+                    zone_metrics.result() if zone_metrics else None,
+                    results,
+                    result,
+                )
+
+        try:
+            contents = read_ahead(inputs, PREFETCH_PER_JOB)
+            for i, (input, content) in enumerate(contents):
+                zone_metrics = ZoneMetrics(input, outputs[i]) if metrics else None
+                try:
+                    with profile.profiling() if profile else nullcontext():
+                        result = convert_zonefile(
+                            input, outputs[i], transform, parser, zone_metrics, content
+                        )
+                except Exception as error:
+                    commit_previous(0)
+                    _fail_conversion(failures, metrics, input, conversion_error(error))
+                    continue
+                committing.append((i, content, zone_metrics, writer.take(), result))
+                commit_previous(1)
+            commit_previous(0)
+        finally:
+            _output_writer.reset(token)
+            writer.close()
+        return
+
+    workers = min(jobs, len(inputs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def complete_next():
+            i, content, result = pending.popleft()
+            records, error, zone_metrics, stats, transformed = result.result()
+            for record in records:
+                log.handle(record)
+            if stats:
+                profile.add(stats)
+            if error:
+                if failures is None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                _fail_conversion(failures, metrics, inputs[i], error)
+                return
+            _record_conversion(
+                manifest,
+                metrics,
+                inputs[i],
+                outputs[i],
                 content,
-                re.MULTILINE | re.IGNORECASE,
+                zone_metrics,
+                results,
+                transformed,
             )
-            if found:
-                domain_name = found.group("domain_name")
-            else:
-                domain_name = input.name.removesuffix(".zone")
-                log.warning(
-                    "could not find $ORIGIN from zone file %s, using %s",
-                    input,
-                    domain_name,
-                )
 
-            try:
-                log.info("reading zonefile %s", input.as_posix())
-                zone = easyzone.zone_from_file(domain_name, input.as_posix())
-                transform(zone, outputs[i])
-            except SyntaxError as error:
-                log.error(error)
-                exit(1)
+        contents = read_ahead(inputs, workers * PREFETCH_PER_JOB)
+        for i, (input, content) in enumerate(contents):
+            result = executor.submit(
+                _convert_zonefile_in_worker,
+                input,
+                outputs[i],
+                transform,
+                parser,
+                metrics is not None,
+                profile is not None,
+                content,
+            )
+            pending.append((i, content, result))
+            if len(pending) >= workers * PREFETCH_PER_JOB:
+                complete_next()
+        while pending:
+            complete_next()
 
 
 def target_file(src: Path, dst: Path, extension: str) -> Path:
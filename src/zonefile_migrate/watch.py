@@ -0,0 +1,625 @@
+"""
+watches the directories of zonefiles, and converts each zonefile again as soon as it
+changes. The changes are reported by inotify on Linux, and otherwise found by polling
+the modification time and size of the files.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import click
+from easyzone import easyzone
+from zonefile_migrate.logger import log
+from zonefile_migrate.manifest import Manifest, manifest_path
+from zonefile_migrate.utils import (
+    conversion_error,
+    convert_zonefile,
+    convert_zonefiles,
+    get_all_zonefiles_in_path,
+    is_zonefile,
+    matches,
+    target_file,
+    target_files,
+    zone_readers,
+)
+
+# the default number of seconds without changes before the changes are converted
+DEFAULT_DEBOUNCE = 0.2
+
+# the default number of seconds between two scans of the polling watcher
+DEFAULT_POLL_INTERVAL = 1.0
+
+# the events of inotify, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# the events of the files in a watched directory which change a zonefile. A zonefile
+# is reported when it is closed after writing, not on every write to it.
+IN_CHANGED = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# the header of an inotify event: wd, mask, cookie and the length of the name
+_event = struct.Struct("iIII")
+
+
+def _iter_directories(directory: Path, recursive: bool) -> Iterator[Path]:
+    yield directory
+    if not recursive:
+        return
+    try:
+        with os.scandir(directory) as entries:
+            subdirectories = [
+                Path(e.path) for e in entries if e.is_dir(follow_symlinks=False)
+            ]
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return
+    for subdirectory in subdirectories:
+        yield from _iter_directories(subdirectory, recursive)
+
+
+def _iter_files(directory: Path, recursive: bool) -> Iterator[os.DirEntry]:
+    for current in _iter_directories(directory, recursive):
+        try:
+            with os.scandir(current) as entries:
+                yield from (e for e in entries if e.is_file(follow_symlinks=False))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+
+
+class PollingWatcher:
+    """
+    reports the files in the `directories`, and in their subdirectories if
+    `recursive`, which were created, changed or removed, by comparing their
+    modification time, size and inode every `interval` seconds.
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[Path],
+        recursive: bool = False,
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.directories = list(directories)
+        self.recursive = recursive
+        self.interval = interval
+        self.files = self.scan()
+
+    def scan(self) -> Dict[Path, Tuple[int, int, int]]:
+        files = {}
+        for directory in self.directories:
+            for entry in _iter_files(directory, self.recursive):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                files[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return files
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """
+        returns the files which changed, waiting at most `timeout` seconds for a
+        change, or until a file changes if `timeout` is None.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = max(0.0, min(delay, deadline - time.monotonic()))
+            time.sleep(delay)
+            files = self.scan()
+            changes = {
+                path
+                for path in files.keys() | self.files.keys()
+                if files.get(path) != self.files.get(path)
+            }
+            self.files = files
+            if changes or (deadline is not None and time.monotonic() >= deadline):
+                return changes
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class InotifyWatcher:
+    """
+    reports the files in the `directories`, and in their subdirectories if
+    `recursive`, which were created, changed or removed, as notified by the Linux
+    inotify API. Subdirectories which are created are watched as well. Raises an
+    OSError if inotify is not available, or the limit of watches is reached.
+    """
+
+    def __init__(self, directories: Iterable[Path], recursive: bool = False):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+        except AttributeError:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+        self.directories = list(directories)
+        self.recursive = recursive
+        self.watches: Dict[int, Path] = {}
+        try:
+            for directory in self.directories:
+                for subdirectory in _iter_directories(directory, recursive):
+                    self.watch(subdirectory)
+        except OSError:
+            self.close()
+            raise
+
+    def watch(self, directory: Path):
+        wd = self._add_watch(self.fd, os.fsencode(directory), IN_CHANGED | IN_ONLYDIR)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(error, f"{os.strerror(error)}: {directory}")
+        self.watches[wd] = directory
+
+    def read(self) -> Set[Path]:
+        changes = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changes
+
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = _event.unpack_from(buffer, offset)
+                offset += _event.size
+                name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    log.warning("missed changes of the zonefiles, scanning them all")
+                    changes.update(self.scan())
+                    continue
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None or not name:
+                    continue
+
+                path = directory.joinpath(name)
+                if not mask & IN_ISDIR:
+                    if not mask & IN_CREATE:
+                        changes.add(path)
+                elif self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    for subdirectory in _iter_directories(path, True):
+                        self.watch(subdirectory)
+                    changes.update(Path(e.path) for e in _iter_files(path, True))
+
+    def scan(self) -> Set[Path]:
+        return {
+            Path(entry.path)
+            for directory in self.directories
+            for entry in _iter_files(directory, self.recursive)
+        }
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """
+        returns the files which changed, waiting at most `timeout` seconds for a
+        change, or until a file changes if `timeout` is None.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            changes = self.read() if readable else set()
+            if changes or not readable:
+                return changes
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_watcher(
+    directories: Iterable[Path],
+    recursive: bool = False,
+    polling: bool = False,
+    interval: float = DEFAULT_POLL_INTERVAL,
+):
+    """
+    returns an InotifyWatcher of the `directories`, or a PollingWatcher scanning them
+    every `interval` seconds if `polling` or if inotify is not available.
+    """
+    directories = list(directories)
+    if not polling:
+        try:
+            return InotifyWatcher(directories, recursive)
+        except OSError as error:
+            log.warning("cannot watch with inotify, %s, polling instead", error)
+    return PollingWatcher(directories, recursive, interval)
+
+
+def iter_batches(watcher, debounce: float = DEFAULT_DEBOUNCE) -> Iterator[Set[Path]]:
+    """
+    generates the files which changed, in batches of the changes which are less than
+    `debounce` seconds apart, so that a burst of edits is converted once.
+    """
+    while True:
+        changes = watcher.wait()
+        while True:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            changes |= more
+        yield changes
+
+
+class ZonefileWatch:
+    """
+    converts the zonefiles in `src` which changed into `dst`, with the `transform`
+    into files with the `extension`. The files in `src` are always converted, the
+    files in the directories in `src` if they are zonefiles selected by the
+    `recursive`, `include` and `exclude` options, as by get_all_zonefiles_in_path.
+    Hidden files and backup files ending in ~, like those written by editors, are
+    ignored. The outputs are recorded in the `manifest`.
+    """
+
+    def __init__(
+        self,
+        src: [Path],
+        dst: Path,
+        extension: str,
+        transform: Callable[[easyzone.Zone, Path], None],
+        parser: str,
+        manifest: Manifest,
+        recursive: bool = False,
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+    ):
+        src = list(map(lambda s: Path(s), src))
+        self.directories = [s for s in src if s.is_dir()]
+        self.files = {s for s in src if not s.is_dir()}
+        self.dst = dst
+        self.extension = extension
+        self.transform = transform
+        self.parser = parser
+        self.manifest = manifest
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.sources: Dict[Path, Path] = {}
+
+    def watched_directories(self) -> [Path]:
+        """
+        returns the directories to watch: the directories in `src`, and those of the
+        files in `src`, as an edited file may be replaced by another one.
+        """
+        directories = list(self.directories)
+        for file in self.files:
+            if file.parent not in directories:
+                directories.append(file.parent)
+        return directories
+
+    def select(self, path: Path) -> bool:
+        """
+        returns true if the changed `path` is a file in `src`, or would be searched
+        for zonefiles in a directory in `src`.
+        """
+        if path in self.files:
+            return True
+        if path.name.startswith(".") or path.name.endswith("~"):
+            return False
+
+        for directory in self.directories:
+            try:
+                parts = path.relative_to(directory).parts
+            except ValueError:
+                continue
+            if len(parts) > 1 and not self.recursive:
+                continue
+            relative = "/".join(parts)
+            if self.exclude and any(
+                matches("/".join(parts[:i]), self.exclude)
+                for i in range(1, len(parts) + 1)
+            ):
+                continue
+            if self.include and not matches(relative, self.include):
+                continue
+            return True
+        return False
+
+    def convert_all(self, inputs: [Path], outputs: [Path], jobs: int) -> List[dict]:
+        """
+        converts the zonefiles in `inputs` which changed since the manifest was
+        written, before the changes are watched.
+        """
+        self.sources.update(zip(outputs, inputs))
+        return convert_zonefiles(
+            inputs,
+            outputs,
+            self.transform,
+            jobs,
+            self.parser,
+            self.manifest,
+            keep_going=True,
+        )
+
+    def update(self, paths: Iterable[Path]) -> List[Path]:
+        """
+        converts the zonefiles among the changed `paths`, and returns the outputs
+        which were written. A zonefile which fails to convert is reported with its
+        error, and converted again when it changes. Only the errors of zonefiles
+        which were removed in the meantime are not reported.
+        """
+        pending = []
+        for path in sorted(paths):
+            if not self.select(path):
+                continue
+            output = target_file(path, self.dst, self.extension)
+            if not path.exists():
+                if self.sources.get(output) == path and output.exists():
+                    log.warning("%s is stale, its zonefile no longer exists", output)
+                continue
+            if path not in self.files and not is_zonefile(path):
+                continue
+            source = self.sources.setdefault(output, path)
+            if source != path and source.exists():
+                log.error("%s and %s are both converted into %s", path, source, output)
+                continue
+            self.sources[output] = path
+            pending.append((path, output))
+
+        outputs = []
+        for input, output in pending:
+            started = time.perf_counter()
+            try:
+                self.manifest.forget(input)
+                if self.manifest.is_current(input, output):
+                    log.debug("skipping unchanged zonefile %s", input.as_posix())
+                    continue
+                content = input.read_bytes()
+                convert_zonefile(
+                    input, output, self.transform, self.parser, None, content
+                )
+            except Exception as error:
+                if not input.exists():
+                    continue
+                message = conversion_error(error)
+                log.error("failed to convert %s, %s", input.as_posix(), message)
+                continue
+            self.manifest.update(input, output, content)
+            outputs.append(output)
+            log.info(
+                "converted %s in %.3fs", input.as_posix(), time.perf_counter() - started
+            )
+        if outputs:
+            self.manifest.save()
+        return outputs
+
+
+def target_conversion(
+    to: str, provider: str, maximum_ttl: Optional[int], normalize: bool
+) -> (str, dict, Callable[[easyzone.Zone, Path], None]):
+    """
+    returns the extension of the outputs, the manifest options and the transform of
+    the conversion by the command `to`, with the default options of that command,
+    so that the conversions of the command and of the watch share the manifest.
+    """
+    if to == "cloudformation":
+        from zonefile_migrate.to_cloudformation import cloudformation_conversion
+
+        return cloudformation_conversion(maximum_ttl, normalize=normalize)
+
+    from zonefile_migrate.to_terraform import terraform_conversion
+
+    return terraform_conversion(provider, maximum_ttl, normalize)
+
+
+@click.command(
+    name="watch",
+    short_help="Converts zonefiles again whenever they change.",
+)
+@click.option(
+    "--to",
+    required=False,
+    type=click.Choice(["cloudformation", "terraform"]),
+    default="cloudformation",
+    help="type of the templates to convert the zonefiles into",
+)
+@click.option(
+    "--provider",
+    required=False,
+    default="google",
+    help="name of provider to generate the managed zone for (google)",
+)
+@click.option(
+    "--maximum-ttl",
+    required=False,
+    type=int,
+    help="maximum TTL of domain name records",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    required=False,
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    help="number of zonefiles to convert in parallel at the start",
+)
+@click.option(
+    "--parser",
+    required=False,
+    type=click.Choice(list(zone_readers)),
+    default="easyzone",
+    help="to read the zonefiles with",
+)
+@click.option(
+    "--normalize",
+    is_flag=True,
+    default=False,
+    help="merge duplicate record sets and make the owner names canonical",
+)
+@click.option(
+    "--recursive",
+    "-r",
+    is_flag=True,
+    default=False,
+    help="watch the SRC directories recursively for zonefiles",
+)
+@click.option(
+    "--include",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files in SRC directories to convert",
+)
+@click.option(
+    "--exclude",
+    required=False,
+    multiple=True,
+    help="glob pattern of the files and directories in SRC directories to skip",
+)
+@click.option(
+    "--debounce",
+    required=False,
+    type=click.FloatRange(min=0),
+    default=DEFAULT_DEBOUNCE,
+    help="seconds without changes before the changed zonefiles are converted",
+)
+@click.option(
+    "--polling",
+    is_flag=True,
+    default=False,
+    help="poll the SRC directories for changes, instead of using inotify",
+)
+@click.option(
+    "--poll-interval",
+    required=False,
+    type=click.FloatRange(min=0.01),
+    default=DEFAULT_POLL_INTERVAL,
+    help="seconds between two scans of the SRC directories when polling",
+)
+@click.argument("src", nargs=-1, type=click.Path())
+@click.argument("dst", nargs=1, type=click.Path(file_okay=False))
+def command(
+    to,
+    provider,
+    maximum_ttl,
+    jobs,
+    parser,
+    normalize,
+    recursive,
+    include,
+    exclude,
+    debounce,
+    polling,
+    poll_interval,
+    src,
+    dst,
+):
+    """
+    Converts the `SRC` zonefiles into templates in the directory `DST`, and converts
+    each zonefile again whenever it changes, until interrupted.
+
+    The zonefiles are converted into CloudFormation templates, as by
+    to-cloudformation, or with --to terraform into Terraform templates, as by
+    to-terraform, with the default options of that command. The manifest in `DST`
+    is shared with that command, so only the zonefiles which changed since its last
+    conversion are converted at the start, by --jobs worker processes.
+
+    The SRC directories, and with --recursive their subdirectories, are watched
+    with inotify, or polled every --poll-interval seconds if inotify is not available
+    or --polling is specified. The changes are converted when no file changed for
+    --debounce seconds, so that a burst of edits is converted once. Only the changed
+    zonefiles are read and converted again, in this process. Hidden files and
+    backup files ending in ~ in SRC directories are ignored.
+    """
+    if not src:
+        raise click.UsageError("no source files were specified")
+
+    if to == "terraform":
+        from zonefile_migrate.to_terraform import provider_module, providers
+
+        if provider not in providers():
+            raise click.UsageError(f"provider {provider} is not supported")
+
+    try:
+        inputs = get_all_zonefiles_in_path(src, recursive, include, exclude)
+    except ValueError as error:
+        raise click.UsageError(error)
+
+    dst = Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+    extension, options, transform = target_conversion(
+        to, provider, maximum_ttl, normalize
+    )
+    try:
+        outputs = target_files(inputs, dst, extension)
+    except ValueError as error:
+        raise click.UsageError(error)
+
+    if to == "terraform":
+        main_path = dst.joinpath(f"{provider}-managed-zone/main.tf")
+        if not main_path.exists():
+            main_path.parent.mkdir(exist_ok=True)
+            main_path.write_text(provider_module(provider), encoding="utf-8")
+
+    watch = ZonefileWatch(
+        src,
+        dst,
+        extension,
+        transform,
+        parser,
+        Manifest(manifest_path(dst), options),
+        recursive,
+        include,
+        exclude,
+    )
+    with open_watcher(
+        watch.watched_directories(), recursive, polling, poll_interval
+    ) as watcher:
+        watch.convert_all(inputs, outputs, jobs)
+        log.info(
+            "watching %d zonefiles for changes with %s",
+            len(inputs),
+            "inotify" if isinstance(watcher, InotifyWatcher) else "polling",
+        )
+        try:
+            for changes in iter_batches(watcher, debounce):
+                watch.update(changes)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    command()
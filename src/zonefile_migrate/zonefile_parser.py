@@ -0,0 +1,472 @@
+"""
+a line oriented zonefile parser, which generates the record sets of a zone
+without building a dnspython zone object graph.
+
+The record sets are identical to those which create_from_zone generates from an
+easyzone.Zone: owner names are absolute, the record data is in the canonical
+dnspython text representation and, like easyzone, every record set has the minimum
+TTL of the SOA record.
+
+Unlike dnspython, the parser supports $INCLUDE, and a relative $ORIGIN is relative to
+the current origin, as in BIND.
+"""
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import dns.ipv4
+import dns.ipv6
+import dns.name
+import dns.rdata
+import dns.rdataclass
+import dns.rdatatype
+import dns.ttl
+import dns.zone
+from dns.exception import SyntaxError
+from zonefile_migrate.dns_record_set import DNSRecordSet, _record_types
+
+# a token is a quoted string, a parenthesis, a comment or a word
+_token = re.compile(
+    r'"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<paren>[()])|(?P<comment>;.*)|(?P<word>(?:[^\s"();\\]|\\.)+)'
+)
+_plain_name = re.compile(r"[A-Za-z0-9_*/-]{1,63}(\.[A-Za-z0-9_*/-]{1,63})*\.?")
+_printable_string = re.compile(r"[ !#-\[\]-~]{0,255}")
+_generate_modifier = re.compile(
+    r"\$\{(?P<offset>[+-]?\d+)(?:,(?P<width>\d+)(?:,(?P<base>[doxX]))?)?\}|\$\$|\\\$|\$"
+)
+_generate_range = re.compile(r"(?P<start>\d+)-(?P<stop>\d+)(?:/(?P<step>\d+))?")
+
+_IN = dns.rdataclass.IN
+_SOA = dns.rdatatype.SOA
+_NS = dns.rdatatype.NS
+_name_types = {dns.rdatatype.NS, dns.rdatatype.CNAME, dns.rdatatype.PTR}
+_uncovered_types = {dns.rdatatype.RRSIG, dns.rdatatype.SIG}
+
+Token = Tuple[str, bool]
+
+
+class _Reader:
+    """
+    reads the records of a zonefile into record sets, keyed by the lowercase owner
+    name. The record data of each set is keyed by its canonical form, to remove
+    duplicates in the same way as a dnspython rdataset does.
+    """
+
+    def __init__(self, origin: str):
+        self.origin = origin
+        self.names: dict = {}
+        self.default_ttl: Optional[int] = None
+        self.last_ttl: Optional[int] = None
+        self.minimum_ttl: Optional[int] = None
+        self._soa_minimum: Optional[int] = None
+        self._name_origins: dict = {}
+
+    def read(self, filename: Path, origin: str, content: Optional[TextIO] = None):
+        """
+        reads all records from the file `filename` with the initial `origin`, or from
+        its `content` if it was already read.
+        """
+        current_origin = origin
+        last_name = origin
+        with open(filename, "r") if content is None else content as file:
+            for lineno, leading_whitespace, tokens in _logical_lines(filename, file):
+                include = None
+                try:
+                    if not leading_whitespace and tokens[0][0].startswith("$"):
+                        current_origin, last_name, include = self._directive(
+                            filename, tokens, current_origin, last_name
+                        )
+                    else:
+                        if not leading_whitespace:
+                            last_name = self._absolute_name(
+                                tokens[0][0], current_origin
+                            )
+                            tokens = tokens[1:]
+                        self._record(last_name, tokens, current_origin)
+                except SyntaxError as error:
+                    raise SyntaxError(f"{filename}:{lineno}: {error}") from error
+                except Exception as error:
+                    raise SyntaxError(
+                        f"{filename}:{lineno}: caught exception {type(error)}: {error}"
+                    ) from error
+
+                if include:
+                    include_filename, include_origin = include
+                    try:
+                        include_file = open(include_filename, "r")
+                    except OSError as error:
+                        raise SyntaxError(
+                            f"{filename}:{lineno}: cannot read $INCLUDE "
+                            f"{include_filename}: {error.strerror}"
+                        ) from error
+                    default_ttl, last_ttl = self.default_ttl, self.last_ttl
+                    self.read(include_filename, include_origin, include_file)
+                    self.default_ttl, self.last_ttl = default_ttl, last_ttl
+
+    def _directive(
+        self, filename: Path, tokens: List[Token], origin: str, last_name: str
+    ) -> Tuple[str, str, Optional[Tuple[Path, str]]]:
+        """
+        processes the $ORIGIN, $TTL, $INCLUDE or $GENERATE directive, and returns the
+        resulting current origin and last owner name, and the filename and origin of
+        the file to include, if any.
+        """
+        directive = tokens[0][0].upper()
+        arguments = [value for value, _ in tokens[1:]]
+        if directive == "$ORIGIN":
+            if len(arguments) != 1:
+                raise SyntaxError("bad $ORIGIN")
+            origin = self._absolute_name(arguments[0], origin)
+            return origin, last_name, None
+
+        if directive == "$TTL":
+            if len(arguments) != 1:
+                raise SyntaxError("bad $TTL")
+            self.default_ttl = dns.ttl.from_text(arguments[0])
+            return origin, last_name, None
+
+        if directive == "$INCLUDE":
+            if len(arguments) not in [1, 2]:
+                raise SyntaxError("bad $INCLUDE")
+            include = Path(filename).parent.joinpath(arguments[0])
+            include_origin = (
+                self._absolute_name(arguments[1], origin)
+                if len(arguments) > 1
+                else origin
+            )
+            return origin, last_name, (include, include_origin)
+
+        if directive == "$GENERATE":
+            return origin, self._generate(tokens[1:], origin, last_name), None
+
+        raise SyntaxError(f"Unknown master file directive '{directive}'")
+
+    def _generate(self, tokens: List[Token], origin: str, last_name: str) -> str:
+        """
+        generates the records of a $GENERATE range lhs [ttl] [class] type rhs directive.
+        """
+        if len(tokens) < 3:
+            raise SyntaxError("bad $GENERATE")
+        found = _generate_range.fullmatch(tokens[0][0])
+        if not found:
+            raise SyntaxError(f"bad $GENERATE range '{tokens[0][0]}'")
+        start, stop = int(found.group("start")), int(found.group("stop"))
+        step = int(found.group("step") or 1)
+        lhs = tokens[1][0]
+        ttl, rdtype, rhs = self._ttl_class_and_type(tokens[2:])
+        rhs = " ".join(value for value, _ in rhs)
+
+        for i in range(start, stop + 1, step):
+            last_name = self._absolute_name(_substitute(lhs, i), origin)
+            if not self._in_zone(last_name):
+                break
+            rdata = _tokens(_substitute(rhs, i))
+            self._add(last_name, ttl, rdtype, rdata, origin)
+        return last_name
+
+    def _record(self, name: str, tokens: List[Token], origin: str):
+        """
+        adds the record [ttl] [class] type rdata for the owner `name`, ignoring
+        names outside of the zone.
+        """
+        if not self._in_zone(name):
+            return
+        ttl, rdtype, rdata = self._ttl_class_and_type(tokens)
+        self._add(name, ttl, rdtype, rdata, origin)
+
+    def _ttl_class_and_type(self, tokens: List[Token]) -> Tuple[int, int, List[Token]]:
+        """
+        parses the optional ttl and class, and the record type, in front of the rdata.
+        """
+        ttl = None
+        rdclass = None
+        index = 0
+        while index < len(tokens) and (ttl is None or rdclass is None):
+            value = tokens[index][0]
+            if ttl is None and value[:1].isdigit():
+                try:
+                    ttl = dns.ttl.from_text(value)
+                    index += 1
+                    continue
+                except dns.ttl.BadTTL:
+                    pass
+            upper = value.upper()
+            if rdclass is None and (
+                upper in dns.rdataclass._by_text or upper.startswith("CLASS")
+            ):
+                rdclass = dns.rdataclass.from_text(value)
+                index += 1
+                continue
+            break
+
+        if index >= len(tokens):
+            raise SyntaxError("missing record type")
+
+        if ttl is None:
+            if self.default_ttl is not None:
+                ttl = self.default_ttl
+            elif self.last_ttl is not None:
+                ttl = self.last_ttl
+            else:
+                raise SyntaxError("Missing default TTL value")
+        else:
+            self.last_ttl = ttl
+
+        if rdclass is not None and rdclass != _IN:
+            raise SyntaxError("RR class is not zone's class")
+
+        value = tokens[index][0]
+        rdtype = dns.rdatatype._by_text.get(value.upper())
+        if rdtype is None:
+            try:
+                rdtype = dns.rdatatype.from_text(value)
+            except Exception:
+                raise SyntaxError(f"unknown rdatatype '{value}'")
+
+        return ttl, rdtype, tokens[index + 1 :]
+
+    def _add(self, name: str, ttl: int, rdtype: int, rdata: List[Token], origin: str):
+        """
+        adds the record data to the record set of type `rdtype` of `name`.
+        """
+        key = _lower(name)
+        node = self.names.get(key)
+        if node is None:
+            node = self.names[key] = (name, {})
+
+        canonical, text = self._rdata(rdtype, rdata, origin)
+        if rdtype == _SOA:
+            # like dnspython, the SOA minimum is the default TTL if there is no $TTL
+            if self.default_ttl is None:
+                self.default_ttl = self._soa_minimum
+            if key == self.origin and self.minimum_ttl is None:
+                self.minimum_ttl = self._soa_minimum
+
+        node[1].setdefault(rdtype, {}).setdefault(canonical, text)
+
+    def _in_zone(self, name: str) -> bool:
+        key = name.lower()
+        return (
+            key == self.origin or self.origin == "." or key.endswith("." + self.origin)
+        )
+
+    def _rdata(
+        self, rdtype: int, tokens: List[Token], origin: str
+    ) -> Tuple[object, str]:
+        """
+        returns the canonical form and text representation of the record data. The
+        common record types are converted directly, all others are parsed by dnspython.
+        """
+        if len(tokens) == 1 and not tokens[0][1]:
+            value = tokens[0][0]
+            if rdtype == dns.rdatatype.A:
+                dns.ipv4.inet_aton(value)
+                return value, value
+            if rdtype == dns.rdatatype.AAAA:
+                dns.ipv6.inet_aton(value)
+                return _lower(value), value
+            if rdtype in _name_types:
+                name = self._absolute_name(value, origin)
+                return _lower(name), name
+
+        if rdtype == dns.rdatatype.MX and len(tokens) == 2 and tokens[0][0].isdigit():
+            preference = int(tokens[0][0])
+            if preference < 65536 and not tokens[1][1]:
+                text = f"{preference} {self._absolute_name(tokens[1][0], origin)}"
+                return _lower(text), text
+
+        if (
+            rdtype == dns.rdatatype.TXT
+            and tokens
+            and all(_printable_string.fullmatch(value) for value, _ in tokens)
+        ):
+            text = " ".join(f'"{value}"' for value, _ in tokens)
+            return text, text
+
+        rdata = dns.rdata.from_text(
+            _IN, rdtype, _text(tokens), self._name(origin), False
+        )
+        if rdtype == _SOA:
+            self._soa_minimum = rdata.minimum
+        return rdata.to_digestable(dns.name.root), rdata.to_text()
+
+    def _name(self, name: str) -> dns.name.Name:
+        result = self._name_origins.get(name)
+        if result is None:
+            result = self._name_origins[name] = dns.name.from_text(name)
+        return result
+
+    def _absolute_name(self, name: str, origin: str) -> str:
+        """
+        returns the absolute name of `name` in the text representation of dnspython.
+        """
+        if name == "@":
+            return origin
+        if _plain_name.fullmatch(name) and len(name) < 254:
+            if name.endswith("."):
+                return name
+            return f"{name}.{origin}" if origin != "." else f"{name}."
+        return dns.name.from_text(name, self._name(origin)).to_text()
+
+    def record_sets(self) -> Iterator[DNSRecordSet]:
+        """
+        generates the record sets of the zone, in the order of the first occurrence of
+        the owner names and the order of the dnspython record type table.
+        """
+        for name, rdatasets in self.names.values():
+            rectypes = sorted(
+                (_record_types[rdtype], rdtype)
+                for rdtype in rdatasets
+                if rdtype in _record_types and rdtype not in _uncovered_types
+            )
+            for (_, rectype), rdtype in rectypes:
+                rdatas = rdatasets[rdtype].values()
+                yield DNSRecordSet(name, rectype, self.minimum_ttl, rdatas)
+
+    def check_origin(self):
+        """
+        checks that the origin of the zone has a SOA and NS record, like dnspython does.
+        """
+        node = self.names.get(self.origin)
+        if node is None or _SOA not in node[1]:
+            raise dns.zone.NoSOA
+        if _NS not in node[1]:
+            raise dns.zone.NoNS
+
+
+def _lower(text: str) -> str:
+    """
+    returns `text` in lowercase, sharing the string if it is already in lowercase.
+    """
+    lower = text.lower()
+    return text if lower == text else lower
+
+
+def _tokens(text: str) -> List[Token]:
+    """
+    splits `text` into (value, quoted) tokens.
+
+    >>> _tokens('10 mail  ')
+    [('10', False), ('mail', False)]
+    >>> _tokens('"a quoted string" word ; comment')
+    [('a quoted string', True), ('word', False)]
+    """
+    result = []
+    for token in _token.finditer(text):
+        if token.group("comment") is not None:
+            break
+        if token.group("quoted") is not None:
+            result.append((token.group("quoted"), True))
+        elif token.group("word") is not None:
+            result.append((token.group("word"), False))
+    return result
+
+
+def _text(tokens: List[Token]) -> str:
+    """
+    returns the text of the `tokens`, quoting the quoted strings.
+
+    >>> _text([('0', False), ('issue', False), ('letsencrypt.org', True)])
+    '0 issue "letsencrypt.org"'
+    """
+    return " ".join(f'"{value}"' if quoted else value for value, quoted in tokens)
+
+
+def _substitute(template: str, value: int) -> str:
+    """
+    substitutes the iterator `value` in the $GENERATE lhs or rhs `template`.
+
+    >>> _substitute('host-$', 7)
+    'host-7'
+    >>> _substitute('host-${10,3}', 7)
+    'host-017'
+    >>> _substitute('${0,4,x}.$$', 255)
+    '00ff.$'
+    """
+
+    def replace(found) -> str:
+        text = found.group(0)
+        if text in ["$$", "\\$"]:
+            return "$"
+        if text == "$":
+            return str(value)
+        offset = int(found.group("offset"))
+        width = int(found.group("width") or 0)
+        base = found.group("base") or "d"
+        return format(value + offset, f"0{width}{base}")
+
+    return _generate_modifier.sub(replace, template)
+
+
+def _logical_lines(
+    filename: Path, lines: Iterable[str]
+) -> Iterator[Tuple[int, bool, List[Token]]]:
+    """
+    generates the line number, leading whitespace indicator and tokens of each
+    logical line, joining the physical lines of parenthesised records.
+    """
+    depth = 0
+    tokens: List[Token] = []
+    start, leading_whitespace = 0, False
+    for lineno, line in enumerate(lines, start=1):
+        if depth == 0:
+            start, leading_whitespace = lineno, line[:1] in [" ", "\t"]
+            tokens = []
+
+        for token in _token.finditer(line):
+            if token.group("comment") is not None:
+                break
+            if token.group("quoted") is not None:
+                tokens.append((token.group("quoted"), True))
+            elif token.group("word") is not None:
+                tokens.append((token.group("word"), False))
+            elif token.group("paren") == "(":
+                depth += 1
+            else:
+                depth -= 1
+                if depth < 0:
+                    raise SyntaxError(f"{filename}:{lineno}: unbalanced parentheses")
+        if '"' in _token.sub("", line):
+            raise SyntaxError(f"{filename}:{lineno}: unbalanced quotes")
+
+        if depth == 0 and tokens:
+            yield start, leading_whitespace, tokens
+
+    if depth > 0:
+        raise SyntaxError(f"{filename}:{start}: unbalanced parentheses")
+
+
+class Zone:
+    """
+    the record sets of a zonefile read by the native parser. It has the same `domain`
+    attribute as an easyzone.Zone and generates its record sets when iterated, so it
+    can be passed to the converters instead.
+    """
+
+    def __init__(self, domain: str):
+        if domain[-1] != ".":
+            domain = domain + "."
+        self.domain = domain
+        self._reader: Optional[_Reader] = None
+
+    def load_from_file(self, filename: str, content: Optional[TextIO] = None):
+        origin = dns.name.from_text(self.domain).to_text()
+        reader = _Reader(origin.lower())
+        reader.read(Path(filename), origin, content)
+        reader.check_origin()
+        self._reader = reader
+
+    def __iter__(self) -> Iterator[DNSRecordSet]:
+        return self._reader.record_sets()
+
+
+def zone_from_file(
+    domain: str, filename: str, content: Optional[TextIO] = None
+) -> Zone:
+    """
+    reads the zonefile `filename` with the origin `domain` using the native parser,
+    from its `content` if it was already read.
+    """
+    zone = Zone(domain)
+    zone.load_from_file(filename, content)
+    return zone
@@ -1,10 +1,35 @@
 import unittest
 import doctest
-from zonefile_migrate import to_cloudformation
+from zonefile_migrate import (
+    api,
+    apply_route53,
+    diff,
+    dns_record_set,
+    emitters,
+    manifest,
+    normalize,
+    to_cloudformation,
+    to_terraform,
+    utils,
+    zonefile_parser,
+)
 
 
 def load_tests(loader, tests, pattern):
     suite = unittest.TestSuite()
-    test = doctest.DocTestSuite(to_cloudformation)
-    suite.addTest(test)
+    for module in [
+        api,
+        apply_route53,
+        diff,
+        dns_record_set,
+        emitters,
+        manifest,
+        normalize,
+        to_cloudformation,
+        to_terraform,
+        utils,
+        zonefile_parser,
+    ]:
+        test = doctest.DocTestSuite(module)
+        suite.addTest(test)
     return suite
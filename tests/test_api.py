@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from zonefile_migrate import api
+from zonefile_migrate.dns_record_set import iter_from_zone
+from zonefile_migrate.to_terraform import transform_to_terraform
+from zonefile_migrate.utils import read_zonefile
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class ApiTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        api.zone_cache.clear()
+
+    def test_terraform_equals_command_output(self):
+        input = zones.joinpath("bönn.de")
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory, "bönn.de.tf")
+            transform_to_terraform(read_zonefile(input), output, "google", 300)
+            expected = output.read_text()
+        self.assertEqual(expected, api.to_terraform(input.read_bytes(), maximum_ttl=300))
+
+    def test_repeated_requests_skip_the_parse(self):
+        zonefile = zones.joinpath("asample.org").read_text()
+        with mock.patch(
+            "zonefile_migrate.api.read_zonefile", wraps=read_zonefile
+        ) as reader:
+            record_sets = api.to_record_sets(zonefile)
+            template = api.to_cloudformation(zonefile.encode("utf-8"))
+            self.assertEqual(record_sets, api.to_record_sets(zonefile))
+            api.to_record_sets(zonefile, parser="native")
+        self.assertEqual(2, reader.call_count)
+        self.assertEqual((2, 2), api.zone_cache.info()[:2])
+        self.assertEqual(len(record_sets) + 1, len(template["Resources"]))
+
+    def test_cache_is_bounded_by_record_sets(self):
+        cache = api.ZoneCache(maximum_record_sets=40)
+        inputs = ["asample.org", "bönn.de", "land-5.com"]
+        parsed = {}
+        for name in inputs:
+            zone = read_zonefile(zones.joinpath(name))
+            parsed[name] = api.ParsedZone(zone.domain, tuple(iter_from_zone(zone)))
+            cache.put(name, parsed[name])
+            self.assertLessEqual(cache.record_sets, 40)
+        self.assertIsNone(cache.get("asample.org"))
+        self.assertIs(parsed["land-5.com"], cache.get("land-5.com"))
+
+    def test_origin_is_required_without_origin_directive(self):
+        zonefile = "$TTL 300\n@ SOA ns1 hostmaster 1 2 3 4 5\n@ NS ns1\nwww A 10.0.0.1\n"
+        with self.assertRaises(ValueError):
+            api.to_record_sets(zonefile)
+        with self.assertNoLogs("zonefile-migrate", level="WARNING"):
+            record_sets = api.to_record_sets(zonefile, origin="example.com.")
+        self.assertEqual("www.example.com.", record_sets[0].name)
+
+    def test_encoded_zonefiles(self):
+        zonefile = zones.joinpath("bönn.de").read_text()
+        for parser in ["easyzone", "native"]:
+            expected = api.to_record_sets(zonefile, parser=parser)
+            for encoding in ["utf-8-sig", "utf-16", "utf-16-be"]:
+                with self.subTest(parser=parser, encoding=encoding):
+                    content = zonefile.encode(encoding)
+                    if encoding == "utf-16-be":
+                        content = b"\xfe\xff" + content
+                    self.assertEqual(
+                        expected, api.to_record_sets(content, parser=parser)
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
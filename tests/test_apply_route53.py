@@ -0,0 +1,138 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from click.testing import CliRunner
+from zonefile_migrate.apply_route53 import (
+    apply_zonefiles,
+    command,
+    iter_change_batches,
+)
+from zonefile_migrate.dns_record_set import DNSRecordSet
+
+try:
+    import moto
+except ImportError:
+    moto = None
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class ApplyRoute53TestCase(unittest.TestCase):
+    def test_change_batches(self):
+        record_sets = [
+            DNSRecordSet(f"host-{i}.example.com.", "TXT", 300, ["x" * 100] * 3)
+            for i in range(500)
+        ]
+        batches = list(iter_change_batches(record_sets))
+        self.assertEqual(500, sum(map(len, batches)))
+        for batch in batches:
+            records = [c["ResourceRecordSet"]["ResourceRecords"] for c in batch]
+            self.assertLessEqual(2 * sum(map(len, records)), 1000)
+            self.assertLessEqual(
+                2 * sum(len(r["Value"]) for rr in records for r in rr), 32000
+            )
+
+    def test_zonefile_errors_do_not_stop_the_others(self):
+        with tempfile.TemporaryDirectory() as directory:
+            no_ns = Path(directory, "no-ns.example")
+            no_ns.write_text(
+                "$ORIGIN no-ns.example.\n$TTL 300\n"
+                "@ SOA ns1 hostmaster 1 7200 3600 1209600 300\nwww A 10.0.0.1\n"
+            )
+            missing = Path(directory, "missing.example")
+            inputs = [no_ns, zones.joinpath("asample.org"), missing]
+            with self.assertLogs("zonefile-migrate", level="ERROR") as logs:
+                failed = apply_zonefiles(None, inputs, jobs=2, dry_run=True)
+        self.assertEqual([no_ns, missing], failed)
+        self.assertIn("no NS RRset", logs.output[0])
+
+    def test_unexpected_errors_do_not_stop_the_others(self):
+        inputs = sorted(zones.iterdir())
+
+        def apply_zonefile(client, input, *args):
+            if input == inputs[0]:
+                raise KeyError("example.com.")
+
+        with mock.patch(
+            "zonefile_migrate.apply_route53.apply_zonefile", apply_zonefile
+        ), self.assertLogs("zonefile-migrate", level="ERROR") as logs:
+            failed = apply_zonefiles(None, inputs, jobs=2, dry_run=True)
+        self.assertEqual(inputs[:1], failed)
+        self.assertIn("KeyError: 'example.com.'", logs.output[0])
+
+    def test_dry_run_does_not_require_boto3(self):
+        boto3 = dict.fromkeys(["boto3", "botocore", "botocore.exceptions"])
+        with mock.patch.dict(sys.modules, boto3):
+            result = CliRunner().invoke(command, ["--dry-run", str(zones)])
+        self.assertEqual(0, result.exit_code, result.output)
+
+    def test_missing_source_is_a_usage_error(self):
+        result = CliRunner().invoke(command, ["--dry-run", "does-not-exist"])
+        self.assertEqual(2, result.exit_code)
+        self.assertIn("does-not-exist does not exist", result.output)
+
+    @unittest.skipUnless(moto, "requires moto")
+    def test_apply_zonefiles(self):
+        from zonefile_migrate.apply_route53 import route53_client
+
+        credentials = {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": "us-east-1",
+        }
+        with mock.patch.dict(os.environ, credentials), moto.mock_aws():
+            client = route53_client()
+            inputs = [zones.joinpath("asample.org"), zones.joinpath("land-5.com")]
+            self.assertEqual([], apply_zonefiles(client, inputs, jobs=2))
+            # applying the zones again upserts the same record sets
+            self.assertEqual([], apply_zonefiles(client, inputs, jobs=2))
+
+            hosted_zones = client.list_hosted_zones()["HostedZones"]
+            self.assertEqual(
+                ["asample.org.", "land-5.com."],
+                sorted(z["Name"] for z in hosted_zones),
+            )
+            hosted_zone = next(z for z in hosted_zones if z["Name"] == "asample.org.")
+            record_sets = client.list_resource_record_sets(
+                HostedZoneId=hosted_zone["Id"]
+            )["ResourceRecordSets"]
+            mail = next(r for r in record_sets if r["Name"] == "mail.asample.org.")
+            self.assertEqual([{"Value": "10.0.1.5"}], mail["ResourceRecords"])
+
+    @unittest.skipUnless(moto, "requires moto")
+    def test_private_zone_with_the_same_name_is_ignored(self):
+        from zonefile_migrate.apply_route53 import (
+            get_or_create_hosted_zone,
+            route53_client,
+        )
+
+        credentials = {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": "us-east-1",
+        }
+        with mock.patch.dict(os.environ, credentials), moto.mock_aws():
+            client = route53_client()
+            vpc = {"VPCRegion": "us-east-1", "VPCId": "vpc-12345678"}
+            names = ["a.example.", "example.com.", "example.com.", "z.example."]
+            for i, name in enumerate(names):
+                client.create_hosted_zone(
+                    Name=name,
+                    CallerReference=f"private-{i}",
+                    HostedZoneConfig={"PrivateZone": True},
+                    VPC=vpc,
+                )
+            public = get_or_create_hosted_zone(client, "example.com.")
+            self.assertEqual(public, get_or_create_hosted_zone(client, "example.com."))
+            self.assertEqual(5, len(client.list_hosted_zones()["HostedZones"]))
+
+            client.create_hosted_zone(Name="example.com.", CallerReference="public")
+            with self.assertRaises(ValueError):
+                get_or_create_hosted_zone(client, "example.com.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+from unittest import mock
+from zonefile_migrate import cache
+from zonefile_migrate.cache import (
+    CACHE_SUFFIX,
+    CACHE_VARIABLE,
+    CachedZone,
+    clear,
+    evict,
+)
+from zonefile_migrate.dns_record_set import iter_from_zone
+from zonefile_migrate.to_terraform import transform_to_terraform
+from zonefile_migrate.utils import convert_zonefiles, read_zonefile, target_files
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = Path(self.directory.name, "cache")
+        environment = mock.patch.dict(os.environ, {CACHE_VARIABLE: str(self.cache)})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_cached_record_sets_equal_parsed(self):
+        for parser in ["easyzone", "native"]:
+            with self.subTest(parser=parser):
+                input = zones.joinpath("bönn.de")
+                with mock.patch.dict(os.environ, {CACHE_VARIABLE: ""}):
+                    expected = read_zonefile(input, parser)
+                stored = read_zonefile(input, parser)
+                self.assertEqual(list(iter_from_zone(expected)), list(stored))
+                cached = read_zonefile(input, parser)
+                self.assertIsInstance(cached, CachedZone)
+                self.assertEqual(expected.domain, cached.domain)
+                self.assertEqual(list(iter_from_zone(expected)), list(cached))
+
+    def test_conversions_share_the_cache(self):
+        inputs = sorted(zones.iterdir())
+        dst = Path(self.directory.name, "dst")
+        dst.mkdir()
+        outputs = target_files(inputs, dst, ".tf")
+        transform = partial(transform_to_terraform, provider="google", maximum_ttl=None)
+        convert_zonefiles(inputs, outputs, transform, jobs=2)
+        expected = [output.read_text() for output in outputs]
+        with self.assertLogs("zonefile-migrate", level="INFO") as logs:
+            convert_zonefiles(inputs, outputs, transform, jobs=2)
+        self.assertTrue(all(line.endswith("from the cache") for line in logs.output))
+        self.assertEqual(expected, [output.read_text() for output in outputs])
+
+    def test_evict_least_recently_used(self):
+        for name in ["asample.org", "bönn.de", "land-5.com"]:
+            list(read_zonefile(zones.joinpath(name)))
+        entries = sorted(self.cache.glob(f"*{CACHE_SUFFIX}"), key=os.path.getmtime)
+        os.utime(entries[0], (1, 1))
+        os.utime(entries[1], (2, 2))
+        self.assertEqual(2, evict(self.cache, entries[2].stat().st_size))
+        self.assertEqual([entries[2]], list(self.cache.glob(f"*{CACHE_SUFFIX}")))
+        self.assertEqual((1, entries[2].stat().st_size), clear(self.cache))
+        self.assertEqual([], list(self.cache.iterdir()))
+
+    def test_cache_is_scanned_only_when_it_may_be_full(self):
+        names = ["asample.org", "bönn.de", "land-5.com"]
+        with mock.patch(
+            "zonefile_migrate.cache._cache_entries", wraps=cache._cache_entries
+        ) as scans:
+            for name in names:
+                list(read_zonefile(zones.joinpath(name)))
+        self.assertEqual(1, scans.call_count)
+        size = sum(path.stat().st_size for path in self.cache.iterdir())
+
+        clear(self.cache)
+        with mock.patch("zonefile_migrate.cache.cache_size", return_value=size // 2):
+            for name in names:
+                list(read_zonefile(zones.joinpath(name)))
+        entries = list(self.cache.glob(f"*{CACHE_SUFFIX}"))
+        self.assertLess(sum(path.stat().st_size for path in entries), size // 2 + 1)
+        self.assertLess(len(entries), 3)
+
+    def test_evicted_zone_can_still_be_read(self):
+        input = zones.joinpath("asample.org")
+        list(read_zonefile(input))
+        zone = read_zonefile(input)
+        self.assertIsInstance(zone, CachedZone)
+        clear(self.cache)
+        self.assertEqual(16, len(list(zone)))
+
+    def test_corrupt_entry_is_parsed_again(self):
+        input = zones.joinpath("asample.org")
+        list(read_zonefile(input))
+        for entry in self.cache.glob(f"*{CACHE_SUFFIX}"):
+            entry.write_bytes(b"")
+        with self.assertLogs("zonefile-migrate", level="WARNING"):
+            zone = read_zonefile(input)
+        self.assertNotIsInstance(zone, CachedZone)
+        self.assertEqual(16, len(list(zone)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,15 @@
 import unittest
 import tempfile
 import os
-from zonefile_migrate.to_cloudformation import convert_to_cloudformation
+import random
+from zonefile_migrate.to_cloudformation import (
+    convert_to_cloudformation,
+    generate_unique_logical_resource_id,
+    LogicalResourceIds,
+    write_split_cloudformation,
+)
+from pathlib import Path
+from ruamel.yaml import YAML
 from easyzone import easyzone
 
 
@@ -97,6 +105,42 @@ class ConvertToCloudFormationTestCase(unittest.TestCase):
             self.assertEqual(expected_resource_records, properties["ResourceRecords"])
         self.assertEqual(expected_nr_of_records, nr_of_records)
 
+    def test_logical_resource_ids(self):
+        rnd = random.Random(0)
+        resources = {"HostedZone": None}
+        logical_ids = LogicalResourceIds(resources)
+        words = ["Foo", "A", "Record", "Bar", "1", "Www"]
+        for _ in range(2000):
+            prefix = "".join(rnd.choices(words, k=rnd.randint(1, 4)))
+            prefix += rnd.choice(["A", "AAAA", "TXT"]) + "Record"
+            expected = generate_unique_logical_resource_id(prefix, resources)
+            self.assertEqual(expected, logical_ids.allocate(prefix))
+            resources[expected] = None
+
+    def test_split(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory, "asample.org.yaml")
+            children = write_split_cloudformation(self.zone, 300, output, 5, 51200, False)
+            self.assertEqual(3, len(children))
+
+            yaml = YAML()
+            parent = yaml.load(output)
+            self.assertEqual(["HostedZone"], list(parent["Resources"]))
+            self.assertIn("HostedZoneId", parent["Outputs"])
+
+            nr_of_records = 0
+            for child in children:
+                template = yaml.load(child)
+                self.assertIn("HostedZoneId", template["Parameters"])
+                resources = template["Resources"]
+                self.assertLessEqual(len(resources), 5)
+                for resource in resources.values():
+                    self.assertEqual(
+                        {"Ref": "HostedZoneId"}, resource["Properties"]["HostedZoneId"]
+                    )
+                nr_of_records += len(resources)
+            self.assertEqual(14, nr_of_records)
+
 
 if __name__ == "__main__":
     unittest.main()
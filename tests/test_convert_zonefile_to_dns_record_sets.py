@@ -68,7 +68,7 @@ class ConvertToDNSRecordSetTestCase(unittest.TestCase):
                 records,
                 f"no records found of type {record_set.rectype} for {record_set.name} in zone",
             )
-            expected_resource_records = list(
+            expected_resource_records = tuple(
                 map(
                     lambda i: " ".join(map(lambda j: str(j), i))
                     if isinstance(i, (list, tuple))
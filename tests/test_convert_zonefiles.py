@@ -0,0 +1,241 @@
+import unittest
+import tempfile
+import shutil
+from functools import partial
+from pathlib import Path
+from zonefile_migrate.to_cloudformation import transform_to_cloudformation
+from zonefile_migrate.to_terraform import transform_to_terraform
+from zonefile_migrate.manifest import Manifest, manifest_path
+from zonefile_migrate.metrics import Metrics, ZoneMetrics, peak_rss, reset_peak_rss
+from zonefile_migrate.utils import (
+    convert_zonefiles,
+    get_all_zonefiles_in_path,
+    open_output,
+    target_file,
+)
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class ConvertZonefilesTestCase(unittest.TestCase):
+    def convert(self, transform, extension: str, jobs: int) -> dict:
+        with tempfile.TemporaryDirectory() as directory:
+            dst = Path(directory)
+            inputs = sorted(get_all_zonefiles_in_path([zones]))
+            outputs = list(map(lambda i: target_file(i, dst, extension), inputs))
+            convert_zonefiles(inputs, outputs, transform, jobs)
+            return {output.name: output.read_bytes() for output in outputs}
+
+    def test_parallel_equals_serial(self):
+        for transform, extension in [
+            (
+                partial(transform_to_terraform, provider="google", maximum_ttl=300),
+                ".tf",
+            ),
+            (
+                partial(transform_to_cloudformation, maximum_ttl=300),
+                ".yaml",
+            ),
+        ]:
+            serial = self.convert(transform, extension, 1)
+            parallel = self.convert(transform, extension, 3)
+            self.assertEqual(3, len(serial))
+            self.assertEqual(serial, parallel)
+
+    def test_parallel_logs_in_order(self):
+        transform = partial(transform_to_terraform, provider="google", maximum_ttl=None)
+        inputs = sorted(get_all_zonefiles_in_path([zones]))
+        with self.assertLogs("zonefile-migrate", level="INFO") as logs:
+            self.convert(transform, ".tf", 3)
+        self.assertEqual(
+            list(
+                map(
+                    lambda i: f"INFO:zonefile-migrate:reading zonefile {i.as_posix()}",
+                    inputs,
+                )
+            ),
+            logs.output,
+        )
+
+    def test_manifest_skips_unchanged_zonefiles(self):
+        transform = partial(transform_to_terraform, provider="google", maximum_ttl=None)
+        with tempfile.TemporaryDirectory() as directory:
+            src = Path(directory, "src")
+            dst = Path(directory, "dst")
+            shutil.copytree(zones, src)
+            dst.mkdir()
+            inputs = sorted(get_all_zonefiles_in_path([src]))
+            outputs = list(map(lambda i: target_file(i, dst, ".tf"), inputs))
+
+            def convert(options: dict, force: bool = False) -> [str]:
+                manifest = Manifest(manifest_path(dst), options, force)
+                with self.assertLogs("zonefile-migrate", level="INFO") as logs:
+                    convert_zonefiles(inputs, outputs, transform, 1, "easyzone", manifest)
+                return logs.output
+
+            self.assertEqual(3, len(convert({"maximum_ttl": None})))
+            self.assertEqual(
+                ["INFO:zonefile-migrate:skipped 3 unchanged zonefiles"],
+                convert({"maximum_ttl": None}),
+            )
+            self.assertEqual(3, len(convert({"maximum_ttl": 300})))
+            self.assertEqual(3, len(convert({"maximum_ttl": 300}, force=True)))
+
+            with inputs[0].open("a") as file:
+                file.write("\n")
+            self.assertEqual(
+                [
+                    "INFO:zonefile-migrate:skipped 2 unchanged zonefiles",
+                    f"INFO:zonefile-migrate:reading zonefile {inputs[0].as_posix()}",
+                ],
+                convert({"maximum_ttl": 300}),
+            )
+
+            inputs.pop(1).unlink()
+            stale = outputs.pop(1)
+            logs = convert({"maximum_ttl": 300})
+            self.assertIn(
+                f"WARNING:zonefile-migrate:{stale} is stale, "
+                "its zonefile no longer exists",
+                logs,
+            )
+
+    def test_manifest_converts_zonefiles_with_includes(self):
+        transform = partial(transform_to_terraform, provider="google", maximum_ttl=None)
+        with tempfile.TemporaryDirectory() as directory:
+            src = Path(directory, "src")
+            dst = Path(directory, "dst")
+            src.mkdir()
+            dst.mkdir()
+            included = Path(directory, "hosts.inc")
+            zonefile = src.joinpath("including.example")
+            zonefile.write_text(
+                "$ORIGIN including.example.\n$TTL 300\n"
+                "@ IN SOA ns1 hostmaster 1 3600 600 86400 300\n"
+                "@ IN NS ns1\n"
+                f"$INCLUDE {included.as_posix()}\n"
+            )
+            output = target_file(zonefile, dst, ".tf")
+            for parser in ["easyzone", "native"]:
+                with self.subTest(parser=parser):
+                    for address in ["1.2.3.4", "5.6.7.8"]:
+                        included.write_text(f"www IN A {address}\n")
+                        manifest = Manifest(manifest_path(dst), {})
+                        convert_zonefiles(
+                            [zonefile], [output], transform, 1, parser, manifest
+                        )
+                        self.assertIn(address, output.read_text())
+
+    def test_metrics(self):
+        transform = partial(transform_to_terraform, provider="google", maximum_ttl=None)
+        inputs = sorted(get_all_zonefiles_in_path([zones]))
+        for jobs in [1, 3]:
+            with tempfile.TemporaryDirectory() as directory:
+                outputs = list(
+                    map(lambda i: target_file(i, Path(directory), ".tf"), inputs)
+                )
+                metrics = Metrics()
+                convert_zonefiles(inputs, outputs, transform, jobs, metrics=metrics)
+                self.assertEqual(3, metrics.values["zonefiles"])
+                self.assertEqual(
+                    [i.as_posix() for i in inputs],
+                    [z["zonefile"] for z in metrics.zones],
+                )
+                asample = metrics.zones[inputs.index(zones / "asample.org")]
+                self.assertEqual("asample.org.", asample["domain_name"])
+                self.assertEqual(16, asample["record_sets"])
+                self.assertEqual(20, asample["records"])
+                self.assertEqual(
+                    outputs[0].stat().st_size, metrics.zones[0]["output_bytes"]
+                )
+                for zone in metrics.zones:
+                    self.assertGreater(zone["parse_seconds"], 0)
+                    self.assertGreaterEqual(zone["write_seconds"], 0)
+
+    @unittest.skipUnless(reset_peak_rss(), "requires a resettable peak RSS")
+    def test_peak_rss_per_zone(self):
+        input = zones.joinpath("asample.org")
+        peaks = []
+        for size in [256 * 1024 * 1024, 0]:
+            metrics = ZoneMetrics(input, input)
+            with metrics.stage("parse"):
+                buffer = bytearray(size)
+                buffer[::4096] = b"x" * len(buffer[::4096])
+                del buffer
+            peaks.append(metrics.result()["peak_rss"])
+        self.assertGreater(peaks[0] - peaks[1], 128 * 1024 * 1024)
+        self.assertGreaterEqual(peak_rss(), peaks[0])
+
+    def test_keep_going(self):
+        transform = partial(transform_to_terraform, provider="google", maximum_ttl=None)
+        with tempfile.TemporaryDirectory() as directory:
+            bad = Path(directory, "bad.example")
+            bad.write_text("$ORIGIN bad.example.\n$TTL 300\nwww IN BOGUS 1\n")
+            inputs = [bad] + sorted(get_all_zonefiles_in_path([zones]))
+            for jobs in [1, 3]:
+                dst = Path(directory, f"dst-{jobs}")
+                dst.mkdir()
+                outputs = list(map(lambda i: target_file(i, dst, ".tf"), inputs))
+                with self.assertLogs("zonefile-migrate", level="ERROR"):
+                    failures = convert_zonefiles(
+                        inputs, outputs, transform, jobs, keep_going=True
+                    )
+                self.assertEqual(
+                    [
+                        {
+                            "zonefile": bad.as_posix(),
+                            "file": bad.as_posix(),
+                            "line": 3,
+                            "message": "unknown rdatatype 'BOGUS'",
+                        }
+                    ],
+                    failures,
+                )
+                self.assertEqual([False, True, True, True], [o.exists() for o in outputs])
+
+    def test_keep_going_on_other_errors(self):
+        transform = partial(transform_to_terraform, provider="google", maximum_ttl=None)
+        with tempfile.TemporaryDirectory() as directory:
+            missing = Path(directory, "missing.example")
+            missing.write_text(
+                "$ORIGIN missing.example.\n$TTL 300\n$INCLUDE does-not-exist\n"
+            )
+            inputs = [missing] + sorted(get_all_zonefiles_in_path([zones]))
+            for parser in ["easyzone", "native"]:
+                for jobs in [1, 3]:
+                    with self.subTest(parser=parser, jobs=jobs):
+                        dst = Path(directory, f"dst-{parser}-{jobs}")
+                        dst.mkdir()
+                        outputs = [target_file(i, dst, ".tf") for i in inputs]
+                        with self.assertLogs("zonefile-migrate", level="ERROR"):
+                            failures = convert_zonefiles(
+                                inputs,
+                                outputs,
+                                transform,
+                                jobs,
+                                parser,
+                                keep_going=True,
+                            )
+                        self.assertEqual(
+                            [missing.as_posix()], [f["zonefile"] for f in failures]
+                        )
+                        self.assertIn("does-not-exist", failures[0]["message"])
+                        self.assertEqual(
+                            [False, True, True, True], [o.exists() for o in outputs]
+                        )
+
+    def test_open_output_replaces_complete_outputs_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory, "asample.org.tf")
+            with open_output(output) as file:
+                file.write("complete\n")
+            with self.assertRaises(ValueError):
+                with open_output(output) as file:
+                    file.write("partial")
+                    raise ValueError("conversion failed")
+            self.assertEqual("complete\n", output.read_text())
+            self.assertEqual([output], list(Path(directory).iterdir()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+from zonefile_migrate.diff import index_record_sets, diff_record_sets
+from zonefile_migrate.to_cloudformation import transform_to_cloudformation
+from zonefile_migrate.utils import convert_zonefile
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class DiffTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_zonefiles(self):
+        old = zones.joinpath("asample.org")
+        new = self.root.joinpath("asample.org")
+        content = old.read_text().replace("mail\tA\t10.0.1.5", "mail\tA\t10.0.1.9")
+        new.write_text(content.replace("ftp\t", "sftp\t") + "\nextra\tA\t10.0.1.7\n")
+
+        differences = diff_record_sets(index_record_sets(old), index_record_sets(new))
+        self.assertEqual(
+            ["sftp.asample.org.", "extra.asample.org."],
+            [r["name"] for r in differences["added"]],
+        )
+        self.assertEqual(
+            ["ftp.asample.org."], [r["name"] for r in differences["removed"]]
+        )
+        self.assertEqual(
+            [{"name": "mail.asample.org.", "type": "A"}],
+            [{"name": c["name"], "type": c["type"]} for c in differences["changed"]],
+        )
+        self.assertEqual(["10.0.1.9"], differences["changed"][0]["new"]["rrdatas"])
+
+    def test_templates(self):
+        zonefile = zones.joinpath("land-5.com")
+        for name, options in [
+            ("land-5.com.yaml", {}),
+            ("land-5.com.json", {"format": "json"}),
+            ("split.yaml", {"split": True, "maximum_resources": 2}),
+            (
+                "group.yaml",
+                {"split": True, "record_set_group": True, "maximum_resources": 1},
+            ),
+        ]:
+            with self.subTest(template=name):
+                template = self.root.joinpath(name)
+                convert_zonefile(
+                    zonefile,
+                    template,
+                    lambda zone, output: transform_to_cloudformation(
+                        zone, output, 300, **options
+                    ),
+                )
+                differences = diff_record_sets(
+                    index_record_sets(template),
+                    index_record_sets(zonefile, maximum_ttl=300),
+                )
+                self.assertEqual(
+                    {"added": [], "removed": [], "changed": []},
+                    differences,
+                    json.dumps(differences, indent=2),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
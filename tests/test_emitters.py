@@ -0,0 +1,82 @@
+import json
+import unittest
+from io import StringIO
+from pathlib import Path
+from easyzone import easyzone
+from zonefile_migrate.emitters import get_emitter
+from zonefile_migrate.to_cloudformation import (
+    convert_to_cloudformation,
+    write_cloudformation,
+)
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class EmittersTestCase(unittest.TestCase):
+    def write(self, zone, *emitter) -> str:
+        buffer = StringIO()
+        write_cloudformation(zone, None, buffer, get_emitter(*emitter))
+        return buffer.getvalue()
+
+    def test_fast_equals_ruamel(self):
+        for path in zones.iterdir():
+            with self.subTest(zone=path.name):
+                zone = easyzone.zone_from_file(path.name, path.as_posix())
+                self.assertEqual(
+                    self.write(zone, "yaml", "ruamel"), self.write(zone, "yaml", "fast")
+                )
+
+    def test_fast_falls_back_to_ruamel(self):
+        resource = {
+            "Type": "AWS::Route53::RecordSet",
+            "Properties": {
+                "Name": "*.example.com.",
+                "ResourceRecords": [
+                    "10 mail.example.com.",
+                    "2001:db8::",
+                    "it's #1",
+                    "a" * 30 + " " + "b" * 60,
+                    "yes",
+                    "300",
+                    '"v=spf1 include:_spf.example.com -all"',
+                ],
+                "TTL": 300,
+            },
+        }
+        for value in resource["Properties"]["ResourceRecords"]:
+            with self.subTest(value=value):
+                properties = dict(resource["Properties"], ResourceRecords=[value])
+                expected, actual = [
+                    get_emitter("yaml", e).resource(
+                        "WildcardARecord", dict(resource, Properties=properties)
+                    )
+                    for e in ["ruamel", "fast"]
+                ]
+                self.assertEqual(expected, actual)
+
+    def test_fast_falls_back_to_ruamel_for_long_keys(self):
+        for length in [120, 122, 123, 128, 200]:
+            key = "A" * length
+            for name, resource in [
+                (key, {"Type": "AWS::Route53::RecordSet"}),
+                ("Record", {"Properties": {key: "value"}}),
+            ]:
+                with self.subTest(length=length, name=name[:8]):
+                    expected, actual = [
+                        get_emitter("yaml", e).resource(name, resource)
+                        for e in ["ruamel", "fast"]
+                    ]
+                    self.assertEqual(expected, actual)
+
+    def test_json(self):
+        zone = easyzone.zone_from_file(
+            "asample.org", zones.joinpath("asample.org").as_posix()
+        )
+        self.assertEqual(
+            json.dumps(convert_to_cloudformation(zone, None), indent=2) + "\n",
+            self.write(zone, "json"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
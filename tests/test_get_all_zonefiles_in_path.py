@@ -0,0 +1,67 @@
+import unittest
+import tempfile
+from pathlib import Path
+from zonefile_migrate.utils import get_all_zonefiles_in_path, is_zonefile, target_files
+
+
+class GetAllZonefilesInPathTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        for name in [
+            "example.com",
+            "sub/example.org.zone",
+            "sub/deeper/example.net",
+            "archive/example.com",
+        ]:
+            path = self.root.joinpath(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"$ORIGIN {path.name}.\n$TTL 3600\n")
+        self.root.joinpath("README").write_text("no zonefile\n")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def find(self, **kwargs) -> [str]:
+        return sorted(
+            p.relative_to(self.root).as_posix()
+            for p in get_all_zonefiles_in_path([self.root], **kwargs)
+        )
+
+    def test_top_level(self):
+        self.assertEqual(["example.com"], self.find())
+
+    def test_recursive(self):
+        self.assertEqual(
+            [
+                "archive/example.com",
+                "example.com",
+                "sub/deeper/example.net",
+                "sub/example.org.zone",
+            ],
+            self.find(recursive=True),
+        )
+
+    def test_include_and_exclude(self):
+        self.assertEqual(
+            ["sub/example.org.zone"], self.find(recursive=True, include=["*.zone"])
+        )
+        self.assertEqual(
+            ["example.com", "sub/example.org.zone"],
+            self.find(recursive=True, exclude=["archive", "deeper"]),
+        )
+
+    def test_sniffs_only_the_header(self):
+        path = self.root.joinpath("large")
+        path.write_text("x" * 100 + "\n$TTL 3600\n")
+        self.assertTrue(is_zonefile(path))
+        self.assertFalse(is_zonefile(path, sniff_size=100))
+
+    def test_duplicate_target_files(self):
+        inputs = get_all_zonefiles_in_path([self.root], recursive=True)
+        with self.assertRaises(ValueError):
+            target_files(inputs, self.root, ".yaml")
+
+
+if __name__ == "__main__":
+    unittest.main()
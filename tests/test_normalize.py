@@ -0,0 +1,104 @@
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+from ruamel.yaml import YAML
+from zonefile_migrate.dns_record_set import DNSRecordSet
+from zonefile_migrate.normalize import NormalizedZone, normalized
+from zonefile_migrate.to_cloudformation import (
+    convert_to_cloudformation,
+    transform_to_cloudformation,
+)
+from zonefile_migrate.to_terraform import convert_to_terraform
+from zonefile_migrate.utils import convert_zonefiles, read_zonefile
+
+
+class Zone:
+    """
+    a zone with the record sets of a BIND export of a system which does not merge
+    them.
+    """
+
+    domain = "bücher.example."
+
+    def __iter__(self):
+        return iter(
+            [
+                DNSRecordSet("xn--bcher-kva.example.", "SOA", 600, ["ns1. root. 1 1 1 1 1"]),
+                DNSRecordSet("WWW.bücher.example.", "A", 600, ["10.0.0.1"]),
+                DNSRecordSet("www.xn--bcher-kva.example.", "A", 300, ["10.0.0.2"]),
+                DNSRecordSet("www.bücher.example.", "TXT", 300, ['"a"', '"a"']),
+                DNSRecordSet("www.bücher.example.", "A", 300, ["10.0.0.1"]),
+            ]
+        )
+
+
+class NormalizeTestCase(unittest.TestCase):
+    def test_normalized_zone(self):
+        zone = NormalizedZone(Zone(), maximum_ttl=400)
+        with self.assertLogs("zonefile-migrate", level="INFO") as logs:
+            record_sets = list(zone)
+        self.assertEqual(
+            [
+                DNSRecordSet("xn--bcher-kva.example.", "SOA", 400, ["ns1. root. 1 1 1 1 1"]),
+                DNSRecordSet("www.xn--bcher-kva.example.", "A", 300, ["10.0.0.1", "10.0.0.2"]),
+                DNSRecordSet("www.xn--bcher-kva.example.", "TXT", 300, ['"a"']),
+            ],
+            record_sets,
+        )
+        self.assertEqual(
+            {
+                "renamed owners": 3,
+                "merged record sets": 2,
+                "conflicting TTLs": 1,
+                "duplicate values": 2,
+                "clamped TTLs": 1,
+            },
+            zone.changes,
+        )
+        self.assertEqual(1, len(logs.output))
+        self.assertEqual("bücher.example.", zone.domain)
+
+    def test_normalized_transform(self):
+        zones = Path(__file__).parent.parent.joinpath("example/zones")
+        inputs = [zones.joinpath("asample.org"), zones.joinpath("bönn.de")]
+        transform = partial(transform_to_cloudformation, maximum_ttl=300)
+        with tempfile.TemporaryDirectory() as directory:
+            outputs = [Path(directory, f"{i.name}.yaml") for i in inputs]
+            # the normalised transform is pickled to the worker processes
+            convert_zonefiles(inputs, outputs, normalized(transform, 300), jobs=2)
+            templates = [YAML().load(output) for output in outputs]
+
+        names = [
+            r["Properties"]["Name"]
+            for template in templates
+            for r in template["Resources"].values()
+        ]
+        self.assertIn("xn--bnn-sna.de.", names)
+        self.assertTrue(all(name == name.lower() and name.isascii() for name in names))
+
+    def test_mixed_case_origin(self):
+        content = (
+            b"$ORIGIN Example.COM.\n$TTL 300\n"
+            b"@ SOA ns1 hostmaster 1 7200 3600 1209600 300\n"
+            b"@ NS ns1\nWWW A 10.0.0.1\n"
+        )
+        for parser in ["easyzone", "native"]:
+            with self.subTest(parser=parser):
+                zone = NormalizedZone(
+                    read_zonefile(Path("example.com"), parser, content)
+                )
+                self.assertEqual("example.com.", zone.domain)
+                template = convert_to_cloudformation(zone, None)
+                self.assertEqual(
+                    ["AWS::Route53::HostedZone", "AWS::Route53::RecordSet"],
+                    [r["Type"] for r in template["Resources"].values()],
+                )
+                terraform = convert_to_terraform(zone, "google", None)
+                self.assertNotIn('"SOA"', terraform)
+                self.assertNotIn('"NS"', terraform)
+                self.assertIn('"www.example.com."', terraform)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import codecs
+import tempfile
+import unittest
+from pathlib import Path
+from zonefile_migrate.dns_record_set import create_from_zone
+from zonefile_migrate.utils import read_zonefile
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class ReadZonefileTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.content = zones.joinpath("asample.org").read_bytes()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def read(self, content: bytes, parser: str) -> list:
+        path = Path(self.directory.name, "asample.org")
+        path.write_bytes(content)
+        from_file = create_from_zone(read_zonefile(path, parser))
+        from_content = create_from_zone(read_zonefile(path, parser, content))
+        self.assertEqual(from_file, from_content)
+        return from_file
+
+    def test_encodings(self):
+        for parser in ["easyzone", "native"]:
+            expected = self.read(self.content, parser)
+            for content in [
+                codecs.BOM_UTF8 + self.content,
+                self.content.replace(b"\n", b"\r\n"),
+                self.content.decode("utf-8").encode("utf-16"),
+            ]:
+                with self.subTest(parser=parser, content=content[:4]):
+                    self.assertEqual(expected, self.read(content, parser))
+
+    def test_latin_1(self):
+        content = self.content + b'latin\tIN\tTXT\t"caf\xe9"\n'
+        for parser in ["easyzone", "native"]:
+            with self.assertLogs("zonefile-migrate", level="WARNING") as logs:
+                record_sets = self.read(content, parser)
+            self.assertIn("reading it as Latin-1", logs.output[0])
+            latin = [r for r in record_sets if r.name == "latin.asample.org."]
+            self.assertEqual(1, len(latin))
+            self.assertIn("caf", latin[0].rrdatas[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
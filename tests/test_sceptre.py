@@ -0,0 +1,144 @@
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+from click.testing import CliRunner
+from zonefile_migrate.to_cloudformation import (
+    command,
+    generate_sceptre_configurations,
+    transform_to_cloudformation,
+)
+from zonefile_migrate.utils import (
+    convert_zonefiles,
+    get_all_zonefiles_in_path,
+    target_files,
+)
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class SceptreConfigurationsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.project = Path(self.directory.name)
+        self.inputs = sorted(get_all_zonefiles_in_path([zones]))
+        templates = self.project.joinpath("templates/dns")
+        templates.mkdir(parents=True)
+        self.outputs = target_files(self.inputs, templates, ".yaml")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def convert(self, jobs=1) -> dict:
+        transform = partial(
+            transform_to_cloudformation,
+            maximum_ttl=None,
+            split=True,
+            maximum_resources=10,
+        )
+        results = {}
+        convert_zonefiles(self.inputs, self.outputs, transform, jobs, results=results)
+        return [results[output] for output in self.outputs]
+
+    def read_configs(self, directory: Path) -> dict:
+        return {
+            path.relative_to(directory).as_posix(): path.read_text()
+            for path in sorted(directory.rglob("*.yaml"))
+        }
+
+    def test_configs_of_split_zones(self):
+        stacks = self.convert(jobs=2)
+        self.assertEqual(
+            ["zone-asample-org", "zone-bonn-de", "zone-land-5-com"],
+            [stack_name for stack_name, _ in stacks],
+        )
+        config_directory = self.project.joinpath("config/dns")
+        self.assertEqual(9, generate_sceptre_configurations(stacks, config_directory))
+        configs = self.read_configs(config_directory)
+        self.assertEqual(
+            ["config.yaml"]
+            + [f"zone-asample-org{part}.yaml" for part in ["-1", "-2", ""]]
+            + ["zone-bonn-de.yaml"]
+            + [f"zone-land-5-com{part}.yaml" for part in ["-1", "-2", "-3", "-4", ""]],
+            list(configs),
+        )
+        self.assertEqual(
+            "template_path: dns/asample.org.yaml\n", configs["zone-asample-org.yaml"]
+        )
+        self.assertEqual(
+            "template_path: dns/asample.org-2.yaml\n"
+            "parameters:\n"
+            "  HostedZoneId: !stack_output dns/zone-asample-org.yaml::HostedZoneId\n"
+            "dependencies:\n"
+            "- dns/zone-asample-org.yaml\n",
+            configs["zone-asample-org-2.yaml"],
+        )
+        self.assertEqual(0, generate_sceptre_configurations(stacks, config_directory))
+
+    def test_changed_configs_keep_other_settings(self):
+        config_directory = self.project.joinpath("config/dns")
+        stacks = self.convert()
+        generate_sceptre_configurations(stacks, config_directory)
+        config = config_directory.joinpath("zone-bonn-de.yaml")
+        config.write_text("template_path: dns/old.yaml\nstack_tags:\n  team: dns\n")
+
+        self.assertEqual(1, generate_sceptre_configurations(stacks, config_directory))
+        self.assertEqual(
+            "template_path: dns/bönn.de.yaml\nstack_tags:\n  team: dns\n",
+            config.read_text(),
+        )
+
+    def test_sub_groups_are_bounded(self):
+        config_directory = self.project.joinpath("config/dns")
+        stacks = self.convert()
+        config_directory.mkdir(parents=True)
+        config_directory.joinpath("zone-bonn-de.yaml").write_text(
+            "template_path: dns/bönn.de.yaml\n"
+        )
+        generate_sceptre_configurations(stacks, config_directory, 4)
+        configs = self.read_configs(config_directory)
+        self.assertIn("zone-bonn-de.yaml", configs)
+        self.assertEqual(
+            [f"group-001/zone-asample-org{part}.yaml" for part in ["-1", "-2", ""]],
+            sorted(name for name in configs if name.startswith("group-001/zone")),
+        )
+        self.assertEqual(
+            "template_path: dns/land-5.com-1.yaml\n"
+            "parameters:\n"
+            "  HostedZoneId: !stack_output dns/group-002/zone-land-5-com.yaml::HostedZoneId\n"
+            "dependencies:\n"
+            "- dns/group-002/zone-land-5-com.yaml\n",
+            configs["group-002/zone-land-5-com-1.yaml"],
+        )
+
+    def test_command_with_normalize(self):
+        for jobs in ["1", "2"]:
+            with self.subTest(jobs=jobs):
+                config_directory = self.project.joinpath(f"config/dns-{jobs}")
+                result = CliRunner().invoke(
+                    command,
+                    [
+                        "--normalize",
+                        "--sceptre-group",
+                        str(config_directory),
+                        "--jobs",
+                        jobs,
+                        "--force",
+                        str(zones),
+                        str(self.project.joinpath("templates/dns")),
+                    ],
+                )
+                self.assertEqual(0, result.exit_code, result.output)
+                self.assertEqual(
+                    [
+                        "config.yaml",
+                        "zone-asample-org.yaml",
+                        "zone-bonn-de.yaml",
+                        "zone-land-5-com.yaml",
+                    ],
+                    list(self.read_configs(config_directory)),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
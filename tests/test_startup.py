@@ -0,0 +1,62 @@
+import re
+import subprocess
+import sys
+import unittest
+from zonefile_migrate.__main__ import commands, main
+
+# the limit of the cumulative import time of the command line interface, in seconds,
+# far above the time of the lazy group and below that of importing all commands
+STARTUP_IMPORT_TIME_LIMIT = 0.1
+
+HEAVY_MODULES = ["ruamel.yaml", "jinja2", "slugify", "easyzone", "dns", "boto3"]
+
+
+def import_times(code: str) -> (dict, set):
+    """
+    returns the cumulative import time in seconds of each top-level import of `code`
+    run in a new interpreter, and the names of the modules it imported.
+    """
+    code += "\nimport sys\nprint('\\n'.join(sys.modules))"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for match in re.finditer(
+        r"^import time:\s+\d+ \|\s+(\d+) \| (\S+)$", process.stderr, re.MULTILINE
+    ):
+        times[match.group(2)] = int(match.group(1)) / 1000000
+    return times, set(process.stdout.split())
+
+
+class StartupTestCase(unittest.TestCase):
+    def test_help_does_not_import_commands(self):
+        times, modules = import_times(
+            "from zonefile_migrate.__main__ import main\n"
+            "main(['--help'], standalone_mode=False)"
+        )
+        self.assertEqual([], [m for m in HEAVY_MODULES if m in modules])
+        self.assertEqual([], [m for m in commands.values() if m[0] in modules])
+        self.assertLess(times["zonefile_migrate.__main__"], STARTUP_IMPORT_TIME_LIMIT)
+
+    def test_command_imports_its_module_only(self):
+        _, modules = import_times(
+            "from zonefile_migrate.__main__ import main\n"
+            "main(['to-terraform', '--help'], standalone_mode=False)"
+        )
+        self.assertIn("zonefile_migrate.to_terraform", modules)
+        self.assertNotIn("zonefile_migrate.to_cloudformation", modules)
+        self.assertNotIn("slugify", modules)
+
+    def test_short_help_of_commands(self):
+        for name, (module, short_help) in commands.items():
+            with self.subTest(name=name):
+                command = main.get_command(None, name)
+                self.assertEqual(name, command.name)
+                self.assertEqual(short_help, command.short_help)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from zonefile_migrate.to_terraform import (
+    STAGING_DIRECTORY,
+    StagedZone,
+    transform_to_terraform,
+    transform_to_terraform_data,
+    write_terraform_shards,
+)
+from zonefile_migrate.dns_record_set import iter_from_zone
+from zonefile_migrate.utils import (
+    convert_zonefiles,
+    get_all_zonefiles_in_path,
+    read_zonefile,
+    target_files,
+)
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class TerraformShardsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.dst = Path(self.directory.name)
+        self.inputs = sorted(get_all_zonefiles_in_path([zones]))
+        staging = self.dst.joinpath(STAGING_DIRECTORY)
+        staging.mkdir()
+        self.staged = target_files(self.inputs, staging, ".jsonl")
+        convert_zonefiles(self.inputs, self.staged, transform_to_terraform_data)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_staged_zones(self):
+        for input, path in zip(self.inputs, self.staged):
+            zone = read_zonefile(input)
+            staged = StagedZone(path)
+            self.assertEqual(zone.domain, staged.domain)
+            record_sets = list(iter_from_zone(zone))
+            self.assertEqual(record_sets, list(staged))
+            self.assertEqual(sum(len(r.rrdatas) for r in record_sets), staged.records)
+
+    def test_hcl_shards_contain_the_module_of_each_zone(self):
+        shards = write_terraform_shards(self.staged, self.dst, "google", 300, 2)
+        self.assertEqual(["shard-001.tf", "shard-002.tf"], [s.name for s in shards])
+        content = "".join(shard.read_text() for shard in shards)
+        for input in self.inputs:
+            output = self.dst.joinpath(input.name + ".tf")
+            transform_to_terraform(read_zonefile(input), output, "google", 300)
+            self.assertIn(output.read_text(), content)
+
+    def test_tfvars_shards(self):
+        shards = write_terraform_shards(
+            self.staged, self.dst, "google", 300, 5, "tfvars", jobs=2
+        )
+        self.assertEqual(3, len(shards))
+        self.assertTrue(self.dst.joinpath("main.tf").exists())
+        variables = {}
+        for shard in shards:
+            variables.update(json.loads(shard.read_text())["zones"])
+        self.assertEqual(["asample_org", "bönn_de", "land-5_com"], sorted(variables))
+        asample = variables["asample_org"]
+        self.assertEqual("asample.org.", asample["domain_name"])
+        self.assertIn(
+            {"name": "mail.asample.org.", "type": "A", "ttl": 300, "rrdatas": ["10.0.1.5"]},
+            asample["resource_record_sets"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
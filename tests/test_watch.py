@@ -0,0 +1,157 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+from click.testing import CliRunner
+from zonefile_migrate import to_cloudformation, to_terraform
+from zonefile_migrate.manifest import Manifest, manifest_path
+from zonefile_migrate.utils import get_all_zonefiles_in_path, target_files
+from zonefile_migrate.watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    ZonefileWatch,
+    iter_batches,
+    target_conversion,
+)
+
+zones = Path(__file__).parent.parent.joinpath("example/zones")
+
+
+class ScriptedWatcher:
+    """
+    a watcher which reports the changes of the `script`, one per wait.
+    """
+
+    def __init__(self, script: list):
+        self.script = script
+
+    def wait(self, timeout=None) -> set:
+        return set(self.script.pop(0)) if self.script else set()
+
+
+class WatchTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.src = Path(self.directory.name, "zones")
+        self.dst = Path(self.directory.name, "templates")
+        shutil.copytree(zones, self.src)
+        self.dst.mkdir()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def zonefile_watch(self, to: str = "terraform") -> ZonefileWatch:
+        extension, options, transform = target_conversion(to, "google", None, False)
+        manifest = Manifest(manifest_path(self.dst), options)
+        return ZonefileWatch(
+            [self.src], self.dst, extension, transform, "easyzone", manifest
+        )
+
+    def assertWatches(self, watcher):
+        zonefile = self.src.joinpath("bönn.de")
+        zonefile.write_text(zonefile.read_text() + "\nnew IN A 10.0.0.2\n")
+        self.assertEqual({zonefile}, watcher.wait(5))
+        zonefile.unlink()
+        self.assertEqual({zonefile}, watcher.wait(5))
+        self.assertEqual(set(), watcher.wait(0.05))
+
+    def test_polling_watcher(self):
+        with PollingWatcher([self.src], interval=0.01) as watcher:
+            self.assertWatches(watcher)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "requires inotify")
+    def test_inotify_watcher(self):
+        with InotifyWatcher([self.src], recursive=True) as watcher:
+            self.assertWatches(watcher)
+            subdirectory = self.src.joinpath("sub")
+            subdirectory.mkdir()
+            self.assertEqual(set(), watcher.wait(0.05))
+            subdirectory.joinpath("example.zone").write_text("$TTL 300\n")
+            self.assertEqual({subdirectory.joinpath("example.zone")}, watcher.wait(5))
+
+    def test_bursts_are_debounced(self):
+        a, b = Path("a"), Path("b")
+        watcher = ScriptedWatcher([{a}, {b}, {a}, {}, {b}, {}])
+        batches = iter_batches(watcher, 0.01)
+        self.assertEqual({a, b}, next(batches))
+        self.assertEqual({b}, next(batches))
+
+    def test_only_changed_zonefiles_are_converted(self):
+        watch = self.zonefile_watch()
+        zonefile = self.src.joinpath("land-5.com")
+        notes = self.src.joinpath("README.txt")
+        notes.write_text("not a zonefile\n")
+        output = self.dst.joinpath("land-5.com.tf")
+
+        self.assertEqual([output], watch.update([zonefile, notes]))
+        self.assertEqual([], watch.update([zonefile]))
+        self.assertFalse(self.dst.joinpath("README.txt.tf").exists())
+
+        zonefile.write_text(zonefile.read_text() + "\nnew IN A 10.0.0.2\n")
+        self.assertEqual([output], watch.update([zonefile]))
+        self.assertIn('"new.land-5.com."', output.read_text())
+
+        backup = self.src.joinpath("land-5.com~")
+        shutil.copy(zonefile, backup)
+        self.assertEqual([], watch.update([backup]))
+
+    def test_manifest_is_shared_with_the_command(self):
+        for to, command in [
+            ("cloudformation", to_cloudformation.command),
+            ("terraform", to_terraform.command),
+        ]:
+            with self.subTest(to=to):
+                result = CliRunner().invoke(command, [str(self.src), str(self.dst)])
+                self.assertEqual(0, result.exit_code, result.output)
+                watch = self.zonefile_watch(to)
+                inputs = get_all_zonefiles_in_path([self.src])
+                outputs = target_files(inputs, self.dst, watch.extension)
+                with self.assertLogs("zonefile-migrate", level="INFO") as logs:
+                    watch.convert_all(inputs, outputs, 1)
+                self.assertIn("skipped 3 unchanged zonefiles", logs.output[0])
+
+    def test_failed_zonefile_is_converted_again(self):
+        watch = self.zonefile_watch("cloudformation")
+        zonefile = self.src.joinpath("asample.org")
+        content = zonefile.read_text()
+        zonefile.write_text(content + "\nbroken IN A\n")
+        with self.assertLogs("zonefile-migrate", level="ERROR"):
+            self.assertEqual([], watch.update([zonefile]))
+        zonefile.write_text(content)
+        self.assertEqual(
+            [self.dst.joinpath("asample.org.yaml")], watch.update([zonefile])
+        )
+
+    def test_errors_are_reported_and_watching_continues(self):
+        watch = self.zonefile_watch()
+        zonefile = self.src.joinpath("land-5.com")
+        including = self.src.joinpath("including.example")
+        including.write_text(
+            "$ORIGIN including.example.\n$TTL 300\n$INCLUDE does-not-exist\n"
+        )
+        for parser in ["easyzone", "native"]:
+            with self.subTest(parser=parser):
+                watch.parser = parser
+                with self.assertLogs("zonefile-migrate", level="ERROR") as logs:
+                    self.assertEqual([], watch.update([including]))
+                self.assertIn(including.as_posix(), logs.output[0])
+                self.assertIn("does-not-exist", logs.output[0])
+
+        watch.transform = mock.Mock(side_effect=RuntimeError("unexpected"))
+        with self.assertLogs("zonefile-migrate", level="ERROR") as logs:
+            self.assertEqual([], watch.update([zonefile]))
+        self.assertIn("RuntimeError: unexpected", logs.output[0])
+
+        def remove(zone, output):
+            zonefile.unlink()
+            raise FileNotFoundError(zonefile)
+
+        watch.transform = remove
+        with self.assertNoLogs("zonefile-migrate", level="ERROR"):
+            self.assertEqual([], watch.update([zonefile]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import tempfile
+from pathlib import Path
+from easyzone import easyzone
+from dns.exception import SyntaxError
+from zonefile_migrate import zonefile_parser
+from zonefile_migrate.dns_record_set import create_from_zone
+
+zonefile = """
+$TTL 1H
+$ORIGIN example.org.
+@   IN SOA ns1 hostmaster ( 2024010101 ; serial
+        2H 30M 2W
+        300 )
+    IN NS ns1
+    NS ns2.example.org.
+ns1 A 192.0.2.1
+ns2 3600 IN A 192.0.2.2
+Mixed A 192.0.2.3
+mixed A 192.0.2.4
+mixed A 192.0.2.3
+*.wild 300 CNAME mixed
+_sip._tcp SRV 10 20 5060 sip
+@ MX 10 Mail
+@ MX 10 mail.example.org.
+@ MX 20 mail
+txt TXT "v=spf1 -all" unquoted "escaped \\"quote\\"" "semi;colon"
+caa CAA 0 issue "letsencrypt.org"
+sshfp SSHFP 1 1 dd465c09cfa51fb45020cc83316fff21b9ec74ac
+ds DS 60485 5 1 2BB183AF5F22588179A53B0A98631FAD1A292118
+bücher A 192.0.2.5
+escaped\\.dot A 192.0.2.6
+$GENERATE 1-4 host-$ A 10.0.0.$
+$ORIGIN sub.example.org.
+www A 192.0.2.7
+other.org. A 192.0.2.8
+"""
+
+
+class ZonefileParserTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, name: str, content: str) -> str:
+        path = self.path.joinpath(name)
+        path.write_text(content)
+        return path.as_posix()
+
+    def assertEquivalent(self, domain_name: str, filename: str):
+        expected = create_from_zone(easyzone.zone_from_file(domain_name, filename))
+        actual = create_from_zone(zonefile_parser.zone_from_file(domain_name, filename))
+        self.assertEqual(expected, actual)
+
+    def test_equivalent_to_easyzone(self):
+        self.assertEquivalent("example.org", self.write("example.org", zonefile))
+
+    def test_equivalent_to_easyzone_on_examples(self):
+        zones = Path(__file__).parent.parent.joinpath("example/zones")
+        for filename in zones.iterdir():
+            with self.subTest(filename.name):
+                self.assertEquivalent(filename.name, filename.as_posix())
+
+    def test_generate(self):
+        filename = self.write(
+            "example.org",
+            "$ORIGIN example.org.\n$TTL 60\n@ SOA ns hm 1 2 3 4 5\n@ NS ns\n"
+            "$GENERATE 1-10/3 host-${10,3} 300 IN CNAME target-${0,2,x}\n",
+        )
+        record_sets = list(zonefile_parser.zone_from_file("example.org", filename))
+        self.assertEqual(
+            [
+                ("host-011.example.org.", ("target-01.example.org.",)),
+                ("host-014.example.org.", ("target-04.example.org.",)),
+                ("host-017.example.org.", ("target-07.example.org.",)),
+                ("host-020.example.org.", ("target-0a.example.org.",)),
+            ],
+            [(r.name, r.rrdatas) for r in record_sets if r.rectype == "CNAME"],
+        )
+
+    def test_include(self):
+        self.write("hosts", "www A 192.0.2.1\n$TTL 10\n")
+        filename = self.write(
+            "example.org",
+            "$ORIGIN example.org.\n$TTL 60\n@ SOA ns hm 1 2 3 4 5\n@ NS ns\n"
+            "$INCLUDE hosts sub.example.org.\nftp A 192.0.2.2\n",
+        )
+        record_sets = list(zonefile_parser.zone_from_file("example.org", filename))
+        self.assertEqual(
+            ["example.org.", "example.org.", "www.sub.example.org.", "ftp.example.org."],
+            [r.name for r in record_sets],
+        )
+
+    def test_syntax_errors(self):
+        for content, message in [
+            ("@ SOA ns hm 1 2 3 4 5\n", "Missing default TTL value"),
+            ("$TTL 60\n@ SOA ns hm 1 2 3 4 5\nfoo A not-an-address\n", ":3: "),
+            ("$TTL 60\n@ SOA ns hm ( 1 2 3 4 5\n", "unbalanced parentheses"),
+            ('$TTL 60\nfoo TXT "unterminated\n', "unbalanced quotes"),
+            ("$TTL 60\nfoo BOGUS data\n", "unknown rdatatype 'BOGUS'"),
+            ("$TTL 60\nfoo CH A 192.0.2.1\n", "RR class is not zone's class"),
+            (
+                "$TTL 60\n$INCLUDE missing\n",
+                r"example\.org:2: cannot read \$INCLUDE .*missing: No such file",
+            ),
+        ]:
+            with self.subTest(message):
+                filename = self.write("example.org", content)
+                with self.assertRaisesRegex(SyntaxError, message):
+                    zonefile_parser.zone_from_file("example.org", filename)
+
+
+if __name__ == "__main__":
+    unittest.main()